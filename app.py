@@ -1,57 +1,254 @@
 # app.py
+import gc
+import hmac
 import os
+import signal
+import tempfile
 from datetime import datetime
+from typing import Callable, NamedTuple
 
 import dash_bootstrap_components as dbc
+import flask
 import plotly.io as pio
 from dash import Dash, dcc, html
 
-from app_initialisation import initialize_managers
-from callbacks import get_categories_for_year, reconcile_category, register_callbacks
+try:
+    import flask_compress
+except ImportError:  # compression is an optimisation: without it responses are sent as they are
+    flask_compress = None
+
+try:
+    import diskcache
+    from dash import DiskcacheManager
+except ImportError:  # background callbacks need dash[diskcache]; without it they run in the request
+    diskcache = None
+
+from callbacks import register_callbacks, warm_year
 from layouts.control_panel import get_control_panel
 from layouts.tabs_container import get_tabs
 from layouts.title import get_title
 from src import defaults
+from src.boot_profile import BOOT_PROFILE
+from src.columnar import input_paths
+from src.data_reload import RELOAD_TOKEN, ReloadLeader, ReloadWatcher, carry_over
+from src.manager_loader import LoadedManagers, ManagerLoader
+from src.metrics import METRICS
+from src.result_cache import installed_cache
+from src.warmup import WARMUP_ENABLED, YearWarmer
 
 # Read at startup rather than hardcoded: a module-level False makes every branch below dead code,
 # and flipping the theme should not need a source edit and a rebuild.
 USE_DARK_MODE = os.getenv("USE_DARK_MODE", "").strip().lower() in ("1", "true", "yes", "on")
 
+# The stylesheet and figure template of each side of the dark mode switch, which swaps them in the
+# browser (apply_theme in assets/clientside.js). The server renders with the one USE_DARK_MODE picks.
+THEMES = {"light": (dbc.themes.BOOTSTRAP, pio.templates.default), "dark": (dbc.themes.CYBORG, "plotly_dark")}
+
 if USE_DARK_MODE:
-    pio.templates.default = "plotly_dark"  # or your custom template
+    pio.templates.default = THEMES["dark"][1]  # or your custom template
+
+# gzip/brotli for every response: callback payloads are JSON figures and tables, which compress
+# several times over. On by default; COMPRESS_RESPONSES=0 turns it off, e.g. behind a proxy that
+# compresses already.
+COMPRESS_RESPONSES = flask_compress is not None and os.getenv("COMPRESS_RESPONSES", "1").strip().lower() in ("1", "true", "yes", "on")
+
+# Run the callbacks computing the tabs as background jobs, in processes of their own, instead of on
+# the request thread (see callbacks.tab_callback). Off by default: each job forks the server, and
+# what it computes stays in that process, so pair it with WARMUP_YEARS to fork from warm caches.
+BACKGROUND_CALLBACKS = diskcache is not None and os.getenv("BACKGROUND_CALLBACKS", "").strip().lower() in ("1", "true", "yes", "on")
+# Where the jobs' progress and results are handed back to the server; shared by the gunicorn workers.
+BACKGROUND_CACHE_PATH = os.getenv("BACKGROUND_CACHE_PATH", "").strip() or os.path.join(tempfile.gettempdir(), "webapp-background")
 
 REF_CURRENCY = "USD"
 DEFAULT_YEAR = datetime.today().year
 BASE_SALARY = {**{y: None for y in defaults.YEARS}, **{2024: defaults.BASE_SALARY_1}}
 
-data_manager, market_manager, transformation_manager, figure_manager = initialize_managers(REF_CURRENCY)
-
-# Only the default year is computed here, to render the initial layout. update_category_options in
-# callbacks.py recomputes the list whenever the year changes, and reuses this one via its cache.
-CATEGORIES = get_categories_for_year(transformation_manager, DEFAULT_YEAR)
-DEFAULT_CATEGORY = reconcile_category(CATEGORIES, defaults.DEFAULT_CATEGORY)
-
-app = Dash(__name__, external_stylesheets=[dbc.themes.CYBORG if USE_DARK_MODE else dbc.themes.BOOTSTRAP])
-
-app.layout = dbc.Container(
-    [
-        get_title(),
-        html.Hr(style={"borderTop": "2px solid", "marginTop": "10px", "marginBottom": "10px"}),
-        dcc.Loading(
-            id="loading-indicator",
-            type="circle",
-            overlay_style={"visibility": "visible", "filter": "blur(2px)"},
-            children=[
-                get_control_panel(DEFAULT_YEAR, CATEGORIES, DEFAULT_CATEGORY),
-                get_tabs(),
+
+class ServerHooks(NamedTuple):
+    """What whoever serves the app (the __main__ of app.py, gunicorn.conf.py) calls into it at each stage."""
+
+    start: Callable  # in the serving process: start loading the data in the background
+    preload: Callable  # in the master, before forking the workers
+    worker_forked: Callable  # in each worker, with the master's pid
+    reload_in_master: Callable  # in the master, on SIGHUP, before re-forking the workers
+
+
+def load_managers() -> LoadedManagers:
+    """Read the data and build everything the callbacks need. Slow: runs on the loader thread."""
+    # Imported here rather than at the top: bkanalysis pulls in pandas and the managers, none of
+    # which the server needs to start listening.
+    import app_initialisation
+
+    with BOOT_PROFILE.phase("managers"):
+        return app_initialisation.load_managers(REF_CURRENCY, BASE_SALARY)
+
+
+def create_app(load=load_managers):
+    """Build the Dash app without touching the data: no load, no thread, until a ServerHooks is called.
+
+    The layout renders straight away in a loading state: the category dropdown starts empty and is
+    filled by update_category_options, and each callback waits for the managers under the loading
+    overlay. Whoever serves the app starts the load (ServerHooks.start, or preload under gunicorn);
+    failing that, the first callback does. `load` builds the managers (tools pass their own to run on
+    other data). Returns the app, its callbacks keyed by name (see register_callbacks) and the
+    ServerHooks of __main__ and gunicorn.conf.py."""
+
+    def on_loaded(_loaded):
+        BOOT_PROFILE.complete()
+        if WARMUP_ENABLED:
+            warmer.start()
+
+    managers = ManagerLoader(load, on_loaded=on_loaded)
+    # Fills the same caches the callbacks read from, for every year, so that first clicks are hits.
+    warmer = YearWarmer(lambda year: warm_year(managers.get(), year), defaults.YEARS)
+    # New exports under DATA_PATH are loaded in the background and swapped in, see src/data_reload.py.
+    # Under gunicorn the master reloads them instead, see worker_forked.
+    watcher = ReloadWatcher(input_paths, lambda: reload())
+    master_pid = None
+
+    def reload():
+        """Reload the data: in this process, or in the gunicorn master, which then re-forks the workers."""
+        if master_pid is None:
+            return managers.reload(carry_over)
+        os.kill(master_pid, signal.SIGHUP)
+        return True
+
+    with BOOT_PROFILE.phase("layout"):
+        app = Dash(
+            __name__,
+            external_stylesheets=[THEMES["dark" if USE_DARK_MODE else "light"][0]],
+            compress=COMPRESS_RESPONSES,
+            background_callback_manager=DiskcacheManager(diskcache.Cache(BACKGROUND_CACHE_PATH)) if BACKGROUND_CALLBACKS else None,
+        )
+
+        app.layout = dbc.Container(
+            [
+                get_title(),
+                html.Hr(style={"borderTop": "2px solid", "marginTop": "10px", "marginBottom": "10px"}),
+                dcc.Loading(
+                    id="loading-indicator",
+                    type="circle",
+                    overlay_style={"visibility": "visible", "filter": "blur(2px)"},
+                    children=[
+                        get_control_panel(
+                            DEFAULT_YEAR,
+                            [],
+                            None,
+                            dark_mode=USE_DARK_MODE,
+                            themes={mode: {"stylesheet": stylesheet, "template": pio.templates[template].to_plotly_json()} for mode, (stylesheet, template) in THEMES.items()},
+                        ),
+                        get_tabs(),
+                    ],
+                ),
             ],
-        ),
-    ],
-    fluid=True,
-    style={"padding": "10px", "position": "relative"},  # Added relative position
-)
+            fluid=True,
+            style={"padding": "10px", "position": "relative"},  # Added relative position
+        )
+
+    with BOOT_PROFILE.phase("callbacks"):
+        callbacks = register_callbacks(app, managers, background=BACKGROUND_CALLBACKS)
+
+    @app.server.before_request
+    def check_for_new_data():
+        watcher.check()
+
+    @app.server.route("/admin/reload", methods=["GET", "POST"])
+    def reload_data():
+        """Reload the data now (POST, with the RELOAD_TOKEN bearer token), or report on the reloads (GET)."""
+        if flask.request.method == "POST":
+            if not RELOAD_TOKEN:
+                flask.abort(404)
+            if not hmac.compare_digest(flask.request.headers.get("Authorization", ""), f"Bearer {RELOAD_TOKEN}"):
+                flask.abort(403)
+            started = reload()
+            return flask.jsonify({"started": started, **managers.reload_status()}), 202 if started else 409
+        return flask.jsonify(managers.reload_status())
+
+    @app.server.route("/warmup/status")
+    def warmup_status():
+        """Warm-up progress, polled by whoever wants to know when every year is a cache hit."""
+        return flask.jsonify({"enabled": WARMUP_ENABLED, "managers_loaded": managers.ready(), **warmer.status()})
+
+    METRICS.install(app.server)
+
+    @app.server.route("/metrics")
+    def metrics():
+        """Per-callback latency, layout time, response size and cache lookups, for Prometheus."""
+        gauges = {
+            "webapp_managers_loaded": managers.ready(),
+            "webapp_managers_version": managers.version,
+            "webapp_years_warmed": len(warmer.status()["warmed"]),
+        }
+        loaded = managers.peek()
+        if loaded is not None:
+            cache = installed_cache(loaded.transformation_manager)
+            if cache is not None:
+                gauges.update({f"webapp_result_cache_{key}": value for key, value in cache.stats().items()})
+            gauges.update(
+                {
+                    "webapp_year_contexts": len(loaded.year_contexts.years()),
+                    "webapp_year_context_hits": loaded.year_contexts.hits,
+                    "webapp_year_context_misses": loaded.year_contexts.misses,
+                }
+            )
+        return flask.Response(METRICS.render(gauges), mimetype="text/plain; version=0.0.4")
+
+    @app.server.route("/boot-profile")
+    def boot_profile():
+        """Where the startup time and memory went, as JSON, for tracking cold start as the data grows."""
+        return flask.jsonify(BOOT_PROFILE.report())
+
+    def preload():
+        """Load the managers, and warm the years if enabled, in this process before it forks workers.
+
+        Under gunicorn (gunicorn.conf.py) the master imports the app and calls this once, so every
+        worker starts with the frames and the warm caches already in memory, shared copy-on-write,
+        instead of loading its own copy. No thread may be left running across the fork: a worker
+        would inherit its locks mid-use and wait on them forever. The surviving objects are then
+        frozen out of the garbage collector, whose passes would otherwise write to every page of
+        them and unshare it."""
+        managers.get()
+        managers.join()
+        warmer.wait()
+        gc.collect()
+        gc.freeze()
+
+    def worker_forked(pid):
+        """In a gunicorn worker forked from the master `pid`: leave the reloads to the master.
+
+        Each worker reloading its own copy would cost the load once per worker, all at the same
+        time, and unshare the frames. Instead one worker at a time watches the inputs (ReloadLeader),
+        and a reload, whether it notices one or /admin/reload asks for it, is a SIGHUP to the master
+        (see reload_in_master)."""
+        nonlocal master_pid
+        master_pid = pid
+        watcher.leader = ReloadLeader(os.path.join(tempfile.gettempdir(), f"webapp-reload-{pid}.lock"))
+
+    def reload_in_master():
+        """In the gunicorn master, on SIGHUP: reload the data before gunicorn re-forks the workers.
+
+        The old workers keep serving the old data meanwhile. The years the new data changed are
+        warmed if the warm-up is enabled, and the new workers start from the reloaded frames shared
+        copy-on-write, as after preload."""
+        watcher.reset()  # the new workers compare the inputs with those loaded now
+        gc.unfreeze()  # the previous managers are garbage once replaced
+        managers.reload(carry_over, wait=True)
+        loaded = managers.get()
+        if WARMUP_ENABLED:
+            kept = (managers.reload_status()["last_reload"] or {}).get("years_kept", [])
+            YearWarmer(lambda year: warm_year(loaded, year), [year for year in defaults.YEARS if year not in kept]).start().wait()
+        gc.collect()
+        gc.freeze()
+
+    return app, callbacks, ServerHooks(managers.start, preload, worker_forked, reload_in_master)
+
 
-callbacks = register_callbacks(app, transformation_manager, figure_manager, BASE_SALARY, {DEFAULT_YEAR: CATEGORIES})
+# Importing the module only builds the app: the data is loaded by whoever serves it, below or in
+# gunicorn.conf.py.
+app, callbacks, hooks = create_app()
+server = app.server
 
 if __name__ == "__main__":
+    # the development server: one process. Deployments serve through gunicorn (gunicorn.conf.py).
+    hooks.start()
     app.run_server(host="0.0.0.0", port=8050, debug=False)
@@ -1,28 +1,95 @@
 # app_initialisation.py
 import configparser
 import os
+from functools import partial
 
 from bkanalysis.config import config_helper as ch
 from bkanalysis.managers import DataManager, MarketManager, TransformationManager, FigureManager
 
+from callbacks import build_balance_index, build_batch_salary, build_breakdown_cube, build_category_table, build_flow_cube, build_saving_table, build_year_context
+from src.boot_profile import BOOT_PROFILE
+from src.columnar import input_paths, load_manager
+from src.manager_loader import LoadedManagers
+from src.result_cache import FIGURE_MANAGER_METHODS, TRANSFORMATION_MANAGER_METHODS, ResultCache, install_result_cache
+from src.snapshot_store import SnapshotStore
+from src.year_context import YearContextStore
 
-def initialize_managers(ref_currency: str):
-    """initialise the managers"""
+
+def read_config():
+    """the bkanalysis configuration"""
     config = configparser.ConfigParser()
     if len(config.read(ch.source)) != 1:
         raise OSError(f"no config found in {os.path.abspath(ch.source)}")
+    return config
+
+
+def initialize_managers(ref_currency: str, data_path=None, config=None):
+    """initialise the managers, recording each step in the boot profile
+
+    data_path defaults to $DATA_PATH, and config to the bkanalysis config file. Loading pregenerated
+    data does not parse bank files, so tools running on other data may pass an empty config."""
+    with BOOT_PROFILE.phase("config"):
+        config = read_config() if config is None else config
 
-    data_path = os.getenv("DATA_PATH", "/data")
+    data_path = data_path or os.getenv("DATA_PATH", "/data")
 
-    data_manager = DataManager(config)
-    print(f"Reading Data from {os.path.abspath(data_path)}.")
-    data_manager.load_pregenerated_data(os.path.join(data_path, "data_manager.csv"))
+    # Parquet/Feather conversions (python -m src.columnar) are preferred over the CSVs when present:
+    # they load without any string parsing, with categorical dtypes.
+    data_manager_path, market_path = input_paths(data_path)
 
-    market_manager = MarketManager(ref_currency)
-    market_manager.load_pregenerated_data(os.path.join(data_path, "data_market.csv"))
+    with BOOT_PROFILE.phase("data_manager"):
+        data_manager = DataManager(config)
+        print(f"Reading Data from {os.path.abspath(data_path)} ({os.path.basename(data_manager_path)}, {os.path.basename(market_path)}).")
+        load_manager(data_manager, data_manager_path)
 
-    transformation_manager = TransformationManager(data_manager, market_manager)
+    with BOOT_PROFILE.phase("market_manager"):
+        market_manager = MarketManager(ref_currency)
+        load_manager(market_manager, market_path)
 
-    figure_manager = FigureManager(transformation_manager)
+    with BOOT_PROFILE.phase("transformation_manager"):
+        transformation_manager = TransformationManager(data_manager, market_manager)
+        # Installed before FigureManager and Salary get hold of the manager, so their calls hit it too.
+        # The derived results are also persisted next to the data, so a restart on unchanged inputs
+        # reads them back instead of re-deriving them.
+        store = SnapshotStore.for_inputs(data_path, [data_manager_path, market_path])
+        cache = install_result_cache(transformation_manager, TRANSFORMATION_MANAGER_METHODS, ResultCache(store=store))
+
+    with BOOT_PROFILE.phase("figure_manager"):
+        figure_manager = FigureManager(transformation_manager)
+        # same cache, so a single memory budget covers both managers
+        install_result_cache(figure_manager, FIGURE_MANAGER_METHODS, cache)
 
     return data_manager, market_manager, transformation_manager, figure_manager
+
+
+def load_managers(ref_currency: str, base_salary, data_path=None, config=None) -> LoadedManagers:
+    """The managers plus the per-year context store built on them: everything the callbacks read."""
+    data_manager, market_manager, transformation_manager, figure_manager = initialize_managers(ref_currency, data_path, config)
+
+    # The flows of every year aggregated in one pass, which the year contexts slice from.
+    with BOOT_PROFILE.phase("flow_cube"):
+        flow_cube = build_flow_cube(transformation_manager)
+
+    # The totals of every category of every year, out of the cube: the dropdown options at any threshold.
+    with BOOT_PROFILE.phase("category_table"):
+        category_table = build_category_table(transformation_manager, flow_cube)
+
+    # The income, expenses and saving ratio of every month, out of the cube: the whole 'Saving Rate' tab.
+    with BOOT_PROFILE.phase("saving_table"):
+        saving_table = build_saving_table(figure_manager, flow_cube)
+
+    # The memos breakdown of any category of any year, out of the cube: the 'Spending Detail' table.
+    with BOOT_PROFILE.phase("breakdown_cube"):
+        breakdown_cube = build_breakdown_cube(figure_manager, flow_cube)
+
+    # The balances of every account on any date, by binary search rather than a merge of the history.
+    with BOOT_PROFILE.phase("balance_index"):
+        balance_index = build_balance_index(transformation_manager, data_manager, market_manager, ref_currency)
+
+    # The salary of every year from one pass over the payrolls, rather than a Salary per year.
+    with BOOT_PROFILE.phase("batch_salary"):
+        batch_salary = build_batch_salary(transformation_manager, base_salary)
+
+    # One store per load: every callback fired by a year change reads the same context.
+    year_contexts = YearContextStore(partial(build_year_context, transformation_manager, base_salary, flow_cube=flow_cube, batch_salary=batch_salary))
+    return LoadedManagers(data_manager, market_manager, transformation_manager, figure_manager, year_contexts, flow_cube, balance_index, category_table, saving_table, breakdown_cube)
@@ -0,0 +1,92 @@
+// Clientside callbacks (registered in callbacks.register_clientside_callbacks): interactions that
+// only re-present data already in the browser, so they never make a round trip to the server.
+
+// The `theme` store as apply_theme last set it, for the graphs the server draws after the switch.
+let currentTheme = null;
+
+// Give a graph the template of the theme switched to. The server draws its figures with its own
+// template: each new figure is re-templated once drawn, and a figure keeps the template it was given
+// until the server sends the next one.
+function themeGraph(gd) {
+    if (!currentTheme || !window.Plotly || !gd.layout || gd.webappTheming) {
+        return;
+    }
+    const mode = currentTheme.dark ? "dark" : "light";
+    const retemplated = gd.webappTemplate !== undefined && gd.layout.template === gd.webappTemplate;
+    const drawnIn = retemplated ? gd.webappMode : currentTheme.server_dark ? "dark" : "light";
+    if (drawnIn === mode || !currentTheme[mode]) {
+        return;
+    }
+    gd.webappTheming = true;
+    window.Plotly.relayout(gd, { template: currentTheme[mode].template })
+        .then(() => {
+            gd.webappMode = mode;
+            gd.webappTemplate = gd.layout.template;
+        })
+        .finally(() => {
+            gd.webappTheming = false;
+        });
+}
+
+// Graphs are drawn (and redrawn with each new figure) after the page loads: re-template them once drawn.
+new MutationObserver(() => {
+    document.querySelectorAll(".js-plotly-plot").forEach((gd) => {
+        if (!gd.webappWatched && gd.on) {
+            gd.webappWatched = true;
+            gd.on("plotly_afterplot", () => themeGraph(gd));
+            themeGraph(gd);
+        }
+    });
+}).observe(document.documentElement, { childList: true, subtree: true });
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    webapp: {
+        // Highlight the clicked row of capital_tbl. Matched on the asset rather than the position,
+        // so the highlight follows the row when the table is re-sorted or paged on the server.
+        highlight_row: function (activeCell, rows, styles) {
+            const kept = (styles || []).filter(
+                (rule) => !(rule.if && typeof rule.if.filter_query === "string" && rule.if.filter_query.startsWith("{AssetMapped} = "))
+            );
+            if (!activeCell || !rows || !rows[activeCell.row]) {
+                return kept;
+            }
+            const asset = String(rows[activeCell.row].AssetMapped).replace(/"/g, '\\"');
+            return kept.concat([{ if: { filter_query: '{AssetMapped} = "' + asset + '"' }, backgroundColor: "rgba(17, 157, 255, 0.15)" }]);
+        },
+
+        // Show `depth` rings of the spending sunburst (-1 for all of them).
+        set_sunburst_depth: function (depth, figure) {
+            if (!figure || !figure.data) {
+                return window.dash_clientside.no_update;
+            }
+            const data = figure.data.map((trace) => (trace.type === "sunburst" ? Object.assign({}, trace, { maxdepth: depth }) : trace));
+            return Object.assign({}, figure, { data: data });
+        },
+
+        // Name this browser tab's session once, for the server to tell its calls from other users'
+        // (see src/generations.py). Kept in sessionStorage, so a reload keeps the name.
+        session_id: function (_storageType, current) {
+            if (current) {
+                return window.dash_clientside.no_update;
+            }
+            return window.crypto && window.crypto.randomUUID ? window.crypto.randomUUID() : Date.now().toString(36) + Math.random().toString(36).slice(2);
+        },
+
+        // Swap the stylesheet and the figure template for those of the theme switched to (the
+        // `themes` of layouts/control_panel.py), remembering the choice.
+        apply_theme: function (dark, theme) {
+            currentTheme = Object.assign({}, theme, { dark: Boolean(dark) });
+            const chosen = currentTheme[dark ? "dark" : "light"];
+            if (chosen) {
+                const stylesheets = ["light", "dark"].map((mode) => currentTheme[mode] && currentTheme[mode].stylesheet);
+                document.querySelectorAll('link[rel="stylesheet"]').forEach((link) => {
+                    if (stylesheets.includes(link.getAttribute("href"))) {
+                        link.setAttribute("href", chosen.stylesheet);
+                    }
+                });
+            }
+            document.querySelectorAll(".js-plotly-plot").forEach(themeGraph);
+            return currentTheme;
+        },
+    },
+});
@@ -1,15 +1,35 @@
 # callbacks.py
+import math
 from datetime import datetime
-from dash import Input, Output, State, exceptions
+from typing import TYPE_CHECKING
 
-from bkanalysis.salary import Salary, SalaryLegacy
-from bkanalysis.managers import TransformationManager, FigureManager
+from dash import ClientsideFunction, Input, Output, Patch, State, exceptions
 
 from src import defaults
+from src.manager_loader import LoadedManagers, ManagerLoader
+from src.balance_index import BalanceIndex
+from src.batch_salary import BatchSalary, salary_differences
+from src.data_reload import main_frame
+from src.category_table import CategoryTable
+from src.flow_cube import FlowCube
+from src.generations import GenerationTracker
+from src.metrics import METRICS
+from src.payload import slim_figure, table_records
+from src.saving_table import ROLLING_MONTHS, SavingTable
+from src.table_query import query_table
+from src.year_context import YearContext
 import tabs
 
+# bkanalysis is only needed once the data is loaded: importing it here would make every importer of
+# the pure helpers below, tests included, pay for it. pandas is imported regardless, by the payload
+# helpers and the load-time tables (flow cube, balance index...).
+if TYPE_CHECKING:
+    from bkanalysis.managers import TransformationManager
+
 
 HOW = "both"  # default value for how to get the spending data
+CATEGORY_LABEL = "MemoMapped"  # column the 'Spending Detail' table breaks a category down by
+CATEGORY_TOP = 10  # rows of that table
 
 
 def previous_month(year, month):
@@ -34,13 +54,16 @@ def get_flow_range(selected_year):
     return [datetime(selected_year, 1, 1), datetime(selected_year, 12, 31)]
 
 
-def get_categories_for_year(transformation_manager: TransformationManager, selected_year, threshold=None):
+def get_categories_for_year(loaded: LoadedManagers, selected_year, threshold=None):
     """Category dropdown options for one year, as a plain list of strings.
 
-    get_all_categories returns a Series whose index is meaningless here, and `x in series` tests the
-    index rather than the values, so every caller wants a list."""
+    Read from the category table when there is one (see build_category_table), at any threshold.
+    Otherwise from get_all_categories, which returns a Series whose index is meaningless here, and
+    `x in series` tests the index rather than the values, so every caller wants a list."""
     threshold = defaults.THRESHOLD if threshold is None else threshold
-    return list(transformation_manager.get_all_categories(get_flow_range(selected_year), threshold))
+    if loaded.category_table is not None:
+        return loaded.category_table.categories(selected_year, threshold)
+    return list(loaded.transformation_manager.get_all_categories(get_flow_range(selected_year), threshold))
 
 
 def reconcile_category(categories, current_category):
@@ -56,52 +79,520 @@ def reconcile_category(categories, current_category):
     return categories[0] if categories else None
 
 
-def resolve_row_index(view_row, derived_virtual_indices):
+def resolve_row_index(view_row, derived_virtual_indices, row_id=None):
     """Map a DataTable view position back to the index of the underlying data row.
 
-    derived_virtual_indices is the post-sort, post-filter ordering of the source rows. Dash only
-    supplies it once sorting or filtering is enabled, so fall back to the view position."""
+    A table paged, sorted and filtered on the server (see src.table_query.query_table) only holds the
+    visible page, so a position in it says nothing of the source row: its rows carry their source
+    index as `id`, which Dash reports as active_cell["row_id"], and that wins when present.
+    Otherwise derived_virtual_indices is the post-sort, post-filter ordering of the source rows.
+    Dash only supplies it once sorting or filtering is enabled, so fall back to the view position."""
+    if row_id is not None:
+        return row_id
     if not derived_virtual_indices or view_row is None or view_row >= len(derived_virtual_indices):
         return view_row
     return derived_virtual_indices[view_row]
 
 
-def register_callbacks(
-    app,
-    transformation_manager: TransformationManager,
-    figure_manager: FigureManager,
-    base_salary,
-    categories_by_year=None,
-):
-    """registers the callbacks of the dash app, and returns them keyed by name for profiling/tests"""
+def get_category_filter(category):
+    """The filter get_category_breakdown and get_figure_bar take for a category dropdown value, and its name.
 
-    # Salary construction is expensive and the underlying data is immutable after
-    # startup, so build it at most once per selected year.
-    salary_cache = {}
+    Category names come from the data and may themselves contain ": ", so only the first separator
+    delimits the key."""
+    category_key, category_value = category.split(": ", 1)
+    return {f"Full{category_key}": category_value}, category_value
 
-    # Categories are derived from the same immutable data, and app.py has already paid for the
-    # default year to render the initial layout, so seed the cache with what it computed.
-    category_cache = dict(categories_by_year or {})
 
-    @app.callback(
-        Output("tab1", "children"),
-        [Input("year-dropdown", "value"), Input("capital-gain-checkbox", "value")],
+def get_category_breakdown(loaded: LoadedManagers, category_dict, flow_range):
+    """The memos breakdown of a category behind the 'Spending Detail' table, for the year of `flow_range`.
+
+    Sliced out of the flow cube when its breakdowns match the figure manager's (see
+    build_breakdown_cube), else asked of the figure manager (a result cache hit once computed)."""
+    if loaded.breakdown_cube is not None:
+        return loaded.breakdown_cube.breakdown(flow_range[0].year, category_dict, CATEGORY_LABEL, CATEGORY_TOP)
+    return loaded.figure_manager.get_category_breakdown(category_dict, CATEGORY_LABEL, CATEGORY_TOP, flow_range, None, how=HOW)
+
+
+def get_category_figures(loaded: LoadedManagers, category, flow_range):
+    """The name, memos breakdown and bar chart of a category dropdown value, for the 'Spending Detail' tab."""
+    category_dict, category_value = get_category_filter(category)
+    df_category_brkdn = get_category_breakdown(loaded, category_dict, flow_range)
+    fig_category_brkdn = loaded.figure_manager.get_figure_bar(category_dict, CATEGORY_LABEL, None, flow_range, how=HOW)
+    return category_value, df_category_brkdn, fig_category_brkdn
+
+
+def get_spending_sunburst(loaded: LoadedManagers, flow_range):
+    """The sunburst of the spending by category of the 'Spending Detail' tab."""
+    return loaded.figure_manager.get_figure_sunburst(flow_range, None, include_iat=False, how=HOW, exclude_types=defaults.INCOME_TYPES)
+
+
+def get_capital_gain(loaded: LoadedManagers, flow_range):
+    """The capital gain by asset and the default figure of the 'Capital PnL Breakdown' tab."""
+    return loaded.figure_manager.get_capital_gain_brkdn(date_range=flow_range)
+
+
+def get_waterfall(loaded: LoadedManagers, context: YearContext, include_capital_gain):
+    """The waterfall of the 'Wealth Breakdown' tab, for the salary of the year context."""
+    return loaded.figure_manager.get_figure_waterfall(context.flow_range, salary_override=context.salary, include_capital_gain=include_capital_gain)
+
+
+def get_saving_rate_figures(loaded: LoadedManagers, selected_year):
+    """The saving rate gauges, income vs expenses chart and rolling saving rate of the 'Saving Rate' tab.
+
+    Read from the saving table when there is one (see build_saving_table), else from the figure
+    manager, without a rolling saving rate (None)."""
+    figure_manager = loaded.figure_manager
+    flow_range = get_flow_range(selected_year)
+
+    last_month_year, last_month = previous_month(selected_year, datetime.today().month)
+    prev_month_year, prev_month = previous_month(last_month_year, last_month)
+    annual_title = f"Saving Rate for Year {selected_year} (vs previous year)"
+    monthly_title = f"Saving Rate for Month {last_month_year}-{last_month:02d} (vs previous month)"
+
+    saving_table = loaded.saving_table
+    rolling_saving_rate = None
+    if saving_table is not None:
+        saving_ratio_annual = figure_manager.get_saving_rate_gauge(
+            saving_table.ratio(selected_year) * 100, saving_table.ratio(selected_year - 1) * 100, annual_title
+        )
+        saving_ratio_monthly = figure_manager.get_saving_rate_gauge(
+            saving_table.ratio(last_month_year, last_month) * 100, saving_table.ratio(prev_month_year, prev_month) * 100, monthly_title
+        )
+        income_vs_expenses = tabs.get_income_vs_expenses_figure(saving_table.year(selected_year), f"Income vs Expenses in {selected_year}")
+        rolling = saving_table.rolling()
+        rolling_saving_rate = tabs.get_rolling_saving_rate_figure(
+            rolling[rolling.index.year <= selected_year], f"Saving Rate over the last {ROLLING_MONTHS} months"
+        )
+    else:
+        saving_ratio_annual = figure_manager.get_saving_rate_gauge(
+            figure_manager.get_saving_ratio(selected_year) * 100,
+            figure_manager.get_saving_ratio(selected_year - 1) * 100,
+            annual_title,
+        )
+        saving_ratio_monthly = figure_manager.get_saving_rate_gauge(
+            figure_manager.get_saving_ratio(last_month_year, last_month) * 100,
+            figure_manager.get_saving_ratio(prev_month_year, prev_month) * 100,
+            monthly_title,
+        )
+        income_vs_expenses = figure_manager.get_income_vs_expenses(flow_range, True, True)
+    return saving_ratio_annual, saving_ratio_monthly, income_vs_expenses, rolling_saving_rate
+
+
+def should_render(tab, active_tab, key, rendered_key):
+    """Whether `tab` needs computing: it is the tab showing, and its content is not already for `key`.
+
+    A year change fires every tab callback, but only the open tab is worth computing. The others are
+    computed when first opened, and left as they are when the user comes back to them with the same
+    inputs. `key` must be JSON-like (lists, not tuples): `rendered_key` comes back from a dcc.Store."""
+    return active_tab == tab and rendered_key != key
+
+
+def capital_figure_patch(figure):
+    """The update turning the capital gain chart of one asset into that of another.
+
+    Only the traces and the title differ between two assets: the layout, template included, is
+    already in the browser and makes up most of a serialised figure, so it is not sent again."""
+    figure = slim_figure(figure)
+    patch = Patch()
+    patch["data"] = figure["data"]
+    patch["layout"]["title"] = figure.get("layout", {}).get("title")
+    return patch
+
+
+def no_progress(phase):
+    """The progress reporter of a tab callback run in the foreground: nobody is listening."""
+
+
+def phases(generation, progress):
+    """The function a tab callback calls as each of its phases starts.
+
+    Aborts the call (src.generations.Superseded) if its session has moved to another year since it
+    began, then reports the phase to `progress`."""
+
+    def phase(name):
+        generation.check()
+        progress(name)
+
+    return phase
+
+
+def tab_callback(app, background, job, outputs, inputs, state=(), **kwargs):
+    """app.callback for a callback computing a tab, run as a background job if `background`.
+
+    The decorated function takes a `progress` keyword, called with the name of each phase of the
+    computation as it starts, and a `prepare_only` one. In the background, the callback runs twice.
+    First in the server process with `prepare_only=True`: it returns as soon as it has built what
+    every callback of the year reads (the year context, see YearContextStore), which so stays in
+    the server's caches. Its arguments are then handed through `<job>-request` to a job, run in a
+    process forked from the server (see app.BACKGROUND_CALLBACKS): it starts with those caches and
+    only renders the figures, so a slow figure no longer holds a request thread. The phase is shown
+    in `<job>-progress` until the job ends. When the callback fires again, e.g. for another year,
+    Dash terminates the job still running for the previous inputs rather than letting it finish
+    unseen. Returns the function undecorated, as app.callback does, so that the tests and the
+    benchmark can call it.
+
+    Dash keys a job by the source of the function it runs and its arguments, and every job runs the
+    same wrapper below: the id of `<job>-progress` is passed as a last argument, never given to the
+    callback, so that the jobs of two callbacks with the same inputs do not share a key (and results)."""
+    state = list(state) if isinstance(state, (list, tuple)) else [state]
+
+    def decorator(callback):
+        if not background:
+            app.callback(outputs, inputs, state, **kwargs)(callback)
+            return callback
+
+        def prepare(*args):
+            callback(*args, prepare_only=True)
+            return list(args)
+
+        prepare.__name__ = f"prepare_{callback.__name__}"
+        app.callback(Output(f"{job}-request", "data"), inputs, state)(prepare)
+
+        def run_in_background(set_progress, args, _job):
+            return callback(*args, progress=set_progress)
+
+        run_in_background.__name__ = callback.__name__
+        app.callback(
+            outputs,
+            Input(f"{job}-request", "data"),
+            State(f"{job}-progress", "id"),
+            background=True,
+            progress=Output(f"{job}-progress", "children"),
+            progress_default="",
+            prevent_initial_call=True,  # the request comes from prepare
+            **kwargs,
+        )(run_in_background)
+        return callback
+
+    return decorator
+
+
+def build_salary(transformation_manager: "TransformationManager", base_salary, selected_year, batch_salary: BatchSalary = None):
+    """Build the salary object for the selected year, read from `batch_salary` when there is one (see build_batch_salary)."""
+    from bkanalysis.salary import Salary, SalaryLegacy
+
+    if batch_salary is not None:
+        return batch_salary.year(selected_year)
+
+    date_range = get_flow_range(selected_year)
+
+    if defaults.USE_LEGACY_SALARY_CLASS:
+        return SalaryLegacy(
+            transformation_manager,
+            date_range[1].year,
+            datetime(selected_year - 1, 1, 1),
+            base_salary[selected_year],
+            defaults.DEFAULT_PAYROLLS_1.copy(),
+            defaults.BASE_PAYROLL_1,
+            None,
+            defaults.DEFAULT_PAYROLLS_2.copy(),
+            defaults.BASE_PAYROLL_2,
+            defaults.EXCLUDE_DEFAULT.copy(),
+        )
+
+    return Salary(
+        transformation_manager,
+        date_range[1].year,
+        datetime(selected_year - 1, 1, 1),
+        defaults.SALARY_CONFIG,
+        defaults.EXCLUDE_DEFAULT.copy(),
     )
-    def update_tab_1(selected_year, include_capital_gain):
-        """Callback to update the 'Wealth Breakdown' tab."""
-        include_capital_gain = "include_capital_gain" in include_capital_gain  # Convert the list to a boolean
-        value_dates = get_value_dates(selected_year)
-        flow_range = get_flow_range(selected_year)
 
-        df_cash_account_type = transformation_manager.get_price_comparison_on_dates(value_dates[0], value_dates[1], True)
 
-        total_value_start = df_cash_account_type[f"{value_dates[0].date():%b-%y}"].sum()
-        total_value_end = df_cash_account_type[f"{value_dates[1].date():%b-%y}"].sum()
+def build_flow_cube(transformation_manager: "TransformationManager"):
+    """The FlowCube of every year of defaults.YEARS, from one get_flow_values call over all of them.
+
+    The check compares the total of each FullType (of each month without one) of the last complete
+    year of defaults.YEARS with that year's own get_flow_values call, which its year context would
+    make. None when the flows cannot be aggregated by date, or when the check fails: the year
+    contexts then scan each year."""
+    years = list(defaults.YEARS)
+    df_flows = transformation_manager.get_flow_values(datetime(years[0], 1, 1), datetime(years[-1], 12, 31), None, how=HOW, include_iat=False)
+    try:
+        flow_cube = FlowCube.from_flows(df_flows)
+    except (KeyError, ValueError) as exc:
+        print(f"No flow cube, the years will be scanned one by one: {exc}")
+        return None
+
+    checked_year = years[-2] if len(years) > 1 else years[-1]
+    flow_range = get_flow_range(checked_year)
+    reference = FlowCube.from_flows(transformation_manager.get_flow_values(flow_range[0], flow_range[1], None, how=HOW, include_iat=False))
+    by = "FullType" if "FullType" in flow_cube.dimensions else "Month"
+    expected = reference.year(checked_year).groupby(by, observed=True, dropna=False)["Value"].sum()
+    actual = flow_cube.year(checked_year).groupby(by, observed=True, dropna=False)["Value"].sum()
+    # a category missing on one side counts as 0 there
+    difference = expected.sub(actual, fill_value=0.0).abs().to_numpy().max(initial=0.0)
+    if not difference <= 0.01:  # NaN included
+        print(f"No flow cube, its flows of {checked_year} differ from get_flow_values by {difference:,.2f}.")
+        return None
+    return flow_cube
+
+
+def build_category_table(transformation_manager: "TransformationManager", flow_cube: FlowCube):
+    """The CategoryTable of the flow cube, checked against get_all_categories.
+
+    The check compares the categories of the last complete year of defaults.YEARS at THRESHOLD, in
+    any order. None without a cube, or when the check fails: the options are then read from
+    get_all_categories year by year."""
+    if flow_cube is None:
+        return None
+    try:
+        category_table = CategoryTable.from_cube(flow_cube)
+    except (KeyError, ValueError) as exc:
+        print(f"No category table, the categories will be read from the transformation manager: {exc}")
+        return None
+
+    years = list(defaults.YEARS)
+    checked_year = years[-2] if len(years) > 1 else years[-1]
+    expected = set(transformation_manager.get_all_categories(get_flow_range(checked_year), defaults.THRESHOLD))
+    actual = set(category_table.categories(checked_year, defaults.THRESHOLD))
+    if expected != actual:
+        print(f"No category table, its categories of {checked_year} differ from get_all_categories: {sorted(expected ^ actual)[:5]}.")
+        return None
+    return category_table
+
+
+def build_saving_table(figure_manager, flow_cube: FlowCube):
+    """The SavingTable of the flow cube, checked against get_saving_ratio.
+
+    The check compares the ratios of the last complete year of defaults.YEARS, of its June, of the
+    year before (the reference of its gauge) and of a month without income, where both are NaN.
+    None without a cube, or when the check fails: the 'Saving Rate' tab then asks the figure manager."""
+    if flow_cube is None:
+        return None
+    try:
+        saving_table = SavingTable.from_cube(flow_cube)
+    except (KeyError, ValueError) as exc:
+        print(f"No saving table, the saving ratios will be read from the figure manager: {exc}")
+        return None
+
+    years = list(defaults.YEARS)
+    checked_year = years[-2] if len(years) > 1 else years[-1]
+    for period in ((checked_year,), (checked_year, 6), (checked_year - 1,), saving_table.month_without_income()):
+        expected, actual = figure_manager.get_saving_ratio(*period), saving_table.ratio(*period)
+        if not (abs(expected - actual) <= 1e-4 or (math.isnan(expected) and math.isnan(actual))):
+            print(f"No saving table, its saving ratio of {period} is {actual:.4f} where get_saving_ratio has {expected:.4f}.")
+            return None
+    return saving_table
+
+
+def build_breakdown_cube(figure_manager, flow_cube: FlowCube):
+    """The flow cube, once its category breakdowns are checked against get_category_breakdown.
+
+    The check breaks down, for the last complete year of defaults.YEARS, the default category and
+    the FullType with the most merchants, which the top CATEGORY_TOP cuts: the merchants, in order,
+    and their values must match. None without a cube, or when the check fails: the 'Spending
+    Detail' table is then asked of the figure manager."""
+    if flow_cube is None or CATEGORY_LABEL not in flow_cube.dimensions:
+        return None
+    years = list(defaults.YEARS)
+    checked_year = years[-2] if len(years) > 1 else years[-1]
+    categories = [defaults.DEFAULT_CATEGORY]
+    rows = flow_cube.year(checked_year)
+    if "FullType" in flow_cube.dimensions and not rows.empty:
+        categories.append(f"Type: {rows.groupby('FullType', observed=True)[CATEGORY_LABEL].nunique().idxmax()}")
+
+    flow_range = get_flow_range(checked_year)
+    for category in categories:
+        category_dict, _ = get_category_filter(category)
+        if any(column not in flow_cube.dimensions for column in category_dict):
+            print(f"No category breakdowns from the flow cube, it has no {list(category_dict)}.")
+            return None
+        expected = figure_manager.get_category_breakdown(category_dict, CATEGORY_LABEL, CATEGORY_TOP, flow_range, None, how=HOW)
+        actual = flow_cube.breakdown(checked_year, category_dict, CATEGORY_LABEL, CATEGORY_TOP)
+        if list(expected.columns) != list(actual.columns) or expected.iloc[:, 0].astype(str).tolist() != actual.iloc[:, 0].astype(str).tolist():
+            print(f"No category breakdowns from the flow cube, its rows of {category} in {checked_year} differ from get_category_breakdown.")
+            return None
+        difference = abs(expected.iloc[:, 1].to_numpy(dtype=float) - actual.iloc[:, 1].to_numpy(dtype=float)).max(initial=0.0)
+        if not difference <= 0.01:  # NaN included
+            print(f"No category breakdowns from the flow cube, its values of {category} in {checked_year} differ from get_category_breakdown by {difference:,.2f}.")
+            return None
+    return flow_cube
+
+
+def build_balance_index(transformation_manager: "TransformationManager", data_manager, market_manager, ref_currency):
+    """The BalanceIndex of the loaded transactions and prices, checked against get_price_comparison_on_dates.
+
+    The check values the year-ends of the first and the last year of defaults.YEARS both ways: the
+    oldest closes and holdings, and the current ones (the bkanalysis call is cached, so it also
+    warms the current year). None when the index cannot be built from the frames, e.g. closes in
+    another currency, or disagrees: the balances are then all read from the transformation manager."""
+    try:
+        index = BalanceIndex.from_frames(main_frame(data_manager), main_frame(market_manager), ref_currency)
+    except (KeyError, TypeError, ValueError) as exc:
+        print(f"No balance index, the balances will be read from the transformation manager: {exc}")
+        return None
+
+    for checked_year in sorted({defaults.YEARS[0], defaults.YEARS[-1]}):
+        value_dates = get_value_dates(checked_year)
+        expected = transformation_manager.get_price_comparison_on_dates(value_dates[0], value_dates[1], True)
+        actual = index.price_comparison(value_dates[0], value_dates[1])
+        # an AccountType missing on one side counts as 0 there
+        difference = expected.groupby(tabs.ACCOUNT_TYPE).sum().sub(actual.groupby(tabs.ACCOUNT_TYPE).sum(), fill_value=0.0).abs().to_numpy().max(initial=0.0)
+        if not difference <= 0.01:  # NaN included
+            print(f"No balance index, its balances of {checked_year} differ from the transformation manager's by {difference:,.2f}.")
+            return None
+    return index
+
+
+def get_price_comparison(loaded: LoadedManagers, value_dates):
+    """The value of each AccountType on the two `value_dates`, from the balance index when there is one."""
+    if loaded.balance_index is not None:
+        return loaded.balance_index.price_comparison(value_dates[0], value_dates[1])
+    return loaded.transformation_manager.get_price_comparison_on_dates(value_dates[0], value_dates[1], True)
+
+
+def build_batch_salary(transformation_manager: "TransformationManager", base_salary):
+    """The BatchSalary of every year of defaults.YEARS, checked against a Salary.
+
+    Reads the payrolls out of the get_flow_values call of build_flow_cube (a result cache hit once
+    that has run). It builds a Salary for the last complete year and for the current one, the default
+    view, whose outstanding salary is still to be paid. The days of January whose pay counts for the
+    previous year are read off those Salaries (BatchSalary.carry_over_days_of), and every public
+    attribute of theirs, the totals, the per-employer dicts, monthly_salaries and payrolls, must
+    match the batch's, since whatever reads the salary (the tab 1 cards, get_figure_waterfall) may
+    read any of them. None when defaults.USE_BATCH_SALARY is off, with the legacy salary class, when
+    a payroll of SALARY_CONFIG has a base_salary (which the batch does not model), or when the
+    check fails: every year then builds its own Salary."""
+    if not defaults.USE_BATCH_SALARY or defaults.USE_LEGACY_SALARY_CLASS:
+        return None
+    with_base_salary = [employer for employer, config in defaults.SALARY_CONFIG.items() if config.get("base_salary") is not None]
+    if with_base_salary:
+        print(f"No batch salary, it does not model the base_salary of {with_base_salary}.")
+        return None
+    years = list(defaults.YEARS)
+    df_flows = transformation_manager.get_flow_values(datetime(years[0], 1, 1), datetime(years[-1], 12, 31), None, how=HOW, include_iat=False)
+    salaries = {checked_year: build_salary(transformation_manager, base_salary, checked_year) for checked_year in years[-2:]}
+    try:
+        carry_over_days = BatchSalary.carry_over_days_of(df_flows, salaries, defaults.SALARY_CONFIG, defaults.EXCLUDE_DEFAULT)
+        batch_salary = BatchSalary.from_flows(df_flows, defaults.SALARY_CONFIG, defaults.EXCLUDE_DEFAULT, carry_over_days)
+    except (KeyError, ValueError) as exc:
+        print(f"No batch salary, each year will build its own: {exc}")
+        return None
+
+    for checked_year, expected in salaries.items():
+        differences = salary_differences(expected, batch_salary.year(checked_year))
+        if differences:
+            print(f"No batch salary, its {differences} of {checked_year} differ from Salary's.")
+            return None
+    return batch_salary
+
+
+def build_year_context(
+    transformation_manager: "TransformationManager", base_salary, selected_year, flow_cube: FlowCube = None, batch_salary: BatchSalary = None
+) -> YearContext:
+    """Compute everything the tab callbacks share for one year.
+
+    Each of these re-scans the full history, so they are computed here once and read by every tab
+    instead of once per callback. The flows are sliced out of `flow_cube` when there is one (see
+    build_flow_cube), aggregated by month and category, which is all the tabs sum them by, and the
+    salary out of `batch_salary` likewise (see build_batch_salary). Wrap in a YearContextStore rather
+    than calling it directly."""
+    flow_range = get_flow_range(selected_year)
+
+    if flow_cube is not None:
+        df_total_flow = flow_cube.year(selected_year)
+    else:
         df_total_flow = transformation_manager.get_flow_values(flow_range[0], flow_range[1], None, how=HOW, include_iat=False)
-        df_total_spend = df_total_flow[~df_total_flow.FullType.isin(defaults.INCOME_TYPES)]
-        total_spend = df_total_spend.Value.sum()
+    df_total_spend = df_total_flow[~df_total_flow.FullType.isin(defaults.INCOME_TYPES)]
+
+    # IAT legs are excluded from every flow-based figure but still move the balances, so any
+    # residual is precisely the amount by which the Tab 1 cards cannot reconcile to each other.
+    iat_imbalance, _ = transformation_manager.get_iat_imbalance(flow_range[0], flow_range[1])
+
+    return YearContext(
+        year=selected_year,
+        flow_range=flow_range,
+        value_dates=get_value_dates(selected_year),
+        df_total_flow=df_total_flow,
+        df_total_spend=df_total_spend,
+        total_spend=df_total_spend.Value.sum(),
+        df_values_by_asset=transformation_manager.get_values_by_asset(flow_range, None),
+        iat_imbalance=iat_imbalance,
+        salary=build_salary(transformation_manager, base_salary, selected_year, batch_salary),
+    )
+
 
-        salary = prepare_salary(selected_year, flow_range)
+def warm_year(loaded: LoadedManagers, selected_year):
+    """Compute, ahead of any click, what the callbacks will need for `selected_year`.
+
+    Makes the same cached calls as the tab callbacks, so that afterwards opening the year on any tab
+    is a hit: tab 1 with the capital gain checkbox as it starts (unticked), tab 2 with the category
+    the dropdown will select."""
+    context = loaded.year_contexts.get(selected_year)
+    categories = get_categories_for_year(loaded, selected_year)
+
+    get_price_comparison(loaded, context.value_dates)
+    loaded.figure_manager.get_figure_timeseries(context.value_dates)
+    get_waterfall(loaded, context, include_capital_gain=False)
+
+    get_spending_sunburst(loaded, context.flow_range)
+    category = reconcile_category(categories, None)
+    if category is not None:
+        get_category_figures(loaded, category, context.flow_range)
+
+    get_capital_gain(loaded, context.flow_range)
+    get_saving_rate_figures(loaded, selected_year)
+
+
+def register_callbacks(app, managers: ManagerLoader, background=False):
+    """registers the callbacks of the dash app, and returns them keyed by name for profiling/tests
+
+    Only the open tab is computed (see should_render); the others wait until they are opened, and are
+    recomputed once the data has been reloaded (the version of the managers is part of their key). The
+    managers load in the background while the layout renders: each callback waits for them
+    (under the loading overlay) on its first run. Their year_contexts store (see build_year_context) is
+    shared, so the callbacks for one year change all read the same flow frames, IAT imbalance and
+    salary instead of recomputing them. Everything else goes through the result cache installed on
+    the transformation manager by initialize_managers, so repeated calls here are cheap.
+
+    Changing the year supersedes the calls still computing the previous one for the same browser
+    session (see src.generations): they abort between phases rather than finishing unseen.
+
+    Every callback is timed by METRICS (served at /metrics), with the layout building of the tabs
+    timed apart from the data it renders. With `background`, the callbacks computing the tabs build
+    the year context in the server process and render in background jobs (see tab_callback): the
+    timings of the rendering are then recorded in the job's process, and do not reach /metrics."""
+
+    generations = GenerationTracker()
+
+    @tab_callback(
+        app,
+        background,
+        "tab1",
+        [
+            Output("tab1-cards", "children"),
+            Output("tab1-iat-banner", "children"),
+            Output("tab1-wealth", "figure"),
+            Output("tab1-accounts", "children"),
+            Output("tab1-rendered", "data"),
+        ],
+        [Input("year-dropdown", "value"), Input("tabs", "value")],
+        [State("tab1-rendered", "data"), State("session-id", "data")],
+    )
+    @METRICS.instrument
+    def update_tab_1(selected_year, active_tab, rendered_key, session_id=None, progress=no_progress, prepare_only=False):
+        """Callback to update the 'Wealth Breakdown' tab, but for the waterfall (see update_waterfall)."""
+        generation = generations.begin(session_id, selected_year)
+        key = [selected_year, managers.version]
+        if not should_render("tab1", active_tab, key, rendered_key):
+            raise exceptions.PreventUpdate
+        phase = phases(generation, progress)
+        phase("Loading the data…")
+        loaded = managers.get()
+        phase(f"Computing the flows and salary of {selected_year}…")
+        context = loaded.year_contexts.get(selected_year)
+        value_dates = context.value_dates
+        df_cash_account_type = get_price_comparison(loaded, value_dates)
+        if prepare_only:
+            return None
+
+        phase("Building the figures…")
+
+        total_value_start = df_cash_account_type[f"{value_dates[0].date():%b-%y}"].sum()
+        total_value_end = df_cash_account_type[f"{value_dates[1].date():%b-%y}"].sum()
+        df_total_flow = context.df_total_flow
+        salary = context.salary
 
         # These FullTypes are excluded from both total_spend and Received Salary above; sum them,
         # along with the Outstanding Salary, into a single card so no flow is invisible to the
@@ -111,123 +602,164 @@ def register_callbacks(
             + salary.outstanding_salary
         )
 
-        capital_pnl = transformation_manager.get_values_by_asset(flow_range, None).CapitalGain.sum()
+        # the wealth chart is anchored on the opening balance so it lines up with the YoY card
+        fig_wealth = slim_figure(loaded.figure_manager.get_figure_timeseries(value_dates))
 
-        # IAT legs are excluded from every flow-based figure but still move the balances, so any
-        # residual is precisely the amount by which the cards above cannot reconcile to each other.
-        iat_imbalance, _ = transformation_manager.get_iat_imbalance(flow_range[0], flow_range[1])
+        generation.check()
+        with METRICS.layout():
+            cards = tabs.get_tab_1_cards(total_value_end, total_value_start, salary, context.total_spend, context.capital_pnl, other_income)
+            iat_warning = tabs.get_iat_warning(context.iat_imbalance)
+            account_table = tabs.get_account_type_table(df_cash_account_type)
+        return cards, iat_warning, fig_wealth, account_table, key
 
-        fig_spend_waterfall = figure_manager.get_figure_waterfall(flow_range, salary_override=salary, include_capital_gain=include_capital_gain)
+    @app.callback(
+        [Output("tab1-waterfall", "figure"), Output("tab1-waterfall-rendered", "data")],
+        [Input("year-dropdown", "value"), Input("capital-gain-checkbox", "value"), Input("tabs", "value")],
+        State("tab1-waterfall-rendered", "data"),
+    )
+    @METRICS.instrument
+    def update_waterfall(selected_year, include_capital_gain, active_tab, rendered_key):
+        """Callback to update the waterfall of the 'Wealth Breakdown' tab.
 
-        # the wealth chart is anchored on the opening balance so it lines up with the YoY card
-        fig_wealth = figure_manager.get_figure_timeseries(value_dates)
-
-        return tabs.get_tab_1(
-            df_cash_account_type,
-            total_value_end,
-            total_value_start,
-            salary,
-            total_spend,
-            capital_pnl,
-            fig_spend_waterfall,
-            fig_wealth,
-            iat_imbalance,
-            other_income,
-        )
+        The only part of the tab depending on the capital gain checkbox: toggling it builds this one
+        figure, from the year context the rest of the tab already computed. It always runs in the
+        server process, where that context is kept, even with background callbacks."""
+        include_capital_gain = "include_capital_gain" in include_capital_gain  # Convert the list to a boolean
+        key = [selected_year, include_capital_gain, managers.version]
+        if not should_render("tab1", active_tab, key, rendered_key):
+            raise exceptions.PreventUpdate
+        loaded = managers.get()
+        context = loaded.year_contexts.get(selected_year)
 
-    def prepare_salary(selected_year, date_range):
-        """Prepare the salary object for the selected year (cached per year)."""
-        if selected_year not in salary_cache:
-            salary_cache[selected_year] = build_salary(selected_year, date_range)
-        return salary_cache[selected_year]
-
-    def build_salary(selected_year, date_range):
-        """Build the salary object for the selected year."""
-
-        if defaults.USE_LEGACY_SALARY_CLASS:
-            return SalaryLegacy(
-                transformation_manager,
-                date_range[1].year,
-                datetime(selected_year - 1, 1, 1),
-                base_salary[selected_year],
-                defaults.DEFAULT_PAYROLLS_1.copy(),
-                defaults.BASE_PAYROLL_1,
-                None,
-                defaults.DEFAULT_PAYROLLS_2.copy(),
-                defaults.BASE_PAYROLL_2,
-                defaults.EXCLUDE_DEFAULT.copy(),
-            )
-
-        return Salary(
-            transformation_manager,
-            date_range[1].year,
-            datetime(selected_year - 1, 1, 1),
-            defaults.SALARY_CONFIG,
-            defaults.EXCLUDE_DEFAULT.copy(),
+        return (
+            slim_figure(get_waterfall(loaded, context, include_capital_gain)),
+            key,
         )
 
-    def prepare_categories(selected_year):
-        """Category options for the selected year (cached per year)."""
-        if selected_year not in category_cache:
-            category_cache[selected_year] = get_categories_for_year(transformation_manager, selected_year)
-        return category_cache[selected_year]
-
     @app.callback(
         [Output("category-dropdown", "options"), Output("category-dropdown", "value")],
         Input("year-dropdown", "value"),
         State("category-dropdown", "value"),
     )
+    @METRICS.instrument
     def update_category_options(selected_year, current_category):
         """Rebuild the category dropdown whenever the year changes.
 
-        get_all_categories drops anything below THRESHOLD, so the material categories differ from
+        The categories below THRESHOLD are dropped, so the material categories differ from
         year to year. Options built once for the default year would let the user pick a category
         with no data in the selected year (tab 2 renders empty) and hide ones that do have data."""
-        categories = prepare_categories(selected_year)
+        loaded = managers.get()
+        categories = get_categories_for_year(loaded, selected_year)
         return [{"label": category, "value": category} for category in categories], reconcile_category(categories, current_category)
 
-    @app.callback(
-        Output("tab2", "children"),
-        [Input("year-dropdown", "value"), Input("category-dropdown", "value")],
+    @tab_callback(
+        app,
+        background,
+        "tab2",
+        [Output("tab2", "children"), Output("tab2-rendered", "data")],
+        [Input("year-dropdown", "value"), Input("category-dropdown", "value"), Input("tabs", "value")],
+        [State("tab2-rendered", "data"), State("session-id", "data")],
     )
-    def update_tab_2(selected_year, category):
+    @METRICS.instrument
+    def update_tab_2(selected_year, category, active_tab, rendered_key, session_id=None, progress=no_progress, prepare_only=False):
         """Callback to update the 'Spending Detail' tab."""
+        generation = generations.begin(session_id, selected_year)
+        key = [selected_year, category, managers.version]
+        # the dropdown starts empty while the managers load; update_category_options fills it
+        if category is None or not should_render("tab2", active_tab, key, rendered_key):
+            raise exceptions.PreventUpdate
+        phase = phases(generation, progress)
+        phase("Loading the data…")
+        loaded = managers.get()
         flow_range = get_flow_range(selected_year)
 
-        fig_spend_brkdn = figure_manager.get_figure_sunburst(
-            flow_range,
-            None,
-            include_iat=False,
-            how=HOW,
-            exclude_types=defaults.INCOME_TYPES,
-        )
+        phase(f"Computing the spending of {selected_year}…")
 
-        df_total_flow = transformation_manager.get_flow_values(flow_range[0], flow_range[1], None, how=HOW, include_iat=False)
-        df_total_spend = df_total_flow[~df_total_flow.FullType.isin(defaults.INCOME_TYPES)]
-        total_spend = df_total_spend.Value.sum()
+        total_spend = loaded.year_contexts.get(selected_year).total_spend
+        if prepare_only:
+            return None
+
+        fig_spend_brkdn = get_spending_sunburst(loaded, flow_range)
 
-        # Category names come from the data and may themselves contain ": ", so only the first
-        # separator delimits the key.
-        category_key, category_value = category.split(": ", 1)
-        category_dict = {f"Full{category_key}": category_value}
-        label = "MemoMapped"
+        phase(f"Breaking {category} down…")
 
-        df_category_brkdn = figure_manager.get_category_breakdown(category_dict, label, 10, flow_range, None, how=HOW)
-        fig_category_brkdn = figure_manager.get_figure_bar(category_dict, label, None, flow_range, how=HOW)
+        category_value, df_category_brkdn, fig_category_brkdn = get_category_figures(loaded, category, flow_range)
 
-        return tabs.get_tab_2(total_spend, category_value, fig_category_brkdn, fig_spend_brkdn, df_category_brkdn)
+        generation.check()
+        with METRICS.layout():
+            return tabs.get_tab_2(total_spend, category_value, fig_category_brkdn, fig_spend_brkdn, df_category_brkdn), key
 
     @app.callback(
-        Output("tab3", "children"),
-        [Input("year-dropdown", "value")],
+        [Output("category_tbl", "data"), Output("category_tbl", "page_count"), Output("category_tbl", "page_current")],
+        [
+            Input("category_tbl", "page_current"),
+            Input("category_tbl", "page_size"),
+            Input("category_tbl", "sort_by"),
+            Input("category_tbl", "filter_query"),
+        ],
+        [State("year-dropdown", "value"), State("category-dropdown", "value")],
+        prevent_initial_call=True,  # the first page comes with the tab, see tabs.get_tab_2
     )
-    def update_tab_3(selected_year):
+    @METRICS.instrument
+    def update_category_page(page_current, page_size, sort_by, filter_query, selected_year, category):
+        """Callback serving the page of the 'Spending Detail' table the user moved to, sorted and filtered."""
+        loaded = managers.get()
+        category_dict, _ = get_category_filter(category)
+        df_category_brkdn = get_category_breakdown(loaded, category_dict, get_flow_range(selected_year))
+        page, page_count, page_current = query_table(df_category_brkdn, filter_query, sort_by, page_current, page_size)
+        return table_records(page), page_count, page_current
+
+    @tab_callback(
+        app,
+        background,
+        "tab3",
+        [Output("tab3", "children"), Output("tab3-rendered", "data")],
+        [Input("year-dropdown", "value"), Input("tabs", "value")],
+        [State("tab3-rendered", "data"), State("session-id", "data")],
+    )
+    @METRICS.instrument
+    def update_tab_3(selected_year, active_tab, rendered_key, session_id=None, progress=no_progress, prepare_only=False):
         """Callback to update the 'Capital Gain Breakdown' tab"""
+        generation = generations.begin(session_id, selected_year)
+        key = [selected_year, managers.version]
+        if not should_render("tab3", active_tab, key, rendered_key):
+            raise exceptions.PreventUpdate
+        phase = phases(generation, progress)
+        phase("Loading the data…")
+        loaded = managers.get()
         flow_range = get_flow_range(selected_year)
+        if prepare_only:  # the capital gain is all figure: nothing for the server to keep
+            return None
+
+        phase(f"Computing the capital gain of every asset in {selected_year}…")
+
+        df_capital, fig_capital_default = get_capital_gain(loaded, flow_range)
 
-        df_capital, fig_capital_default = figure_manager.get_capital_gain_brkdn(date_range=flow_range)
+        generation.check()
+        with METRICS.layout():
+            return tabs.get_tab_3(df_capital.reset_index(), fig_capital_default), key
+
+    @app.callback(
+        [Output("capital_tbl", "data"), Output("capital_tbl", "page_count"), Output("capital_tbl", "page_current")],
+        [
+            Input("capital_tbl", "page_current"),
+            Input("capital_tbl", "page_size"),
+            Input("capital_tbl", "sort_by"),
+            Input("capital_tbl", "filter_query"),
+        ],
+        State("year-dropdown", "value"),
+        prevent_initial_call=True,  # the first page comes with the tab, see tabs.get_tab_3
+    )
+    @METRICS.instrument
+    def update_capital_page(page_current, page_size, sort_by, filter_query, selected_year):
+        """Callback serving the page of the 'Capital Gain Breakdown' table the user moved to, sorted and filtered.
 
-        return tabs.get_tab_3(df_capital.reset_index(), fig_capital_default)
+        The year's breakdown is a result cache hit (see FIGURE_MANAGER_METHODS): only the page is
+        serialised, where a natively paged table would hold every asset in the browser."""
+        loaded = managers.get()
+        df_capital = get_capital_gain(loaded, get_flow_range(selected_year))[0].reset_index()
+        page, page_count, page_current = query_table(df_capital, filter_query, sort_by, page_current, page_size)
+        return table_records(page, columns_decimals=tabs.capital_table_decimals(df_capital)), page_count, page_current
 
     @app.callback(
         Output("capital_fig", "figure"),
@@ -235,53 +767,96 @@ def register_callbacks(
         State("capital_tbl", "derived_virtual_indices"),
         State("year-dropdown", "value"),
     )
+    @METRICS.instrument
     def update_capital(active_cell, derived_virtual_indices, selected_year):
         """Callback to re-plot the 'Capital Gain Breakdown' chart for the clicked asset."""
         if not active_cell:
             # no click yet -> do not change graph
             raise exceptions.PreventUpdate
+        loaded = managers.get()
 
         flow_range = get_flow_range(selected_year)
-        # active_cell["row"] is a position in the rendered rows, while row_idx_to_plot indexes the
-        # freshly computed frame in its original order. They only coincide while the table is
-        # neither sorted nor filtered; derived_virtual_indices maps the view position back.
-        row_idx = resolve_row_index(active_cell["row"], derived_virtual_indices)
-
-        # re-build plot base on the new selected row
-        fig = figure_manager.get_capital_gain_brkdn(date_range=flow_range, row_idx_to_plot=row_idx)[1]
-        return fig
-
-    @app.callback(
-        Output("tab4", "children"),
-        [Input("year-dropdown", "value")],
+        # active_cell["row"] is a position in the rendered page, while row_idx_to_plot indexes the
+        # freshly computed frame in its original order: the row's id (its source index, see
+        # query_table) maps it back.
+        row_idx = resolve_row_index(active_cell["row"], derived_virtual_indices, active_cell.get("row_id"))
+
+        # The breakdown is cached per year and row (see FIGURE_MANAGER_METHODS): clicking back on a
+        # row is a hit, and only the traces of the new row are sent.
+        fig = loaded.figure_manager.get_capital_gain_brkdn(date_range=flow_range, row_idx_to_plot=row_idx)[1]
+        return capital_figure_patch(fig)
+
+    @tab_callback(
+        app,
+        background,
+        "tab4",
+        [Output("tab4", "children"), Output("tab4-rendered", "data")],
+        [Input("year-dropdown", "value"), Input("tabs", "value")],
+        [State("tab4-rendered", "data"), State("session-id", "data")],
     )
-    def update_tab_4(selected_year):
+    @METRICS.instrument
+    def update_tab_4(selected_year, active_tab, rendered_key, session_id=None, progress=no_progress, prepare_only=False):
         """Callback to update the 'Saving Rate' tab"""
-        flow_range = get_flow_range(selected_year)
-
-        last_month_year, last_month = previous_month(selected_year, datetime.today().month)
-        prev_month_year, prev_month = previous_month(last_month_year, last_month)
-
-        saving_ratio_annual = figure_manager.get_saving_rate_gauge(
-            figure_manager.get_saving_ratio(selected_year) * 100,
-            figure_manager.get_saving_ratio(selected_year - 1) * 100,
-            f"Saving Rate for Year {selected_year} (vs previous year)",
-        )
-        saving_ratio_monthly = figure_manager.get_saving_rate_gauge(
-            figure_manager.get_saving_ratio(last_month_year, last_month) * 100,
-            figure_manager.get_saving_ratio(prev_month_year, prev_month) * 100,
-            f"Saving Rate for Month {last_month_year}-{last_month:02d} (vs previous month)",
-        )
+        generation = generations.begin(session_id, selected_year)
+        key = [selected_year, managers.version]
+        if not should_render("tab4", active_tab, key, rendered_key):
+            raise exceptions.PreventUpdate
+        phase = phases(generation, progress)
+        phase("Loading the data…")
+        loaded = managers.get()
+        if prepare_only:  # the saving rates are read from the load-time saving table, or are figures
+            return None
+        phase(f"Computing the saving rates of {selected_year}…")
+        saving_ratio_annual, saving_ratio_monthly, income_vs_expenses, rolling_saving_rate = get_saving_rate_figures(loaded, selected_year)
 
-        income_vs_expenses = figure_manager.get_income_vs_expenses(flow_range, True, True)
+        generation.check()
+        with METRICS.layout():
+            return tabs.get_tab_4(income_vs_expenses, saving_ratio_annual, saving_ratio_monthly, rolling_saving_rate), key
 
-        return tabs.get_tab_4(income_vs_expenses, saving_ratio_annual, saving_ratio_monthly)
+    register_clientside_callbacks(app)
 
     return {
         "update_tab_1": update_tab_1,
+        "update_waterfall": update_waterfall,
         "update_tab_2": update_tab_2,
         "update_tab_3": update_tab_3,
         "update_tab_4": update_tab_4,
         "update_capital": update_capital,
+        "update_capital_page": update_capital_page,
+        "update_category_page": update_category_page,
         "update_category_options": update_category_options,
     }
+
+
+def register_clientside_callbacks(app):
+    """registers the callbacks that run in the browser (assets/clientside.js)
+
+    These only re-present what the page already holds (the capital table rows, the sunburst
+    figure, the theme) or name the browser session, so they never reach the server."""
+    app.clientside_callback(
+        ClientsideFunction(namespace="webapp", function_name="highlight_row"),
+        Output("capital_tbl", "style_data_conditional"),
+        Input("capital_tbl", "active_cell"),
+        State("capital_tbl", "derived_virtual_data"),
+        State("capital_tbl", "style_data_conditional"),
+        prevent_initial_call=True,
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace="webapp", function_name="set_sunburst_depth"),
+        Output("fig_spend_brkdn", "figure"),
+        Input("sunburst-depth", "value"),
+        State("fig_spend_brkdn", "figure"),
+        prevent_initial_call=True,
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace="webapp", function_name="session_id"),
+        Output("session-id", "data"),
+        Input("session-id", "storage_type"),  # never changes: fires once, when the page loads
+        State("session-id", "data"),
+    )
+    app.clientside_callback(
+        ClientsideFunction(namespace="webapp", function_name="apply_theme"),
+        Output("theme", "data"),
+        Input("dark-mode-switch", "value"),
+        State("theme", "data"),
+    )
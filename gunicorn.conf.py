@@ -0,0 +1,52 @@
+"""gunicorn settings for serving the app in production: `gunicorn -c gunicorn.conf.py app:server`.
+
+`python app.py` runs Flask's development server in a single process, where one slow callback holds
+the GIL for everyone. Here the requests are spread over pre-forked worker processes. The master
+loads the managers once, before forking (see app.ServerHooks), so the workers share the
+frames copy-on-write rather than each holding its own copy, and share derived results through the
+on-disk snapshot store (src/snapshot_store.py). New data is reloaded by the master as well, which
+then re-forks the workers from it (see on_reload).
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8050')}"
+
+# One process per core by default: the callbacks are CPU-bound pandas work. WEB_CONCURRENCY is the
+# variable gunicorn itself honours.
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+# A few threads per worker keep the cheap requests (assets, clientside-only renders, /metrics)
+# flowing while a callback computes.
+threads = int(os.getenv("WEB_THREADS", "2"))
+
+# Import the app in the master, so that it can load the data before the fork.
+preload_app = True
+
+# A cold year can take a while to compute on a large history; gunicorn's default 30s would kill it.
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+
+
+def when_ready(server):
+    """Load the data (and warm the years) in the master, before any worker is forked.
+
+    The master is already listening: requests queue up until the workers start."""
+    import app
+
+    server.log.info("Loading the managers before forking %s workers", workers)
+    app.hooks.preload()
+
+
+def post_fork(server, worker):
+    """In each worker: leave the reloads of the data to the master."""
+    import app
+
+    app.hooks.worker_forked(server.pid)
+
+
+def on_reload(server):
+    """On SIGHUP, sent by the worker that noticed new inputs or by /admin/reload: reload the data in
+    the master, before gunicorn forks the new workers from it and retires the old ones."""
+    import app
+
+    server.log.info("Reloading the managers before re-forking %s workers", workers)
+    app.hooks.reload_in_master()
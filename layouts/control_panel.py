@@ -4,8 +4,11 @@ from dash import dcc, html
 from src import defaults
 
 
-def get_control_panel(default_year, categories, default_category):
-    """generates the control panel of the app"""
+def get_control_panel(default_year, categories, default_category, dark_mode=False, themes=None):
+    """generates the control panel of the app
+
+    dark_mode is the theme the server renders with. themes holds the stylesheet and figure template
+    of the "light" and "dark" themes, which the switch swaps in the browser."""
     return dbc.Row(
         dbc.Col(
             dbc.Card(
@@ -58,7 +61,15 @@ def get_control_panel(default_year, categories, default_category):
                                         style={"width": "300px"},  # Larger width for longer categories
                                     ),
                                 ],
-                                className="d-flex align-items-center",  # Align items
+                                className="d-flex align-items-center me-4",  # Align and space
+                            ),
+                            # Theme switch, handled client-side (apply_theme in assets/clientside.js)
+                            html.Div(
+                                [
+                                    dbc.Switch(id="dark-mode-switch", label="Dark mode", value=dark_mode, persistence=True, className="fw-bold"),
+                                    dcc.Store(id="theme", data={"server_dark": dark_mode, **(themes or {})}),
+                                ],
+                                className="d-flex align-items-center mt-1",  # Align items
                             ),
                         ],
                         className="d-flex justify-content-center align-items-center",  # Align items horizontally and center
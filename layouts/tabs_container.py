@@ -1,6 +1,8 @@
 # tabs.py
 import dash_bootstrap_components as dbc
-from dash import dcc
+from dash import dcc, html
+
+import tabs
 
 TAB_BORDER = "1px solid #d6d6d6"
 
@@ -24,19 +26,50 @@ tab_selected_style = {
 }
 
 
+TABS = {
+    "tab1": "Tab 1: Wealth Breakdown",
+    "tab2": "Tab 2: Spending Details",
+    "tab3": "Tab 3: Capital PnL Breakdown",
+    "tab4": "Tab 4: Saving Rate",
+}
+DEFAULT_TAB = "tab1"
+
+
 def get_tabs():
-    """generate the container for the apps' tabs"""
+    """generate the container for the apps' tabs
+
+    Each tab's value is its id, so callbacks can tell which one is showing from `tabs.value`. The
+    `<tab>-rendered` stores remember what each tab's content was last computed for, so a tab is
+    only recomputed when it is open and out of date (see callbacks.should_render). The `<tab>-request`
+    stores hand a tab computed in the background over to its job, and the `<tab>-progress` lines show
+    what the job is busy with (see callbacks.tab_callback)."""
     return dbc.Row(
         dbc.Col(
-            dcc.Tabs(
-                [
-                    dcc.Tab(label="Tab 1: Wealth Breakdown", id="tab1", style=tab_style, selected_style=tab_selected_style),
-                    dcc.Tab(label="Tab 2: Spending Details", id="tab2", style=tab_style, selected_style=tab_selected_style),
-                    dcc.Tab(label="Tab 3: Capital PnL Breakdown", id="tab3", style=tab_style, selected_style=tab_selected_style),
-                    dcc.Tab(label="Tab 4: Saving Rate", id="tab4", style=tab_style, selected_style=tab_selected_style),
-                ],
-                style=tabs_styles,  # Adjusted margin
-            ),
+            [
+                dcc.Tabs(
+                    [
+                        # Tab 1 is a static skeleton whose parts are filled separately (see tabs.get_tab_1);
+                        # the other tabs are replaced whole by their callbacks.
+                        dcc.Tab(
+                            tabs.get_tab_1() if tab == "tab1" else None,
+                            label=label,
+                            id=tab,
+                            value=tab,
+                            style=tab_style,
+                            selected_style=tab_selected_style,
+                        )
+                        for tab, label in TABS.items()
+                    ],
+                    id="tabs",
+                    value=DEFAULT_TAB,
+                    style=tabs_styles,  # Adjusted margin
+                ),
+                *[html.Div(id=f"{tab}-progress", className="text-muted small mt-2") for tab in TABS],
+                *[dcc.Store(id=f"{tab}-rendered") for tab in TABS],
+                *[dcc.Store(id=f"{tab}-request") for tab in TABS],
+                # names the browser session, so that a year change can supersede its stale calls
+                dcc.Store(id="session-id", storage_type="session"),
+            ],
             width=12,
         ),
     )
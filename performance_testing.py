@@ -1,39 +1,283 @@
-"""Code to profile the app"""
+"""Benchmarks every callback of the app against a synthetic dataset.
 
-from datetime import datetime
+Each callback returned by register_callbacks is run for every year of defaults.YEARS (tab 2 also
+for a sweep of that year's categories, update_capital for the first rows of the capital table, the
+table page callbacks for a page change and a sort), first on cold caches, straight after loading
+the managers, then on warm ones. Latency (p50/p95/max) and peak allocated memory are reported per
+callback and pass, and compared against a stored baseline:
+
+    python performance_testing.py --save-baseline   # record the baseline on this machine
+    python performance_testing.py                   # compare against it, exit 1 on a regression
+    python performance_testing.py --profile         # also dump a cProfile .prof file of the run
+
+The dataset is generated from a seed (src/synthetic_data.py), so runs are reproducible on any box
+without the real data; --data-path benchmarks a real DATA_PATH instead. Baselines are only
+comparable on the same machine, dataset and options.
+"""
 
+import argparse
+import configparser
 import cProfile
+import gzip
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from dash import Dash, exceptions
+from plotly.io.json import to_json_plotly
+
+from callbacks import register_callbacks
+from src import defaults, snapshot_store
+from src.manager_loader import ManagerLoader
+from src.result_cache import installed_cache
+from src.synthetic_data import SyntheticSpec, write_dataset
+from src.table_query import TABLE_PAGE_SIZE
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+CAPITAL_ROWS = 3  # rows of the capital table clicked per year
+# sort orders applied to the server-side tables, as DataTable reports them
+SORT_BY_ASSET = [{"column_id": "AssetMapped", "direction": "desc"}]
+SORT_BY_VALUE = [{"column_id": "Value", "direction": "asc"}]
+NOISE_FLOOR_MS = 5.0  # p95 differences below this are never reported as regressions
+
+_MB = 1024 * 1024
+
+
+def percentile(samples, fraction):
+    """The `fraction` quantile of `samples`, interpolated between the closest ranks."""
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Recorder:
+    """Collects the latency and allocations of each callback call, per pass."""
+
+    def __init__(self, trace_memory):
+        self.trace_memory = trace_memory
+        self.samples = {}
+
+    def call(self, pass_name, name, callback, *args):
+        """Run `callback(*args)`, recording it under (pass_name, name); returns its result or None."""
+        sample = self.samples.setdefault((pass_name, name), {"ms": [], "mb": [], "bytes": [], "gzip_bytes": [], "prevented": 0, "errors": []})
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = None
+        try:
+            result = callback(*args)
+        except exceptions.PreventUpdate:
+            sample["prevented"] += 1
+        except Exception as exc:  # reported, so a broken scenario shows rather than stopping the run
+            sample["errors"].append(f"{args!r}: {exc!r}")
+        sample["ms"].append((time.perf_counter() - start) * 1000)
+        if self.trace_memory:
+            sample["mb"].append((tracemalloc.get_traced_memory()[1] - traced_before) / _MB)
+        if result is not None:
+            # serialised the way Dash does, after the timing: the payload sent to the browser
+            payload = to_json_plotly(result).encode()
+            sample["bytes"].append(len(payload))
+            sample["gzip_bytes"].append(len(gzip.compress(payload)))
+        return result
+
+    def summary(self):
+        """{callback: {pass: statistics}}, in milliseconds and MB."""
+        results = {}
+        for (pass_name, name), sample in self.samples.items():
+            results.setdefault(name, {})[pass_name] = {
+                "calls": len(sample["ms"]),
+                "p50_ms": round(statistics.median(sample["ms"]), 2),
+                "p95_ms": round(percentile(sample["ms"], 0.95), 2),
+                "max_ms": round(max(sample["ms"]), 2),
+                "peak_alloc_mb": round(max(sample["mb"]), 2) if sample["mb"] else None,
+                "payload_kb": round(statistics.median(sample["bytes"]) / 1024, 1) if sample["bytes"] else None,
+                "gzip_kb": round(statistics.median(sample["gzip_bytes"]) / 1024, 1) if sample["gzip_bytes"] else None,
+                "prevented": sample["prevented"],
+                "errors": sample["errors"],
+            }
+        return results
+
+
+def run_pass(recorder, pass_name, callbacks, years, categories_per_year):
+    """Fire every callback for every year, in the order a user switching years would.
+
+    Each tab callback is called as if its tab were open and not yet rendered, so that it computes:
+    hidden tabs are skipped in the app, which is not what is being measured here."""
+    for year in years:
+        recorder.call(pass_name, "update_tab_1", callbacks["update_tab_1"], year, "tab1", None)
+        # the capital gain checkbox toggled back and forth
+        recorder.call(pass_name, "update_waterfall", callbacks["update_waterfall"], year, [], "tab1", None)
+        recorder.call(pass_name, "update_waterfall", callbacks["update_waterfall"], year, ["include_capital_gain"], "tab1", None)
+
+        options = recorder.call(pass_name, "update_category_options", callbacks["update_category_options"], year, None)
+        categories = [option["value"] for option in options[0]] if options else []
+        for category in categories[:categories_per_year]:
+            recorder.call(pass_name, "update_tab_2", callbacks["update_tab_2"], year, category, "tab2", None)
+            recorder.call(pass_name, "update_category_page", callbacks["update_category_page"], 0, TABLE_PAGE_SIZE, SORT_BY_VALUE, "", year, category)
+
+        recorder.call(pass_name, "update_tab_3", callbacks["update_tab_3"], year, "tab3", None)
+        # the capital table moved to its second page, then sorted by asset
+        recorder.call(pass_name, "update_capital_page", callbacks["update_capital_page"], 1, TABLE_PAGE_SIZE, [], "", year)
+        recorder.call(pass_name, "update_capital_page", callbacks["update_capital_page"], 0, TABLE_PAGE_SIZE, SORT_BY_ASSET, "", year)
+        for row in range(CAPITAL_ROWS):
+            recorder.call(pass_name, "update_capital", callbacks["update_capital"], {"row": row, "column": 0}, None, year)
+
+        recorder.call(pass_name, "update_tab_4", callbacks["update_tab_4"], year, "tab4", None)
+
+
+def run_benchmark(data_path, years, categories_per_year, warm_passes, trace_memory):
+    """Load the managers from `data_path` and time the callbacks on them, cold then warm."""
+    # Imported here: bkanalysis is slow to import, and belongs in the load time reported below.
+    import app_initialisation
+
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    # Pregenerated data is loaded as is, without the bank-file configuration.
+    loaded = app_initialisation.load_managers(
+        defaults.REF_CURRENCY, {year: None for year in defaults.YEARS}, data_path=data_path, config=configparser.ConfigParser()
+    )
+    load_seconds = time.perf_counter() - start
+
+    # The checks of the load-time tables fill the caches with some of what the callbacks read: empty
+    # them, on disk too, so that the first pass is cold.
+    cache = installed_cache(loaded.transformation_manager)
+    if cache is not None:
+        cache.clear()
+        if cache.store is not None:
+            cache.store.clear()
+    loaded.year_contexts.clear()
+
+    # The callbacks are registered on a throwaway app: importing app.py would load the real data.
+    callbacks = register_callbacks(Dash(__name__), ManagerLoader(lambda: loaded))
+
+    recorder = Recorder(trace_memory)
+    run_pass(recorder, "cold", callbacks, years, categories_per_year)
+    for _ in range(warm_passes):
+        run_pass(recorder, "warm", callbacks, years, categories_per_year)
+
+    if trace_memory:
+        tracemalloc.stop()
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "load_seconds": round(load_seconds, 3),
+        "result_cache": cache.stats() if cache is not None else None,
+        "callbacks": recorder.summary(),
+    }
+
+
+def compare_to_baseline(results, baseline, threshold):
+    """The (callback, pass, baseline p95, current p95) whose p95 grew by more than `threshold`."""
+    regressions = []
+    for name, passes in results["callbacks"].items():
+        for pass_name, current in passes.items():
+            reference = baseline.get("callbacks", {}).get(name, {}).get(pass_name)
+            if reference is None:
+                continue
+            before, after = reference["p95_ms"], current["p95_ms"]
+            if after > before * (1 + threshold) and after - before > NOISE_FLOOR_MS:
+                regressions.append((name, pass_name, before, after))
+    return regressions
+
 
-# Importing app runs initialize_managers, which is what the profiled callbacks read from.
-# register_callbacks returns its callbacks keyed by name: they are closures over the managers and
-# are not importable from app's module scope.
-import app
+def print_report(results):
+    print(f"Managers loaded in {results['load_seconds']:.3f}s")
+    print(
+        f"{'callback':<26}{'pass':<6}{'calls':>6}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'peak MB':>9}"
+        f"{'KB':>9}{'gzip KB':>9}{'prevented':>10}{'errors':>7}"
+    )
+    for name, passes in sorted(results["callbacks"].items()):
+        for pass_name in ("cold", "warm"):
+            stats = passes.get(pass_name)
+            if stats is None:
+                continue
+            peak, payload, gzipped = ("-" if stats[key] is None else f"{stats[key]:.1f}" for key in ("peak_alloc_mb", "payload_kb", "gzip_kb"))
+            print(
+                f"{name:<26}{pass_name:<6}{stats['calls']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['max_ms']:>10.1f}"
+                f"{peak:>9}{payload:>9}{gzipped:>9}{stats['prevented']:>10}{len(stats['errors']):>7}"
+            )
+            for error in stats["errors"][:3]:
+                print(f"    {error}")
 
 
-def run_server():
-    """Code to profile goes here"""
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--data-path", help="benchmark this DATA_PATH instead of a synthetic dataset")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic dataset")
+    parser.add_argument("--scale", type=int, default=1, help="size of the synthetic dataset, as a multiple of the default")
+    parser.add_argument("--years", type=int, nargs="+", help="years to benchmark (default: defaults.YEARS)")
+    parser.add_argument("--categories", type=int, default=5, help="categories swept per year on tab 2")
+    parser.add_argument("--warm-passes", type=int, default=3, help="passes over warm caches")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc, which slows every allocation down")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the baseline instead of comparing")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative p95 increase counted as a regression")
+    parser.add_argument("--profile", action="store_true", help="dump a cProfile .prof file of the run")
+    return parser.parse_args(argv)
 
-    app.callbacks["update_tab_2"](2024, "SubType: Grocery")
 
+def main(argv=None):
+    args = parse_args(argv)
+    years = args.years or list(defaults.YEARS)
 
-def run_app_with_profiling():
-    # Create a profiler object
-    profiler = cProfile.Profile()
-    time_stamp = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    profiler = cProfile.Profile() if args.profile else None
+    with tempfile.TemporaryDirectory() as scratch:
+        # The derived-data store of the run goes in the scratch folder, never next to --data-path.
+        snapshot_store.DERIVED_DATA_PATH = os.path.join(scratch, "derived")
+        data_path = args.data_path or write_dataset(scratch, SyntheticSpec(years=tuple(defaults.YEARS), seed=args.seed).scaled(args.scale))
+        if profiler is not None:
+            profiler.enable()
+        results = run_benchmark(data_path, years, args.categories, args.warm_passes, not args.no_memory)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(f"profile_{datetime.now():%Y-%m-%d-%H-%M-%S}.prof")
 
-    # Start profiling
-    profiler.enable()
+    results["options"] = {"data_path": args.data_path, "seed": args.seed, "scale": args.scale, "years": years, "categories": args.categories, "memory": not args.no_memory}
+    print_report(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
 
-    # Run the server in a separate thread
-    run_server()
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}.")
+        return 0
 
-    # After Enter, stop profiling and exit
-    profiler.disable()
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}: run with --save-baseline first.")
+        return 0
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline.get("options") != results["options"]:
+        print("Warning: the baseline was recorded with different options; the comparison is not like for like.")
 
-    profiler.dump_stats(f"profile_{time_stamp}.prof")
+    for name, passes in sorted(results["callbacks"].items()):
+        before = baseline.get("callbacks", {}).get(name, {}).get("warm", {}).get("payload_kb")
+        after = passes.get("warm", {}).get("payload_kb")
+        if before is not None and after is not None and before != after:
+            print(f"Payload {name}: {before:.1f} KB -> {after:.1f} KB against the baseline")
 
-    print("Done profiling.")
+    regressions = compare_to_baseline(results, baseline, args.threshold)
+    for name, pass_name, before, after in regressions:
+        print(f"REGRESSION {name} ({pass_name}): p95 {before:.1f} ms -> {after:.1f} ms")
+    if not regressions:
+        print(f"No p95 regression beyond {args.threshold:.0%} against {args.baseline}.")
+    return 1 if regressions else 0
 
 
 if __name__ == "__main__":
-    run_app_with_profiling()
+    sys.exit(main())
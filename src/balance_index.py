@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Columns of the transactions a holding is keyed by: the balance of each is priced, then summed by AccountType.
+HOLDING_COLUMNS = ("Account", "AccountType", "AssetMapped")
+
+
+def _days(dates) -> np.ndarray:
+    """Dates as int64 day numbers, which binary search compares directly."""
+    return pd.to_datetime(pd.Index(dates)).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+class BalanceIndex:
+    """The quantity of every holding and the close of every asset on any date, found by binary search.
+
+    The transactions are sorted by holding (HOLDING_COLUMNS) then date, along with the running sum
+    of their Amount: the quantity of a holding on a date is the running sum at its last transaction
+    on or before that date, and one searchsorted over the (holding, day) keys finds it for every
+    holding at once. The closes are a dense assets x dates matrix, forward filled, so the closes of
+    every asset on a date are one column, found by one searchsorted over the price dates.
+
+    Valuing every account on a date then costs O(holdings x log transactions), where
+    get_price_comparison_on_dates merges the full history with the prices for each pair of dates.
+    Only that pair is served from here: the wealth time series is still get_figure_timeseries'."""
+
+    def __init__(self, holdings, first_day, span, keys, quantities, price_days, closes):
+        self.holdings = holdings  # one row per holding: HOLDING_COLUMNS and the row of its asset in `closes`
+        self._first_day = first_day
+        self._span = span  # the key of (holding, day) is holding * span + day - first_day + 1
+        self._keys = keys
+        self._quantities = quantities  # running quantity of the holding at each key
+        self._price_days = price_days
+        self._closes = closes  # assets x price days; the reference currency is the row of ones
+
+    @classmethod
+    def from_frames(cls, transactions: pd.DataFrame, prices: pd.DataFrame, ref_currency: str):
+        """The index of the transactions of a DataManager and the closes of a MarketManager.
+
+        Raises ValueError when the balances cannot be valued from these alone: a column is missing,
+        a close is quoted in another currency than `ref_currency`, or an asset held has no close."""
+        missing = [column for column in ("Date", "Amount", *HOLDING_COLUMNS) if column not in transactions.columns]
+        missing += [f"prices.{column}" for column in ("AssetMapped", "Date", "Close", "Currency") if column not in prices.columns]
+        if missing:
+            raise ValueError(f"missing columns {missing}")
+        foreign = set(prices["Currency"].astype(str)) - {ref_currency}
+        if foreign:
+            raise ValueError(f"closes quoted in {sorted(foreign)} would need converting to {ref_currency}")
+
+        closes = prices.assign(AssetMapped=prices["AssetMapped"].astype(str), Date=pd.to_datetime(prices["Date"]))
+        closes = closes.pivot_table(index="AssetMapped", columns="Date", values="Close", aggfunc="last").ffill(axis=1)
+        closes = closes.drop(index=ref_currency, errors="ignore")
+        assets = {asset: row for row, asset in enumerate([ref_currency, *closes.index])}
+        close_matrix = np.vstack([np.ones((1, closes.shape[1])), closes.to_numpy(dtype=float)])
+
+        held = transactions[["Date", "Amount", *HOLDING_COLUMNS]].astype({column: str for column in HOLDING_COLUMNS})
+        days = _days(held["Date"])
+        holdings = held[list(HOLDING_COLUMNS)].drop_duplicates().sort_values(list(HOLDING_COLUMNS)).reset_index(drop=True)
+        unpriced = set(holdings["AssetMapped"]) - set(assets)
+        if unpriced:
+            raise ValueError(f"no close for {sorted(unpriced)}")
+        holdings["Asset"] = holdings["AssetMapped"].map(assets)
+        codes = pd.MultiIndex.from_frame(holdings[list(HOLDING_COLUMNS)]).get_indexer(pd.MultiIndex.from_frame(held[list(HOLDING_COLUMNS)]))
+
+        first_day = int(days.min()) if len(days) else 0
+        span = int(days.max()) - first_day + 2 if len(days) else 1
+        order = np.lexsort((days, codes))
+        codes, days, amounts = codes[order].astype(np.int64), days[order], held["Amount"].to_numpy(dtype=float)[order]
+        # the running sum restarts at each holding: the cumsum, less its value before the holding's first row
+        running = np.cumsum(amounts)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.array([], dtype=np.int64)
+        before = np.r_[0.0, running[starts[1:] - 1]] if len(codes) else np.array([])
+        quantities = running - np.repeat(before, np.diff(np.r_[starts, len(codes)]))
+        keys = codes * span + (days - first_day + 1)
+        return cls(holdings, first_day, span, keys, quantities, _days(closes.columns), close_matrix)
+
+    def quantities_on(self, date) -> np.ndarray:
+        """The quantity of each holding at the end of `date`, in the order of `holdings`."""
+        codes = np.arange(len(self.holdings), dtype=np.int64)
+        # 0, before any transaction, up to span - 1, after the last: always within the holding's own keys
+        offset = int(np.clip(_days([date])[0] - self._first_day + 1, 0, self._span - 1))
+        positions = np.searchsorted(self._keys, codes * self._span + offset, side="right") - 1
+        found = np.maximum(positions, 0)
+        held = (positions >= 0) & (self._keys[found] // self._span == codes)
+        return np.where(held, self._quantities[found], 0.0)
+
+    def closes_on(self, date) -> np.ndarray:
+        """The last close on or before `date` of each asset (NaN before its first), by asset row."""
+        column = np.searchsorted(self._price_days, _days([date])[0], side="right") - 1
+        if column >= 0:
+            return self._closes[:, column]
+        return np.r_[1.0, np.full(len(self._closes) - 1, np.nan)]
+
+    def _values_on(self, date) -> pd.Series:
+        """The value of the holdings on `date` summed by AccountType; a holding without a close yet counts for nothing."""
+        value = self.quantities_on(date) * self.closes_on(date)[self.holdings["Asset"].to_numpy()]
+        return pd.Series(np.nan_to_num(value), index=self.holdings.index).groupby(self.holdings["AccountType"]).sum()
+
+    def price_comparison(self, start_date, end_date) -> pd.DataFrame:
+        """The value of each AccountType on the two dates: the frame of get_price_comparison_on_dates(start_date, end_date, True)."""
+        values = pd.concat([self._values_on(date) for date in (start_date, end_date)], axis=1)
+        values.columns = [f"{pd.Timestamp(date):%b-%y}" for date in (start_date, end_date)]
+        return values.reset_index()
@@ -0,0 +1,151 @@
+from datetime import date, datetime
+from numbers import Number
+
+import numpy as np
+import pandas as pd
+
+from src import defaults
+
+
+# The totals of a salary, each the sum of the per-employer dict of the same name in the plural.
+SALARY_TOTALS = ("total_received_salary", "total_received_salary_from_previous_year", "actual_salary", "outstanding_salary")
+
+
+class YearSalary:
+    """The salary of one year, with the attributes of bkanalysis' Salary.
+
+    Those read by the tab 1 cards and by get_figure_waterfall(salary_override=...), and asserted by
+    the salary tests: anchor_date, payrolls, monthly_salaries and SALARY_TOTALS, each per employer
+    of the salary config (`*_salaries`) and summed (`*_salary`):
+    - total_received: the payroll received during the year,
+    - from_previous_year: the part of it that was the previous year's pay,
+    - actual: the year's own pay received during it, total_received less from_previous_year,
+    - outstanding: the year's pay received the year after.
+    callbacks.build_batch_salary checks every public attribute of a Salary against these."""
+
+    def __init__(self, year, payrolls, received, monthly):
+        self.year = year
+        self.anchor_date = datetime(year - 1, 1, 1)
+        self.payrolls = payrolls
+        self.total_received_salaries = received["total_received"]
+        self.total_received_salaries_from_previous_year = received["from_previous_year"]
+        self.actual_salaries = received["actual"]
+        self.outstanding_salaries = received["outstanding"]
+        self.total_received_salary = float(sum(self.total_received_salaries.values()))
+        self.total_received_salary_from_previous_year = float(sum(self.total_received_salaries_from_previous_year.values()))
+        self.actual_salary = float(sum(self.actual_salaries.values()))
+        self.outstanding_salary = float(sum(self.outstanding_salaries.values()))
+        self.monthly_salaries = monthly
+
+
+class BatchSalary:
+    """The salary of every year, from a single grouping of the payroll flows of the full history.
+
+    Each Salary scans the flow history for the payrolls of the salary config, once per year. Here
+    each payroll flow is tagged with its employer and the year it is pay for (the previous one when
+    received in the first `carry_over_days` of January: December's pay, in arrears), and summed by
+    employer, year received, year of pay and month in one groupby. The salary of a year is then read
+    from that table. `carry_over_days` is not a setting: carry_over_days_of reads it off Salaries."""
+
+    def __init__(self, table, employers, payrolls):
+        self._table = table  # Value by Employer, Received (year), PayYear, PayMonth
+        self.employers = employers
+        self.payrolls = payrolls
+
+    @staticmethod
+    def _payroll_flows(df_flows: pd.DataFrame, salary_config, exclude):
+        """The dates, employers and values of the payroll flows of `df_flows`, and the payrolls."""
+        employer_of = {payroll: employer for employer, config in salary_config.items() for payroll in config["payrolls"] if payroll not in exclude}
+        if "Date" in df_flows.columns:
+            dates = pd.to_datetime(df_flows["Date"])
+        elif isinstance(df_flows.index, pd.DatetimeIndex):
+            dates = df_flows.index.to_series(index=df_flows.index)
+        else:
+            raise ValueError(f"the flows have no dates to attribute the pay by (columns: {list(df_flows.columns)})")
+
+        employers = df_flows["MemoMapped"].astype(str).map(employer_of)
+        paid = employers.notna().to_numpy()
+        return dates[paid], employers[paid], df_flows["Value"][paid], sorted(employer_of)
+
+    @classmethod
+    def carry_over_days_of(cls, df_flows: pd.DataFrame, salaries, salary_config=None, exclude=()) -> int:
+        """The days into January whose pay the Salaries `salaries` ({year: Salary}) count for the year before.
+
+        The fewest days for which the payroll received from 1 January adds up to the
+        total_received_salary_from_previous_year of every one of them. Raises ValueError when no
+        number of days does: the Salaries carry pay over by some other rule."""
+        salary_config = defaults.SALARY_CONFIG if salary_config is None else salary_config
+        dates, _, values, _ = cls._payroll_flows(df_flows, salary_config, exclude)
+        days = set(range(32))
+        for year, salary in salaries.items():
+            january = ((dates.dt.year == year) & (dates.dt.month == 1)).to_numpy()
+            by_day = values[january].groupby(dates[january].dt.day.to_numpy()).sum().reindex(range(1, 32), fill_value=0.0)
+            received = np.r_[0.0, by_day.cumsum().to_numpy()]  # received in the first d days, d = 0..31
+            days &= set(np.flatnonzero(np.abs(received - salary.total_received_salary_from_previous_year) <= 0.01).tolist())
+        if not days:
+            raise ValueError(f"the Salaries of {sorted(salaries)} do not carry over the pay of the first days of January")
+        return min(days)
+
+    @classmethod
+    def from_flows(cls, df_flows: pd.DataFrame, salary_config=None, exclude=(), carry_over_days=0):
+        """The batch of the flows of a history, with a `Date` column (or index), `MemoMapped` and `Value`."""
+        salary_config = defaults.SALARY_CONFIG if salary_config is None else salary_config
+        dates, employers, values, payrolls = cls._payroll_flows(df_flows, salary_config, exclude)
+        carried = (dates.dt.month == 1) & (dates.dt.day <= carry_over_days)
+        table = (
+            pd.DataFrame(
+                {
+                    "Employer": employers.to_numpy(),
+                    "Received": dates.dt.year.to_numpy(),
+                    "PayYear": (dates.dt.year - carried).to_numpy(),
+                    "PayMonth": dates.dt.month.where(~carried, 12).to_numpy(),
+                    "Value": values.to_numpy(dtype=float),
+                }
+            )
+            .groupby(["Employer", "Received", "PayYear", "PayMonth"])["Value"]
+            .sum()
+            .reset_index()
+        )
+        return cls(table, list(salary_config), payrolls)
+
+    def year(self, year) -> YearSalary:
+        """The salary of `year`."""
+        table = self._table
+
+        def by_employer(rows):
+            return {employer: float(value) for employer, value in rows.groupby("Employer")["Value"].sum().reindex(self.employers, fill_value=0.0).items()}
+
+        received = table[table.Received == year]
+        own = table[table.PayYear == year]
+        received = {
+            "total_received": by_employer(received),
+            "from_previous_year": by_employer(received[received.PayYear < year]),
+            "actual": by_employer(own[own.Received == year]),
+            "outstanding": by_employer(own[own.Received > year]),
+        }
+        months = pd.RangeIndex(1, 13, name="Month")
+        monthly = {employer: rows.groupby("PayMonth")["Value"].sum().reindex(months, fill_value=0.0) for employer, rows in own.groupby("Employer")}
+        return YearSalary(year, list(self.payrolls), received, monthly)
+
+
+def _same(expected, actual, tolerance) -> bool:
+    """Whether two values of a salary attribute agree: numbers within `tolerance`, collections item by item."""
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return set(expected) == set(actual) and all(_same(expected[key], actual[key], tolerance) for key in expected)
+    if isinstance(expected, (pd.Series, pd.DataFrame, np.ndarray, list, tuple)) and isinstance(actual, (pd.Series, pd.DataFrame, np.ndarray, list, tuple)):
+        expected, actual = np.asarray(expected), np.asarray(actual)
+        if expected.shape != actual.shape:
+            return False
+        if expected.dtype.kind in "biuf" and actual.dtype.kind in "biuf":
+            return bool(np.allclose(expected, actual, atol=tolerance, rtol=0.0, equal_nan=True))
+        return sorted(map(str, expected.ravel())) == sorted(map(str, actual.ravel()))  # names, in any order
+    if isinstance(expected, Number) and isinstance(actual, Number):
+        return abs(expected - actual) <= tolerance or (np.isnan(expected) and np.isnan(actual))
+    if isinstance(expected, (date, str)):
+        return pd.Timestamp(expected) == pd.Timestamp(actual) if isinstance(expected, date) else expected == actual
+    return False  # a value the batch cannot be told to reproduce
+
+
+def salary_differences(expected, actual, tolerance=0.01) -> list:
+    """The public attributes of the Salary `expected` that the YearSalary `actual` lacks or disagrees on."""
+    return sorted(name for name, value in vars(expected).items() if not name.startswith("_") and not (hasattr(actual, name) and _same(value, getattr(actual, name), tolerance)))
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage, RSS figures are reported as None
+    resource = None
+
+# tracemalloc slows every allocation down severalfold, so allocation deltas are opt-in; wall time
+# and RSS are always recorded as they cost nothing.
+TRACE_ALLOCATIONS = os.getenv("BOOT_PROFILE_TRACEMALLOC", "").strip().lower() in ("1", "true", "yes", "on")
+# Optional file the report is written to as JSON once boot completes, for tracking across deploys.
+REPORT_PATH = os.getenv("BOOT_PROFILE_PATH", "").strip()
+
+_MB = 1024 * 1024
+
+
+def current_rss_mb():
+    """Resident set size of this process right now, in MB (Linux only)."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            return round(int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / _MB, 1)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss_mb():
+    """Highest resident set size this process has reached, in MB."""
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux (bytes on macOS, which this is not deployed on).
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class BootProfile:
+    """Wall time and memory of each phase of startup.
+
+    Phases nest (initialize_managers' own phases run inside app.py's "managers" phase), and are
+    reported in the order they started, with their depth, so the report reads as a tree."""
+
+    def __init__(self):
+        self.phases = []
+        self._depth = 0
+        self._completed_at = None
+
+    @contextmanager
+    def phase(self, name):
+        """Record the enclosed block as the phase `name`; nothing is recorded once boot is complete.
+
+        A reload of the data runs the same phases again, and is not part of the boot."""
+        if self._completed_at is not None:
+            yield {}
+            return
+        record = {"phase": name, "depth": self._depth}
+        self.phases.append(record)
+        if TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        traced_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        if traced_before is not None and self._depth == 0:
+            tracemalloc.reset_peak()
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+
+        self._depth += 1
+        try:
+            yield record
+        finally:
+            self._depth -= 1
+            record["seconds"] = round(time.perf_counter() - start, 3)
+            record["rss_before_mb"] = rss_before
+            record["rss_after_mb"] = current_rss_mb()
+            record["peak_rss_mb"] = peak_rss_mb()
+            if traced_before is not None:
+                traced_after, traced_peak = tracemalloc.get_traced_memory()
+                record["allocated_mb"] = round((traced_after - traced_before) / _MB, 1)
+                record["peak_traced_mb"] = round(traced_peak / _MB, 1)
+
+    def complete(self):
+        """Mark boot as done: log the report and write it to REPORT_PATH if set."""
+        self._completed_at = time.time()
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+        print("Boot profile:")
+        for record in self.phases:
+            memory = f"rss {record['rss_before_mb']} -> {record['rss_after_mb']} MB (peak {record['peak_rss_mb']} MB)"
+            if "allocated_mb" in record:
+                memory += f", allocated {record['allocated_mb']} MB"
+            print(f"  {'  ' * record['depth']}{record['phase']:<{28 - 2 * record['depth']}} {record.get('seconds', 0.0):>8.3f}s  {memory}")
+
+        if REPORT_PATH:
+            with open(REPORT_PATH, "w", encoding="utf-8") as report_file:
+                json.dump(self.report(), report_file, indent=2)
+
+    def report(self) -> dict:
+        """The profile in machine-readable form."""
+        return {
+            "completed_at": self._completed_at,
+            "total_seconds": round(sum(r.get("seconds", 0.0) for r in self.phases if r["depth"] == 0), 3),
+            "peak_rss_mb": peak_rss_mb(),
+            "traced_allocations": TRACE_ALLOCATIONS,
+            "phases": list(self.phases),
+        }
+
+
+# One profile per process: initialize_managers and app.py record into the same report.
+BOOT_PROFILE = BootProfile()
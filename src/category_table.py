@@ -0,0 +1,49 @@
+import pandas as pd
+
+from src import defaults
+from src.flow_cube import FlowCube
+
+
+class CategoryTable:
+    """The total of every category of every year, from which the dropdown options are read at any threshold.
+
+    A category is "<level>: <value>" for each level of defaults.CATEGORY_MAP, the value being one of
+    the Full<level> column of the flows (see callbacks.get_category_filter). get_all_categories
+    re-aggregates the flows of the year at each call; here the totals of all the years are summed
+    out of the flow cube once, and the options of a year are the categories whose total reaches the
+    threshold, so changing the threshold recomputes nothing."""
+
+    def __init__(self, by_year):
+        self._by_year = by_year  # year -> Category and Total, in level then category order
+
+    @classmethod
+    def from_cube(cls, flow_cube: FlowCube, levels=None):
+        """The table of the categories of each level of `levels` (defaults to the keys of CATEGORY_MAP)."""
+        levels = list(defaults.CATEGORY_MAP if levels is None else levels)
+        missing = [f"Full{level}" for level in levels if f"Full{level}" not in flow_cube.dimensions]
+        if missing:
+            raise ValueError(f"the flow cube has no {missing}")
+
+        frames = []
+        for position, level in enumerate(levels):
+            totals = flow_cube.totals(f"Full{level}").dropna(subset=[f"Full{level}"])
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "Year": totals["Year"].astype(int),
+                        "Level": position,
+                        "Category": f"{level}: " + totals[f"Full{level}"].astype(str),
+                        "Total": totals["Value"].astype(float),
+                    }
+                )
+            )
+        table = pd.concat(frames, ignore_index=True).sort_values(["Year", "Level", "Category"], kind="stable")
+        return cls({int(year): rows[["Category", "Total"]].reset_index(drop=True) for year, rows in table.groupby("Year")})
+
+    def categories(self, year, threshold=None) -> list:
+        """The categories of `year` whose total, in absolute value, is at least `threshold` (defaults.THRESHOLD)."""
+        threshold = defaults.THRESHOLD if threshold is None else threshold
+        rows = self._by_year.get(year)
+        if rows is None:
+            return []
+        return rows["Category"][rows["Total"].abs() >= threshold].tolist()
@@ -0,0 +1,240 @@
+"""Columnar (Parquet/Feather) equivalents of the pregenerated input CSVs.
+
+Convert once, next to the CSVs, with:
+
+    python -m src.columnar [--format parquet|feather]
+
+initialize_managers then picks the columnar files up by extension, ahead of the CSVs. The conversion
+loads them back and checks that bkanalysis derives the same categories and flows from them as from
+the CSVs, and removes them otherwise."""
+
+import argparse
+import copy
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Low-cardinality string columns: as categoricals they take a fraction of the memory and need no
+# string parsing on load.
+CATEGORICAL_COLUMNS = ("AccountType", "FullType", "FullSubType", "MemoMapped", "AssetMapped", "Currency")
+# Whether the managers get CATEGORICAL_COLUMNS as categoricals. Off by default: bkanalysis was written
+# for string columns, and a categorical silently changes some of its operations (a groupby without
+# observed=True returns every combination of categories, concatenating a string to one raises).
+# Turn on once `python -m src.columnar`, which checks the columnar load against the CSV one, passes.
+COLUMNAR_CATEGORICALS = os.getenv("COLUMNAR_CATEGORICALS", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Checked in this order, so a converted file shadows the CSV it was converted from.
+INPUT_EXTENSIONS = (".parquet", ".feather", ".csv")
+
+_STATE = b"webapp_manager_state"
+
+
+def find_input(data_path, stem):
+    """Path of the input `stem` in its preferred available format (the CSV when none exists).
+
+    A columnar file older than the CSV was converted from a previous export: loading it would
+    silently serve stale data, so the CSV wins until the conversion is re-run."""
+    csv_path = os.path.join(data_path, stem + ".csv")
+    csv_mtime = os.path.getmtime(csv_path) if os.path.exists(csv_path) else None
+    for extension in INPUT_EXTENSIONS[:-1]:
+        path = os.path.join(data_path, stem + extension)
+        if pa is None or not os.path.exists(path):
+            continue
+        if csv_mtime is not None and os.path.getmtime(path) < csv_mtime:
+            print(f"Ignoring {path}: older than {csv_path}, re-run python -m src.columnar.")
+            continue
+        return path
+    return csv_path
+
+
+def input_paths(data_path=None):
+    """The transactions and prices inputs under `data_path` (default $DATA_PATH), in their preferred formats."""
+    data_path = data_path or os.getenv("DATA_PATH", "/data")
+    return [find_input(data_path, "data_manager"), find_input(data_path, "data_market")]
+
+
+def with_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with the CATEGORICAL_COLUMNS it has converted to categoricals."""
+    columns = [c for c in CATEGORICAL_COLUMNS if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype)]
+    return df.astype({c: "category" for c in columns}) if columns else df
+
+
+def without_categoricals(df: pd.DataFrame) -> pd.DataFrame:
+    """`df` with its categorical columns back to the plain columns a CSV load gives."""
+    columns = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+    return df.astype({c: df[c].cat.categories.dtype for c in columns}) if columns else df
+
+
+def _loaded_frame(table):
+    df = table.to_pandas()
+    return with_categoricals(df) if COLUMNAR_CATEGORICALS else without_categoricals(df)
+
+
+def load_manager(manager, path):
+    """Load a manager's pregenerated data from `path`, CSV or columnar.
+
+    A columnar file holds the state load_pregenerated_data left on the manager when the file was
+    converted (see convert_manager), so restoring it skips the CSV parse entirely and does not depend
+    on how the installed bkanalysis parses its inputs. The CATEGORICAL_COLUMNS are categoricals with
+    COLUMNAR_CATEGORICALS only."""
+    if path.endswith(".csv"):
+        manager.load_pregenerated_data(path)
+        return
+
+    table = _read_table(path)
+    state = json.loads(table.schema.metadata[_STATE])
+    setattr(manager, state["frame"], _loaded_frame(table))
+    for attribute, file_name in state["frames"].items():
+        setattr(manager, attribute, _loaded_frame(_read_table(os.path.join(os.path.dirname(path), file_name))))
+    for attribute, value in state["values"].items():
+        setattr(manager, attribute, value)
+
+
+def convert_manager(manager, csv_path, file_format="parquet"):
+    """Load `csv_path` into `manager` and write the resulting state next to it in `file_format`.
+
+    The main frame goes to `<stem>.<format>`; any other frame load_pregenerated_data set (e.g. the
+    market asset map) to `<stem>.<attribute>.<format>`, and plain values into the main file's
+    metadata. Returns the paths written, the main file's first.
+
+    Every frame the manager holds is written, and every other value load_pregenerated_data replaced
+    or changed in place (compared to a copy taken before)."""
+    before = {name: _snapshot(value) for name, value in vars(manager).items()}
+    manager.load_pregenerated_data(csv_path)
+    loaded = {name: value for name, value in vars(manager).items() if isinstance(value, pd.DataFrame) or _changed(before.get(name, _MISSING), value)}
+
+    frames = {name: value for name, value in loaded.items() if isinstance(value, pd.DataFrame)}
+    values = {name: value for name, value in loaded.items() if name not in frames}
+    if not frames:
+        raise ValueError(f"load_pregenerated_data({csv_path}) set no DataFrame on {type(manager).__name__}.")
+    try:
+        json.dumps(values)
+    except TypeError as exc:
+        raise ValueError(f"Cannot convert {csv_path}: {type(manager).__name__} keeps non-frame state {sorted(values)} ({exc}).") from exc
+
+    stem = os.path.splitext(csv_path)[0]
+    main_frame = max(frames, key=lambda name: len(frames[name]))
+    extra_frames = {name: f"{os.path.basename(stem)}.{name}.{file_format}" for name in frames if name != main_frame}
+
+    directory = os.path.dirname(csv_path)
+    for name, file_name in extra_frames.items():
+        _write_table(_to_table(frames[name]), os.path.join(directory, file_name), file_format)
+
+    table = _to_table(frames[main_frame])
+    state = {"frame": main_frame, "frames": extra_frames, "values": values}
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _STATE: json.dumps(state).encode()})
+    path = f"{stem}.{file_format}"
+    _write_table(table, path, file_format)
+    return [path, *(os.path.join(directory, file_name) for file_name in extra_frames.values())]
+
+
+_MISSING = object()
+
+
+def _snapshot(value):
+    """A copy of `value` to tell later whether it changed in place; `value` itself if it cannot be copied."""
+    try:
+        return copy.deepcopy(value)
+    except Exception:  # e.g. a handle or a lock: compared by identity only
+        return value
+
+
+def _changed(before, value):
+    """Whether `value` differs from its snapshot `before` (a value that could not be copied: if replaced)."""
+    if before is value:
+        return False
+    try:
+        return bool(before != value)
+    except (TypeError, ValueError):  # no plain equality, e.g. arrays: assume changed
+        return True
+
+
+def _to_table(df):
+    return pa.Table.from_pandas(with_categoricals(df), preserve_index=True)
+
+
+def _write_table(table, path, file_format):
+    if file_format == "parquet":
+        pq.write_table(table, path)
+    else:
+        feather.write_feather(table, path, compression="uncompressed")
+
+
+def _read_table(path):
+    if path.endswith(".parquet"):
+        return pq.read_table(path)
+    return feather.read_table(path, memory_map=True)
+
+
+def check_conversion(csv_transformation_manager, columnar_transformation_manager, year):
+    """Raise ValueError unless the managers loaded from the CSVs and from their conversion agree on `year`.
+
+    Compared on what the app reads: the categories (get_all_categories) and the flow totals by
+    FullType (get_flow_values), which is where categorical columns would change bkanalysis' results."""
+    from callbacks import HOW, get_flow_range
+    from src import defaults
+
+    flow_range = get_flow_range(year)
+    expected, actual = (
+        sorted(manager.get_all_categories(flow_range, defaults.THRESHOLD)) for manager in (csv_transformation_manager, columnar_transformation_manager)
+    )
+    if expected != actual:
+        raise ValueError(f"the categories of {year} differ: {sorted(set(expected) ^ set(actual))[:5]}")
+
+    expected, actual = (
+        manager.get_flow_values(flow_range[0], flow_range[1], None, how=HOW, include_iat=False).astype({"FullType": str}).groupby("FullType")["Value"].sum()
+        for manager in (csv_transformation_manager, columnar_transformation_manager)
+    )
+    difference = expected.sub(actual, fill_value=0.0).abs().max() if len(expected) or len(actual) else 0.0
+    if not difference <= 0.01:
+        raise ValueError(f"the flows of {year} differ by {difference:,.2f}")
+
+
+def main():
+    """Convert the CSVs under DATA_PATH to columnar files the app loads instead, and check they load the same."""
+    # Imported here: the conversion needs bkanalysis and its config, loading columnar files does not.
+    from bkanalysis.managers import DataManager, MarketManager, TransformationManager
+
+    from app_initialisation import read_config
+    from src import defaults
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--format", choices=("parquet", "feather"), default="parquet")
+    parser.add_argument("--data-path", default=os.getenv("DATA_PATH", "/data"))
+    args = parser.parse_args()
+
+    if pa is None:
+        raise SystemExit("pyarrow is required to write columnar files.")
+
+    config = read_config()
+    csv_managers, columnar_managers, converted = [], [], []
+    for new_manager, stem in ((lambda: DataManager(config), "data_manager"), (lambda: MarketManager(defaults.REF_CURRENCY), "data_market")):
+        csv_path = os.path.join(args.data_path, f"{stem}.csv")
+        manager = new_manager()
+        paths = convert_manager(manager, csv_path, args.format)
+        converted.extend(paths)
+        print(f"Converted {csv_path} -> {', '.join(paths)}")
+        csv_managers.append(manager)
+        columnar_managers.append(new_manager())
+        load_manager(columnar_managers[-1], paths[0])
+
+    year = list(defaults.YEARS)[-2]
+    try:
+        check_conversion(TransformationManager(*csv_managers), TransformationManager(*columnar_managers), year)
+    except ValueError as exc:
+        for path in converted:
+            os.remove(path)  # the app would load them in place of the CSVs, the extra frames with them
+        raise SystemExit(f"The columnar files do not load like the CSVs ({exc}), removed them{' (try without COLUMNAR_CATEGORICALS)' if COLUMNAR_CATEGORICALS else ''}.")
+    print(f"Checked: the columnar files load like the CSVs in {year}{' (with categoricals)' if COLUMNAR_CATEGORICALS else ''}.")
+
+
+if __name__ == "__main__":
+    main()
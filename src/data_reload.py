@@ -0,0 +1,175 @@
+import os
+import re
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process serves there, see ReloadLeader
+    fcntl = None
+
+import pandas as pd
+
+from src.manager_loader import LoadedManagers
+from src.result_cache import installed_cache
+from src.snapshot_store import fingerprint_inputs
+
+# Seconds between two checks of the input files for a new export; 0 disables the automatic reload.
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", "60"))
+# Bearer token required by POST /admin/reload; the endpoint is disabled while unset.
+RELOAD_TOKEN = os.getenv("RELOAD_TOKEN", "").strip()
+
+# How normalise_argument spells a date in a result cache key.
+_ISO_DATE = re.compile(r"^(\d{4})-\d{2}-\d{2}T")
+
+
+def main_frame(manager):
+    """The largest DataFrame a manager holds: its transactions, or its prices."""
+    frames = [value for value in vars(manager).values() if isinstance(value, pd.DataFrame)]
+    return max(frames, key=len) if frames else None
+
+
+def year_hashes(df: pd.DataFrame):
+    """{year: hash of its rows} for the rows of `df`, or None when `df` has no dates to group by.
+
+    The row hashes are summed, so the order of the rows does not matter, only their content."""
+    if df is None:
+        return None
+    if "Date" in df.columns:
+        dates = pd.to_datetime(df["Date"], errors="coerce")
+    elif isinstance(df.index, pd.DatetimeIndex):
+        dates = df.index.to_series(index=df.index)
+    else:
+        return None
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    return {int(year): int(value) for year, value in hashes.groupby(dates.dt.year.to_numpy()).sum().items()}
+
+
+def input_year_hashes(loaded: LoadedManagers) -> dict:
+    """Per-year hashes of the transactions and of the prices the managers were loaded from."""
+    return {
+        "data_manager": year_hashes(main_frame(loaded.data_manager)),
+        "market_manager": year_hashes(main_frame(loaded.market_manager)),
+    }
+
+
+def first_changed_year(old_hashes, new_hashes):
+    """The earliest year whose rows differ between two input_year_hashes, None if none does.
+
+    0 (every year) when either load could not be hashed per year."""
+    changed = []
+    for name, old in old_hashes.items():
+        new = new_hashes.get(name)
+        if old is None or new is None:
+            return 0
+        changed += [year for year in set(old) | set(new) if old.get(year) != new.get(year)]
+    return min(changed) if changed else None
+
+
+def key_years(key) -> set:
+    """The years of the dates among the arguments of a result cache key."""
+    if isinstance(key, str):
+        match = _ISO_DATE.match(key)
+        return {int(match.group(1))} if match else set()
+    if isinstance(key, tuple):
+        return set().union(*(key_years(part) for part in key))
+    return set()
+
+
+def carry_over(old: LoadedManagers, new: LoadedManagers):
+    """Move the results of `old` that `new` would compute identically into its caches; returns the years kept.
+
+    A year's results depend on the transactions and prices of that year and of every year before it
+    (balances carry forward), so the cached results whose date arguments all fall before the first
+    changed year are kept. A year's context also depends on the year after it: its salary counts as
+    outstanding the pay received in the next January (see build_salary). So the contexts are only
+    kept up to the year before the one preceding the first change. A new export usually only
+    touches the last year or two, and everything before stays a cache hit. Results without dates
+    are recomputed, for want of knowing what they depend on."""
+    first_changed = first_changed_year(input_year_hashes(old), input_year_hashes(new))
+
+    def unchanged(years, following=0):
+        """Whether the results of `years`, which also depend on the `following` years, are unchanged."""
+        return bool(years) and (first_changed is None or max(years) + following < first_changed)
+
+    old_cache, new_cache = installed_cache(old.transformation_manager), installed_cache(new.transformation_manager)
+    if old_cache is not None and new_cache is not None:
+        new_cache.adopt(old_cache, lambda key: unchanged(key_years(key)))
+
+    years = [year for year in old.year_contexts.years() if unchanged({year}, following=1)]
+    new.year_contexts.adopt(old.year_contexts, years)
+    return years
+
+
+class ReloadLeader:
+    """Elects the one process, among those sharing the lock file `path`, that watches the inputs.
+
+    The leader is the process holding an exclusive lock on the file. The others try to take it at
+    each due check, without waiting, so that when the leader exits (a gunicorn worker recycled or
+    killed) the OS releases its lock and another process takes over."""
+
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+
+    def held(self) -> bool:
+        """Whether this process leads, taking the lock if it is free."""
+        if self._file is not None or fcntl is None:
+            return True
+        file = open(self._path, "a", encoding="utf-8")
+        try:
+            fcntl.flock(file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:  # another process leads
+            file.close()
+            return False
+        self._file = file
+        return True
+
+
+class ReloadWatcher:
+    """Triggers a reload of the managers when their input files are replaced.
+
+    Checked as requests come in, at most every `interval` seconds, rather than from a thread of its
+    own, which a process forking workers could not keep. When processes share the data (the gunicorn
+    workers), only the `leader` among them checks, and its reload asks the master to reload and
+    re-fork them (see app.create_app). The processes forked for background callbacks, which serve no
+    request, never check. A check costs a stat of each input, see snapshot_store.fingerprint_inputs."""
+
+    def __init__(self, paths, reload, interval=DATA_RELOAD_INTERVAL, leader: ReloadLeader = None):
+        self._paths = paths
+        self._reload = reload
+        self.interval = interval
+        self.leader = leader
+        self._lock = threading.Lock()
+        self._next_check = time.monotonic() + interval
+        self._fingerprint = self._current()
+
+    def _current(self):
+        try:
+            return fingerprint_inputs(self._paths())
+        except OSError:  # an input missing, e.g. mid-copy: check again next time
+            return None
+
+    def reset(self):
+        """Take the inputs as they are now as the loaded ones, e.g. before a reload triggered elsewhere."""
+        with self._lock:
+            self._fingerprint = self._current()
+
+    def check(self):
+        """Reload if the inputs have changed since the last check; cheap when the check is not due."""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check:
+                return
+            self._next_check = now + self.interval
+            if self.leader is not None and not self.leader.held():
+                return
+            fingerprint = self._current()
+            changed = fingerprint is not None and fingerprint != self._fingerprint
+            if changed:
+                self._fingerprint = fingerprint
+        if changed:
+            print("Input files changed, reloading the data.")
+            self._reload()
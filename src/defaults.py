@@ -8,6 +8,8 @@ BASE_PAYROLL_2 = "UBS"
 EXCLUDE_DEFAULT = []
 BASE_SALARY_1 = 13250
 USE_LEGACY_SALARY_CLASS = False
+# Compute the salary of every year in one pass (src/batch_salary.py) instead of one Salary per year.
+USE_BATCH_SALARY = True
 
 SALARY_CONFIG = {
     "NAYA_CYTOVIA": {
@@ -0,0 +1,79 @@
+import pandas as pd
+
+# Columns of the flows the cube keeps, those the flow frame has: the category levels (the sunburst's
+# FullMasterType -> FullType -> FullSubType), the merchant and the account.
+CUBE_DIMENSIONS = ("FullMasterType", "FullType", "FullSubType", "MemoMapped", "Account")
+
+
+class FlowCube:
+    """The flows of the full history summed by year, month and CUBE_DIMENSIONS, split by year.
+
+    Built with a single groupby over the flows of every year, where each year used to re-scan the
+    history with get_flow_values. Reading a year is then a dictionary lookup, and its monthly series
+    are computed on that year's aggregated rows only."""
+
+    def __init__(self, by_year, dimensions):
+        self._by_year = by_year
+        self.dimensions = tuple(dimensions)
+
+    @classmethod
+    def from_flows(cls, df: pd.DataFrame, dimensions=CUBE_DIMENSIONS):
+        """The cube of a flow frame with a `Date` column (or index) and a `Value` column."""
+        if "Date" in df.columns:
+            dates = pd.to_datetime(df["Date"])
+        elif isinstance(df.index, pd.DatetimeIndex):
+            dates = df.index.to_series(index=df.index)
+        else:
+            raise ValueError(f"the flows have no dates to aggregate by (columns: {list(df.columns)})")
+        dimensions = [column for column in dimensions if column in df.columns]
+
+        # dropna=False: a flow with no sub-type or merchant still counts in every total
+        cube = (
+            df.groupby([dates.dt.year.rename("Year"), dates.dt.month.rename("Month"), *[df[c] for c in dimensions]], observed=True, dropna=False)["Value"]
+            .sum()
+            .reset_index()
+        )
+        by_year = {int(year): rows.drop(columns="Year").reset_index(drop=True) for year, rows in cube.groupby("Year", sort=True)}
+        return cls(by_year, dimensions)
+
+    def years(self):
+        """The years with flows, in order."""
+        return list(self._by_year)
+
+    def year(self, year) -> pd.DataFrame:
+        """The aggregated flows of `year`: one row per month and combination of dimensions, with its Value."""
+        rows = self._by_year.get(year)
+        return rows if rows is not None else pd.DataFrame(columns=["Month", *self.dimensions, "Value"])
+
+    def totals(self, by) -> pd.DataFrame:
+        """The Value of every year summed by the dimension `by`: one row per year and value of `by`."""
+        if not self._by_year:
+            return pd.DataFrame(columns=["Year", by, "Value"])
+        rows = pd.concat(self._by_year, names=["Year", None]).reset_index(level="Year")
+        return rows.groupby(["Year", by], observed=True, dropna=False)["Value"].sum().reset_index()
+
+    def breakdown(self, year, filters, by, top) -> pd.DataFrame:
+        """The `top` values of the dimension `by` in the flows of `year` matching `filters` ({dimension: value}).
+
+        Two columns, `by` and Value, the largest in absolute value first, as get_category_breakdown."""
+        rows = self.year(year)
+        for column, value in filters.items():
+            rows = rows[rows[column] == value]
+        totals = rows.groupby(by, observed=True, dropna=False)["Value"].sum().reset_index()
+        totals[by] = totals[by].astype(object)
+        totals = totals.sort_values(by, kind="stable").sort_values("Value", key=lambda values: -values.abs(), kind="stable")
+        return totals.head(top).reset_index(drop=True)
+
+    def monthly(self, year, income_types) -> pd.DataFrame:
+        """Income (the FullTypes `income_types`) and expenses (all the others) of each month of `year`.
+
+        Indexed by month, 1 to 12, months without flows included."""
+        rows = self.year(year)
+        is_income = rows["FullType"].isin(income_types)
+        months = pd.RangeIndex(1, 13, name="Month")
+        return pd.DataFrame(
+            {
+                "Income": rows[is_income].groupby("Month")["Value"].sum().reindex(months, fill_value=0.0),
+                "Expenses": rows[~is_income].groupby("Month")["Value"].sum().reindex(months, fill_value=0.0),
+            }
+        )
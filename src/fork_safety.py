@@ -0,0 +1,26 @@
+import os
+import weakref
+
+# Objects to repair in a forked child, see reset_after_fork.
+_registered = weakref.WeakSet()
+
+
+def reset_after_fork(instance):
+    """Have `instance._after_fork()` called in every child forked from this process.
+
+    Only the forking thread survives a fork: a lock another thread held at that moment stays held
+    in the child forever, and a Future it was computing is never resolved. The caches and the loader
+    are shared by the request threads, and the processes forked from them (background callback
+    jobs, the gunicorn workers) would hang on either. `_after_fork` replaces the locks and drops
+    the work in flight, keeping what was complete."""
+    _registered.add(instance)
+    return instance
+
+
+def _after_fork_in_child():
+    for instance in list(_registered):
+        instance._after_fork()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only; nothing forks on Windows
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+from dash import exceptions
+
+from src.fork_safety import reset_after_fork
+
+# Sessions remembered at once; the least recently active are forgotten first.
+MAX_SESSIONS = 1024
+
+
+class Superseded(exceptions.PreventUpdate):
+    """Raised by a callback whose year is no longer the one its session shows.
+
+    A PreventUpdate, so Dash leaves the outputs alone; told apart from it by METRICS as dropped work."""
+
+
+class Generation:
+    """One callback call's claim on a session's year, see GenerationTracker.begin."""
+
+    def __init__(self, tracker, session, number):
+        self._tracker = tracker
+        self._session = session
+        self._number = number
+
+    def check(self):
+        """Raise Superseded if the session has moved to another year since the call began.
+
+        Called by the callbacks between their expensive phases (flows, salary, figures): what is
+        already computed stays cached, what is left is not worth computing for a year nobody sees."""
+        if self._session is not None and not self._tracker.is_current(self._session, self._number):
+            raise Superseded
+
+
+class GenerationTracker:
+    """The year each browser session last asked for, numbered so that stale calls can tell.
+
+    Scrolling through the year dropdown fires every tab callback for every year passed on the way,
+    and each would run to the end although only the last year is displayed. Every call registers
+    its year on start; the number of a session moves on whenever the year changes, and the calls of
+    older numbers abort at their next check. Calls for the same year (the tab callbacks of one year
+    change) do not supersede each other. Per process: under gunicorn, a worker only sees the
+    requests it serves, and a background callback job only those of before it was forked."""
+
+    def __init__(self, max_sessions: int = MAX_SESSIONS):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session -> (number, year), least recently active first
+        reset_after_fork(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def begin(self, session, year) -> Generation:
+        """Register a call for `year` in `session`, superseding the calls of the session for other years.
+
+        `session` is None for callers outside the browser (the benchmark, the tests): those are never
+        superseded."""
+        if session is None:
+            return Generation(self, None, None)
+        with self._lock:
+            number, current_year = self._sessions.pop(session, (0, year))
+            if year != current_year:
+                number += 1
+            self._sessions[session] = (number, year)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return Generation(self, session, number)
+
+    def is_current(self, session, number) -> bool:
+        """Whether `number` is still the generation of `session` (a forgotten session counts as current)."""
+        with self._lock:
+            return self._sessions.get(session, (number, None))[0] == number
@@ -0,0 +1,133 @@
+import threading
+import time
+import traceback
+from typing import Any, NamedTuple
+
+from src.fork_safety import reset_after_fork
+
+
+class LoadedManagers(NamedTuple):
+    """Everything the callbacks read, loaded together so that it is always mutually consistent."""
+
+    data_manager: Any
+    market_manager: Any
+    transformation_manager: Any
+    figure_manager: Any
+    year_contexts: Any
+    flow_cube: Any = None  # see callbacks.build_flow_cube
+    balance_index: Any = None  # see callbacks.build_balance_index
+    category_table: Any = None  # see callbacks.build_category_table
+    saving_table: Any = None  # see callbacks.build_saving_table
+    breakdown_cube: Any = None  # see callbacks.build_breakdown_cube
+
+
+class ManagerLoader:
+    """Loads the managers on a background thread; readers block until they are ready.
+
+    Reading the data takes far longer than building the layout, so the server can start listening
+    and render a loading state while it happens. A failed load is re-raised to every reader rather
+    than leaving them waiting forever.
+
+    The managers can later be reloaded from new data (see reload): readers keep getting the current
+    ones until the new ones are ready, and `version` counts the swaps."""
+
+    def __init__(self, load, on_loaded=None):
+        self._load = load
+        self._on_loaded = on_loaded
+        self._lock = threading.Lock()
+        self._thread = None
+        self._ready = threading.Event()
+        self._managers = None
+        self._error = None
+        self.version = 0
+        self._reloading = False
+        self._last_reload = None
+        reset_after_fork(self)
+
+    def _after_fork(self):
+        # in a forked child: a load still running in the parent never finishes here, so load afresh;
+        # a reload never finishes either, and the child keeps the managers it was forked with
+        self._lock = threading.Lock()
+        self._reloading = False
+        if not self._ready.is_set():
+            self._thread = None
+
+    def start(self):
+        """Start loading in the background, if not already started; returns immediately."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="manager-loader", daemon=True)
+                self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self._managers = self._load()
+        except Exception as exc:  # surfaced to the callbacks by get()
+            self._error = exc
+        finally:
+            self._ready.set()
+        if self._error is None and self._on_loaded is not None:
+            self._on_loaded(self._managers)
+
+    def get(self, timeout=None) -> LoadedManagers:
+        """The loaded managers, starting the load if needed and waiting for it to finish."""
+        self.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError("the managers are still loading")
+        if self._error is not None:
+            raise RuntimeError("loading the managers failed") from self._error
+        return self._managers
+
+    def join(self, timeout=None):
+        """Wait for the load, and `on_loaded` after it, to finish; e.g. before the process forks."""
+        self.start()
+        self._thread.join(timeout)
+
+    def reload(self, carry_over=None, wait=False) -> bool:
+        """Load the managers afresh in the background, and swap them in once ready.
+
+        `carry_over(current, fresh)` runs before the swap, to move into the fresh managers' caches
+        whatever the new data leaves unchanged; it returns the years it kept. Returns False without
+        doing anything when a reload is already running. A failed reload keeps the current managers.
+        `wait` reloads on the calling thread instead, e.g. in a process about to fork."""
+        with self._lock:
+            if self._reloading:
+                return False
+            self._reloading = True
+        if wait:
+            self._run_reload(carry_over)
+        else:
+            threading.Thread(target=self._run_reload, args=(carry_over,), name="manager-reloader", daemon=True).start()
+        return True
+
+    def _run_reload(self, carry_over):
+        start = time.perf_counter()
+        try:
+            current = self.peek()
+            fresh = self._load()
+            kept = carry_over(current, fresh) if carry_over is not None and current is not None else []
+            # a single assignment: a reader gets either the current managers or the fresh ones, never a mix
+            self._managers = fresh
+            self._error = None
+            self._ready.set()
+            self.version += 1
+            self._last_reload = {"finished_at": time.time(), "seconds": round(time.perf_counter() - start, 3), "years_kept": sorted(kept)}
+        except Exception as exc:  # the current managers keep serving
+            traceback.print_exc()
+            self._last_reload = {"finished_at": time.time(), "seconds": round(time.perf_counter() - start, 3), "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def reload_status(self) -> dict:
+        """Whether a reload is running and how the last one went, in a JSON-serialisable form."""
+        return {"version": self.version, "reloading": self._reloading, "last_reload": self._last_reload}
+
+    def ready(self) -> bool:
+        """Whether get() would return (or raise) without waiting."""
+        return self._ready.is_set()
+
+    def peek(self):
+        """The loaded managers if the load has succeeded, otherwise None, without waiting."""
+        return self._managers if self._ready.is_set() and self._error is None else None
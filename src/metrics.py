@@ -0,0 +1,201 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+from src.fork_safety import reset_after_fork
+
+# Upper bounds of the callback latency histogram, in seconds.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_local = threading.local()
+
+
+def note_cache_lookup(cache, hit):
+    """Attribute a lookup in `cache` to the callback running on this thread, if any.
+
+    Called by the caches themselves: it is a no-op outside an instrumented callback (warm-up
+    threads, the benchmark), so they need not know whether anyone is measuring."""
+    record = getattr(_local, "record", None)
+    if record is not None:
+        outcome = "hit" if hit else "miss"
+        record["cache"][(cache, outcome)] = record["cache"].get((cache, outcome), 0) + 1
+
+
+class CallbackMetrics:
+    """Per-callback counters, exported in the Prometheus text format.
+
+    Each call records its wall time, the part of it spent building the layout (tabs.get_tab_*)
+    rather than computing the data, whether it raised, was prevented or was superseded by a newer
+    year (src.generations), along with the time it had spent until then, and the cache lookups it
+    made. The size of the response is added by the Flask hook once Dash has serialised it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks = {}
+        reset_after_fork(self)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+
+    def _callback(self, name):
+        # callers hold the lock
+        if name not in self._callbacks:
+            self._callbacks[name] = {
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "count": 0,
+                "seconds": 0.0,
+                "layout_seconds": 0.0,
+                "errors": 0,
+                "prevented": 0,
+                "superseded": 0,
+                "superseded_seconds": 0.0,
+                "responses": 0,
+                "response_bytes": 0,
+                "cache": {},
+            }
+        return self._callbacks[name]
+
+    def instrument(self, callback):
+        """Decorator recording every call of a Dash callback under its function name."""
+        # Imported here rather than at the top: the caches report their lookups through this
+        # module, and should not pull in Dash and Flask with it.
+        import flask
+        from dash import exceptions
+
+        from src.generations import Superseded
+
+        name = callback.__name__
+
+        @functools.wraps(callback)
+        def instrumented(*args, **kwargs):
+            record = {"layout_seconds": 0.0, "cache": {}}
+            outer, _local.record = getattr(_local, "record", None), record
+            if flask.has_request_context():
+                flask.g.metrics_callback = name
+            start = time.perf_counter()
+            outcome = None
+            try:
+                return callback(*args, **kwargs)
+            except Superseded:
+                outcome = "superseded"
+                raise
+            except exceptions.PreventUpdate:
+                outcome = "prevented"
+                raise
+            except Exception:
+                outcome = "errors"
+                raise
+            finally:
+                _local.record = outer
+                self._observe(name, time.perf_counter() - start, record, outcome)
+
+        return instrumented
+
+    @contextmanager
+    def layout(self):
+        """Count the enclosed block as layout building in the current callback."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = getattr(_local, "record", None)
+            if record is not None:
+                record["layout_seconds"] += time.perf_counter() - start
+
+    def _observe(self, name, seconds, record, outcome):
+        with self._lock:
+            metrics = self._callback(name)
+            metrics["count"] += 1
+            metrics["seconds"] += seconds
+            metrics["layout_seconds"] += record["layout_seconds"]
+            for position, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics["buckets"][position] += 1
+            if outcome is not None:
+                metrics[outcome] += 1
+            if outcome == "superseded":
+                metrics["superseded_seconds"] += seconds
+            for key, count in record["cache"].items():
+                metrics["cache"][key] = metrics["cache"].get(key, 0) + count
+
+    def observe_response(self, name, size):
+        """Record the serialised size of a response of callback `name`, in bytes."""
+        with self._lock:
+            metrics = self._callback(name)
+            metrics["responses"] += 1
+            metrics["response_bytes"] += size
+
+    def install(self, server):
+        """Record the size of every callback response served by the Flask `server`."""
+        import flask
+
+        @server.after_request
+        def record_response_size(response):
+            name = flask.g.pop("metrics_callback", None)
+            if name is not None and not response.direct_passthrough:
+                self.observe_response(name, response.calculate_content_length() or len(response.get_data()))
+            return response
+
+    def render(self, gauges=None) -> str:
+        """The metrics in the Prometheus text exposition format.
+
+        `gauges` maps extra metric names to a value, or to a {labels tuple: value} dict, for
+        process-wide state such as the cache sizes."""
+        with self._lock:
+            callbacks = {name: {**metrics, "cache": dict(metrics["cache"])} for name, metrics in self._callbacks.items()}
+
+        lines = [
+            "# HELP webapp_callback_duration_seconds Wall time of each Dash callback.",
+            "# TYPE webapp_callback_duration_seconds histogram",
+        ]
+        for name, metrics in sorted(callbacks.items()):
+            for bound, count in zip(LATENCY_BUCKETS, metrics["buckets"]):
+                lines.append(f'webapp_callback_duration_seconds_bucket{{callback="{name}",le="{bound}"}} {count}')
+            lines.append(f'webapp_callback_duration_seconds_bucket{{callback="{name}",le="+Inf"}} {metrics["count"]}')
+            lines.append(f'webapp_callback_duration_seconds_sum{{callback="{name}"}} {metrics["seconds"]:.6f}')
+            lines.append(f'webapp_callback_duration_seconds_count{{callback="{name}"}} {metrics["count"]}')
+
+        counters = (
+            ("layout_seconds", "webapp_callback_layout_seconds_total", "Time spent building the layout (tabs.get_tab_*)."),
+            ("compute_seconds", "webapp_callback_compute_seconds_total", "Time spent computing the data, i.e. outside the layout."),
+            ("errors", "webapp_callback_errors_total", "Calls that raised."),
+            ("prevented", "webapp_callback_prevented_total", "Calls that raised PreventUpdate."),
+            ("superseded", "webapp_callback_superseded_total", "Calls abandoned because their session moved to another year."),
+            ("superseded_seconds", "webapp_callback_superseded_seconds_total", "Time spent by the abandoned calls before they stopped."),
+            ("responses", "webapp_callback_responses_total", "Responses served."),
+            ("response_bytes", "webapp_callback_response_bytes_total", "Serialised size of the responses."),
+        )
+        for key, metric, help_text in counters:
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for name, metrics in sorted(callbacks.items()):
+                value = metrics["seconds"] - metrics["layout_seconds"] if key == "compute_seconds" else metrics[key]
+                lines.append(f'{metric}{{callback="{name}"}} {_format(value)}')
+
+        lines += ["# HELP webapp_callback_cache_lookups_total Cache lookups made by each callback.", "# TYPE webapp_callback_cache_lookups_total counter"]
+        for name, metrics in sorted(callbacks.items()):
+            for (cache, outcome), count in sorted(metrics["cache"].items()):
+                lines.append(f'webapp_callback_cache_lookups_total{{callback="{name}",cache="{cache}",result="{outcome}"}} {count}')
+
+        for metric, value in sorted((gauges or {}).items()):
+            lines.append(f"# TYPE {metric} gauge")
+            if isinstance(value, dict):
+                for labels, labelled_value in sorted(value.items()):
+                    label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                    lines.append(f"{metric}{{{label_text}}} {_format(labelled_value)}")
+            else:
+                lines.append(f"{metric} {_format(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format(value):
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, float):
+        return f"{value:.6f}"
+    return str(value)
+
+
+# One registry per process, like the boot profile: the callbacks and the Flask route share it.
+METRICS = CallbackMetrics()
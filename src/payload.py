@@ -0,0 +1,71 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+# Trace attributes holding one number per point: sent as base64 typed arrays once long enough.
+ARRAY_ATTRIBUTES = ("x", "y", "z", "values", "base", "open", "high", "low", "close")
+# Below this, a JSON list is about as small as its base64 encoding and cheaper to produce.
+TYPED_ARRAY_MIN_LENGTH = 32
+
+
+def round_for_display(df: pd.DataFrame, decimals=0, columns_decimals=None) -> pd.DataFrame:
+    """A copy of `df` with its numeric columns rounded to the precision the table displays.
+
+    Full float64 values serialise to ~18 characters each while the tables show whole dollars;
+    `columns_decimals` overrides `decimals` for given columns (e.g. a percentage)."""
+    columns_decimals = columns_decimals or {}
+    numeric = df.select_dtypes("number").columns
+    return df.round({column: columns_decimals.get(column, decimals) for column in numeric})
+
+
+def table_records(df: pd.DataFrame, decimals=0, columns_decimals=None):
+    """`df` as DataTable rows, rounded for display (see round_for_display)."""
+    return round_for_display(df, decimals, columns_decimals).to_dict("records")
+
+
+def slim_figure(figure):
+    """`figure` as a plain dict, minus what the browser does not need, for a Graph's `figure`.
+
+    The template keeps its layout but only the trace defaults of the trace types the figure uses
+    (the default one carries styling for every trace type Plotly has, most of a small figure's
+    bytes). Long numeric trace arrays are sent as base64 typed arrays rather than one JSON number
+    each. The rendering is unchanged. Working on the dict rather than a
+    go.Figure copy skips Plotly's validation, which would cost more than the serialisation saved."""
+    if figure is None:
+        return None
+    figure = figure.to_dict() if hasattr(figure, "to_dict") else dict(figure)
+
+    layout = figure.get("layout") or {}
+    template = layout.get("template")
+    if isinstance(template, dict) and template.get("data"):
+        used_types = {trace.get("type", "scatter") for trace in figure.get("data", [])}
+        layout = {**layout, "template": {**template, "data": {kind: traces for kind, traces in template["data"].items() if kind in used_types}}}
+        figure["layout"] = layout
+
+    figure["data"] = [_typed_arrays(trace) for trace in figure.get("data", [])]
+    return figure
+
+
+def _typed_arrays(trace):
+    trace = dict(trace)
+    for attribute in ARRAY_ATTRIBUTES:
+        value = trace.get(attribute)
+        if not isinstance(value, (list, tuple)) or len(value) < TYPED_ARRAY_MIN_LENGTH:
+            continue
+        array = np.asarray(value)
+        if array.dtype.kind in "iuf":
+            trace[attribute] = typed_array(array)
+    return trace
+
+
+def typed_array(array: np.ndarray) -> dict:
+    """`array` in plotly.js's typed array form: its raw little-endian bytes, base64-encoded.
+
+    Integers are sent as int32 when they fit (plotly.js has no 64-bit integer arrays), anything
+    else as float64, so no value changes."""
+    if array.dtype.kind in "iu" and array.size and np.iinfo(np.int32).min <= array.min() and array.max() <= np.iinfo(np.int32).max:
+        array, dtype = array.astype("<i4"), "i4"
+    else:
+        array, dtype = array.astype("<f8"), "f8"
+    return {"dtype": dtype, "bdata": base64.b64encode(array.tobytes()).decode("ascii")}
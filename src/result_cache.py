@@ -0,0 +1,291 @@
+import inspect
+import os
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from src.fork_safety import reset_after_fork
+from src.metrics import note_cache_lookup
+
+# TransformationManager methods the tabs call repeatedly, across callbacks and years. Each of them
+# re-merges the full history, and the data is immutable after startup, so the results can be reused.
+TRANSFORMATION_MANAGER_METHODS = (
+    "get_flow_values",
+    "get_values_by_asset",
+    "get_price_comparison_on_dates",
+    "get_iat_imbalance",
+    "get_all_categories",
+)
+
+# FigureManager methods worth caching as well: the capital gain breakdown re-derives the whole
+# per-asset frame for every row clicked, while only the row to plot differs between the calls, and
+# the paged tables re-read their frame (capital gain or category breakdown) for every page. The
+# figures and ratios of the tabs are cached so that the warm-up (see callbacks.warm_year) leaves
+# every tab of a year a hit.
+FIGURE_MANAGER_METHODS = (
+    "get_capital_gain_brkdn",
+    "get_category_breakdown",
+    "get_figure_timeseries",
+    "get_figure_waterfall",
+    "get_figure_sunburst",
+    "get_figure_bar",
+    "get_saving_ratio",
+    "get_income_vs_expenses",
+)
+
+DEFAULT_MAX_BYTES = int(float(os.getenv("RESULT_CACHE_MAX_MB", "512")) * 1024 * 1024)
+# Hand out a deep copy of a cached frame on every hit rather than sharing its numeric columns read-only
+# (see detach): for a caller found to write into the frames it gets back in place, at a copy per hit.
+COPY_HITS = os.getenv("RESULT_CACHE_COPY_HITS", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def normalise_argument(value):
+    """Hashable, canonical form of a call argument.
+
+    Dates arrive as datetime, date or Timestamp depending on the caller and date ranges as lists,
+    none of which should produce distinct cache entries for the same call."""
+    if isinstance(value, (date, pd.Timestamp)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, (list, tuple)):
+        return tuple(normalise_argument(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(normalise_argument(v) for v in value))
+    if isinstance(value, dict):
+        return tuple(sorted((k, normalise_argument(v)) for k, v in value.items()))
+    return value
+
+
+def estimate_size(value) -> int:
+    """Approximate resident size of a cached result, in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if hasattr(value, "to_plotly_json"):
+        # a figure: its serialised size is what it holds, traces and template alike
+        return len(value.to_json())
+    return sys.getsizeof(value)
+
+
+def _frozen(dtype) -> bool:
+    """Whether freeze makes the arrays of `dtype` read-only: plain numbers, booleans and dates.
+
+    pandas' own routines reject a read-only array of objects (memory_usage(deep=True) among them),
+    and extension arrays (categoricals, timezone-aware dates) have no read-only flag."""
+    return isinstance(dtype, np.dtype) and dtype.kind in "biufcmM"
+
+
+def freeze(value):
+    """Make the numeric arrays of a result read-only, now that it is cached; returns it.
+
+    A caller writing into one in place (`df.loc[...] = ...`) then fails loudly, rather than changing
+    what every later hit returns."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        for array in value._mgr.arrays:  # the arrays pandas writes into; an index is immutable already
+            if isinstance(array, np.ndarray) and _frozen(array.dtype):
+                array.flags.writeable = False
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            freeze(item)
+    return value
+
+
+def detach(value):
+    """What a hit hands out for a cached result: a copy the caller may modify without changing it.
+
+    Callers do modify what they get back (get_figure_bar negates the Value column), and a change to
+    the cached frame would leak into every later hit. The copy only copies the columns freeze left
+    writable, of strings or categories, whose arrays are pointers or codes: the numeric columns are
+    shared read-only. Replacing a column, as get_figure_bar does, only replaces it in the copy, and
+    writing into a shared one fails. A hit so costs a fraction of a deep copy, which for a large
+    flow frame was nearly as much memory traffic as the miss. COPY_HITS restores the deep copy."""
+    if isinstance(value, pd.Series):
+        return value.copy(deep=not _frozen(value.dtype) or COPY_HITS)
+    if isinstance(value, pd.DataFrame):
+        if COPY_HITS or pd.options.mode.copy_on_write:
+            return value.copy(deep=not pd.options.mode.copy_on_write)
+        copy = value.copy(deep=False)
+        writable = [position for position, dtype in enumerate(value.dtypes) if not _frozen(dtype)]
+        if writable:
+            copy.isetitem(writable, value.iloc[:, writable].copy())
+        return copy
+    if isinstance(value, tuple):
+        return tuple(detach(v) for v in value)
+    if isinstance(value, list):
+        return [detach(v) for v in value]
+    return value
+
+
+class ResultCache:
+    """LRU cache of manager results, bounded by their memory size and safe under threaded Flask.
+
+    Each key is computed at most once at a time: concurrent misses on the same key wait for the
+    first caller's result rather than all re-merging the history. Failures are not cached.
+
+    An optional persistent `store` (see snapshot_store.SnapshotStore) is consulted on a miss before
+    computing, and receives whatever gets computed, so results survive a restart."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, store=None):
+        self.max_bytes = max_bytes
+        self.store = store
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size), least recently used first
+        self._pending = {}  # key -> Future of the computation in flight
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        reset_after_fork(self)
+
+    def _after_fork(self):
+        # in a forked child: the computations in flight belong to threads that do not exist there
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def get_or_compute(self, key, compute):
+        """The cached value for `key`, computing it with `compute()` on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                note_cache_lookup("result", True)
+                return detach(self._entries[key][0])
+
+            future = self._pending.get(key)
+            is_owner = future is None
+            if is_owner:
+                self.misses += 1
+                future = self._pending[key] = Future()
+            else:
+                # Somebody else is computing it: this caller is served without computing.
+                self.hits += 1
+        note_cache_lookup("result", not is_owner)
+
+        if is_owner:
+            try:
+                value = freeze(self._load_or_compute(key, compute))
+                # outside the lock: sizing a figure serialises it, and lookups of every other key would wait
+                size = estimate_size(value)
+            except BaseException as exc:
+                with self._lock:
+                    del self._pending[key]
+                future.set_exception(exc)
+                raise
+            with self._lock:
+                del self._pending[key]
+                self._store(key, value, size)
+            future.set_result(value)
+
+        return detach(future.result())
+
+    def _load_or_compute(self, key, compute):
+        if self.store is None or not self.store.accepts(key):
+            return compute()
+
+        value = self.store.load(key)
+        if value is not None:
+            with self._lock:
+                self.disk_hits += 1
+            return value
+
+        value = compute()
+        self.store.save(key, value)
+        return value
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        self._entries[key] = (value, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def adopt(self, other: "ResultCache", keep):
+        """Copy into this cache the entries of `other` whose key satisfies `keep(key)`.
+
+        For a reload (see data_reload.carry_over): the results the new data would not change stay hits."""
+        with other._lock:
+            entries = [(key, value, size) for key, (value, size) in other._entries.items() if keep(key)]
+        with self._lock:
+            for key, value, size in entries:
+                if key not in self._entries:
+                    self._store(key, value, size)
+
+    def clear(self):
+        """Drop every cached result."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Counters for monitoring whether the cache is earning its memory."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_hits": self.disk_hits,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+def install_result_cache(manager, methods, cache: ResultCache = None) -> ResultCache:
+    """Route `methods` of `manager` through `cache`, and return the cache.
+
+    The cached wrappers are set on the instance, shadowing the class methods, so the manager keeps
+    its type for whoever checks it and its own internal calls are cached too. Arguments are bound
+    against each method's signature, so positional and keyword spellings of a call share an entry
+    whatever the installed bkanalysis version's parameter order is."""
+    cache = cache if cache is not None else ResultCache()
+
+    for name in methods:
+        method = getattr(manager, name, None)
+        if method is None:
+            continue
+        setattr(manager, name, _cached_method(cache, name, method))
+
+    return cache
+
+
+def installed_cache(manager):
+    """The ResultCache installed on `manager` by install_result_cache, or None."""
+    for name in TRANSFORMATION_MANAGER_METHODS:
+        cache = getattr(getattr(manager, name, None), "cache", None)
+        if isinstance(cache, ResultCache):
+            return cache
+    return None
+
+
+def _cached_method(cache: ResultCache, name, method):
+    signature = inspect.signature(method)
+
+    def cached(*args, **kwargs):
+        try:
+            bound = signature.bind(*args, **kwargs)
+        except TypeError:
+            return method(*args, **kwargs)  # let the real method raise its own error
+        bound.apply_defaults()
+        key = (name, tuple((arg, normalise_argument(value)) for arg, value in bound.arguments.items()))
+        try:
+            hash(key)
+        except TypeError:
+            return method(*args, **kwargs)  # e.g. a frame passed as an argument: not cacheable
+        return cache.get_or_compute(key, lambda: method(*args, **kwargs))
+
+    cached.__name__ = name
+    cached.__doc__ = method.__doc__
+    cached.__wrapped__ = method
+    cached.cache = cache
+    return cached
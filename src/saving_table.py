@@ -0,0 +1,69 @@
+import pandas as pd
+
+from src import defaults
+from src.flow_cube import FlowCube
+
+# Months the rolling saving rate is measured over.
+ROLLING_MONTHS = 12
+
+
+class SavingTable:
+    """Income, expenses, savings and saving ratio of every month of the history.
+
+    get_saving_ratio filters the flow history at each call, four times per opening of the
+    'Saving Rate' tab, and get_income_vs_expenses once more. Here the months of every year are
+    summed out of the flow cube once, split by whether their FullType is an income, and the annual
+    and monthly ratios, the income-vs-expenses chart and the rolling saving rate are all slices of
+    the same table."""
+
+    def __init__(self, monthly: pd.DataFrame):
+        self.monthly = monthly  # Income, Expenses, Savings and Ratio, by month (a monthly PeriodIndex)
+
+    @classmethod
+    def from_cube(cls, flow_cube: FlowCube, income_types=None):
+        """The table of the flows of `flow_cube`, with the FullTypes `income_types` (defaults.INCOME_TYPES) as income."""
+        income_types = defaults.INCOME_TYPES if income_types is None else income_types
+        if "FullType" not in flow_cube.dimensions:
+            raise ValueError("the flow cube has no FullType to tell the income from the expenses")
+        years = flow_cube.years()
+        months = pd.period_range(f"{years[0]}-01", f"{years[-1]}-12", freq="M", name="Month") if years else pd.PeriodIndex([], freq="M", name="Month")
+        frames = {year: flow_cube.monthly(year, income_types) for year in years}
+        monthly = pd.concat(frames, names=["Year", "Month"]) if frames else pd.DataFrame(columns=["Income", "Expenses"], dtype=float)
+        if frames:
+            monthly.index = pd.PeriodIndex([pd.Period(year=year, month=month, freq="M") for year, month in monthly.index])
+        monthly = monthly.reindex(months, fill_value=0.0).rename_axis("Month")
+        monthly["Savings"] = monthly["Income"] + monthly["Expenses"]
+        monthly["Ratio"] = cls._ratio(monthly["Savings"], monthly["Income"])
+        return cls(monthly)
+
+    @staticmethod
+    def _ratio(savings, income):
+        """Savings over income; NaN without income, as get_saving_ratio, which the gauges show blank."""
+        return savings / income.where(income != 0)
+
+    def ratio(self, year, month=None) -> float:
+        """The saving ratio of `year`, or of its `month`: savings over income, NaN without income."""
+        if month is None:
+            rows = self.monthly[self.monthly.index.year == year]
+        else:
+            rows = self.monthly[(self.monthly.index.year == year) & (self.monthly.index.month == month)]
+        return float(self._ratio(pd.Series([rows["Savings"].sum()]), pd.Series([rows["Income"].sum()])).iloc[0])
+
+    def month_without_income(self):
+        """(year, month) of the first month without income, or of the month before the table starts."""
+        months = self.monthly.index[self.monthly["Income"] == 0]
+        if len(months):
+            return months[0].year, months[0].month
+        first = self.monthly.index[0] - 1 if len(self.monthly) else pd.Period.now("M")
+        return first.year, first.month
+
+    def year(self, year) -> pd.DataFrame:
+        """The months of `year`, 1 to 12."""
+        return self.monthly[self.monthly.index.year == year]
+
+    def rolling(self, months=ROLLING_MONTHS) -> pd.Series:
+        """The saving ratio over the `months` to each month, from the first month with `months` behind it.
+
+        NaN over months without income, which the chart leaves as a gap."""
+        sums = self.monthly[["Savings", "Income"]].rolling(months).sum().dropna()
+        return self._ratio(sums["Savings"], sums["Income"])
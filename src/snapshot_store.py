@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from importlib import metadata
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # the store is an optimisation: without pyarrow the app recomputes as before
+    pa = None
+
+# Derived results worth keeping across restarts, and sharing between the gunicorn workers: the
+# per-year flow frames, values by asset, category lists, balances on the snapshot dates and the
+# category breakdowns. All are frames or Series, which Arrow stores natively.
+PERSISTED_METHODS = (
+    "get_flow_values",
+    "get_values_by_asset",
+    "get_all_categories",
+    "get_price_comparison_on_dates",
+    "get_category_breakdown",
+)
+
+# Unset: a ".derived" folder next to the data. "off" disables the store.
+DERIVED_DATA_PATH = os.getenv("DERIVED_DATA_PATH", "").strip()
+# Folder of DERIVED_DATA_PATH the stores are kept in, so that it may be shared (e.g. /tmp).
+STORE_FOLDER = "webapp-derived"
+# The name of a store folder: a fingerprint_inputs.
+_FINGERPRINT = re.compile(r"^[0-9a-f]{16}$")
+
+_KIND = b"webapp_kind"
+_SERIES_NAME = b"webapp_series_name"
+
+
+def fingerprint_inputs(paths) -> str:
+    """Identifies one version of the input files, plus the bkanalysis release deriving from them.
+
+    Size and modification time rather than a content hash: hashing the CSVs would cost a good part
+    of the parse this store exists to avoid, and they are only ever replaced wholesale."""
+    digest = hashlib.sha256()
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    try:
+        digest.update(metadata.version("bkanalysis").encode())
+    except metadata.PackageNotFoundError:
+        pass
+    return digest.hexdigest()[:16]
+
+
+class SnapshotStore:
+    """Derived frames persisted as Arrow IPC files, keyed by the fingerprint of the inputs.
+
+    A container restart with unchanged inputs finds its results here instead of re-deriving them, and
+    so does every worker process of the server: a result one worker derives, the others read back.
+    Files are written atomically (temp file + rename), so concurrent writers of the same key leave a
+    complete file whoever wins, and read back memory-mapped, lazily on first use. Any failure to read
+    or write is reported and treated as a miss: the store can only make the app faster, never break it."""
+
+    def __init__(self, directory, methods=PERSISTED_METHODS):
+        self.directory = directory
+        self.methods = frozenset(methods)
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def for_inputs(cls, data_path, input_paths):
+        """The store for the current inputs, or None when disabled, unavailable or not writable.
+
+        Stores are kept in `<root>/webapp-derived/<data folder>/<fingerprint>`, the data folder named
+        by a hash of its path. Stores left behind by previous versions of the same inputs are deleted:
+        they can never be hit again. Nothing else in the root is touched, nor are the stores of other
+        data folders (e.g. a benchmark's synthetic data)."""
+        if pa is None or DERIVED_DATA_PATH.lower() == "off":
+            return None
+
+        source = hashlib.sha256(os.path.realpath(data_path).encode()).hexdigest()[:16]
+        root = os.path.join(DERIVED_DATA_PATH or os.path.join(data_path, ".derived"), STORE_FOLDER, source)
+        try:
+            fingerprint = fingerprint_inputs(input_paths)
+            store = cls(os.path.join(root, fingerprint))
+            for entry in os.listdir(root):
+                if entry != fingerprint and _FINGERPRINT.match(entry):
+                    shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+        except OSError as exc:
+            print(f"Derived-data store disabled: {exc}")
+            return None
+
+        print(f"Derived-data store at {os.path.abspath(store.directory)}.")
+        return store
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode()).hexdigest() + ".arrow")
+
+    def accepts(self, key, value=None):
+        """Whether results for `key` (and `value`, once known) are persisted."""
+        if key[0] not in self.methods:
+            return False
+        return value is None or isinstance(value, (pd.DataFrame, pd.Series))
+
+    def load(self, key):
+        """The stored result for `key`, or None."""
+        path = self._path(key)
+        if not self.accepts(key) or not os.path.exists(path):
+            return None
+        try:
+            table = feather.read_table(path, memory_map=True)
+            frame = table.to_pandas()
+        except (OSError, pa.ArrowException) as exc:
+            print(f"Ignoring unreadable derived data {path}: {exc}")
+            return None
+
+        schema_metadata = table.schema.metadata or {}
+        if schema_metadata.get(_KIND) == b"series":
+            return frame.iloc[:, 0].rename(json.loads(schema_metadata[_SERIES_NAME]))
+        return frame
+
+    def clear(self):
+        """Delete every stored result."""
+        for entry in os.listdir(self.directory):
+            if entry.endswith(".arrow"):
+                os.remove(os.path.join(self.directory, entry))
+
+    def save(self, key, value):
+        """Persist `value` as the result for `key`, if it is of a kind the store keeps."""
+        if not self.accepts(key, value):
+            return
+
+        path = self._path(key)
+        tmp_path = None
+        try:
+            extra_metadata = {}
+            if isinstance(value, pd.Series):
+                extra_metadata = {_KIND: b"series", _SERIES_NAME: json.dumps(value.name).encode()}
+                value = value.to_frame(name="value")
+
+            table = pa.Table.from_pandas(value, preserve_index=True)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **extra_metadata})
+            with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as tmp:
+                tmp_path = tmp.name
+            # Uncompressed, so that the file can be memory-mapped straight back into Arrow buffers.
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError, pa.ArrowException) as exc:
+            print(f"Not persisting derived data for {key[0]}: {exc}")
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
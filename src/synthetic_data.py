@@ -0,0 +1,230 @@
+import argparse
+import os
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src import defaults
+
+# Columns of the pregenerated exports (DataManager.to_disk / MarketManager.to_disk), in their order.
+# Kept in one place so a bkanalysis schema change is a one-line fix here.
+TRANSACTION_COLUMNS = [
+    "Date",
+    "Account",
+    "Amount",
+    "Subcategory",
+    "Memo",
+    "Currency",
+    "MemoSimple",
+    "MemoMapped",
+    "Type",
+    "FullType",
+    "SubType",
+    "FullSubType",
+    "MasterType",
+    "FullMasterType",
+    "AccountType",
+    "FacingAccount",
+    "SourceFile",
+    "AssetMapped",
+]
+MARKET_COLUMNS = ["AssetMapped", "Date", "Close", "Currency"]
+
+# FullMasterType -> FullType -> FullSubTypes of the synthetic spending.
+SPEND_TYPES = {
+    "Essentials": {"Food": ["Grocery", "Restaurant"], "Housing": ["Utilities", "Furniture", "Rent"]},
+    "Discretionary": {"Travel": ["Flights", "Hotels"], "Leisure": ["Sport", "Books", "Cinema"]},
+}
+# IatIdentification tags this FullType as a transfer; its legs are paired through FacingAccount.
+IAT_FULL_TYPE = "Intra-Account Transfert"
+SECURITY_NAMES = ["VWRL", "VUKE", "CSPX", "EIMI", "IGLT", "AGGG"]
+DEFAULT_MONTHLY_SALARY = 10000.0
+
+
+@dataclass(frozen=True)
+class SyntheticSpec:
+    """Shape of a synthetic dataset. The same spec and seed always produce the same files."""
+
+    years: tuple = tuple(range(2016, 2025))
+    accounts: int = 2  # current accounts the spending is spread over
+    transactions_per_month: int = 30  # card spending, per account
+    memos_per_sub_type: int = 10  # distinct merchants (MemoMapped) per FullSubType
+    securities: int = 2
+    iat_per_month: int = 2  # transfers between the accounts, each a pair of legs
+    seed: int = 0
+
+    def scaled(self, factor):
+        """The same history with `factor` times the accounts, spending, merchants and securities."""
+        return replace(
+            self,
+            accounts=self.accounts * factor,
+            transactions_per_month=self.transactions_per_month * factor,
+            memos_per_sub_type=self.memos_per_sub_type * factor,
+            securities=self.securities * factor,
+            iat_per_month=self.iat_per_month * factor,
+        )
+
+
+def security_names(count):
+    """Tickers of the synthetic securities: real-looking ones first, then numbered ones."""
+    return SECURITY_NAMES[:count] + [f"SEC{i:03d}" for i in range(len(SECURITY_NAMES), count)]
+
+
+def payroll_schedule(years, salary_config=None):
+    """{year: (employer, payroll memos)}: the employers of SALARY_CONFIG in turn, over contiguous years.
+
+    Employers that list several payroll memos change memo from one year to the next, as happened
+    with the real ones, so every configured payroll shows up in the history."""
+    salary_config = defaults.SALARY_CONFIG if salary_config is None else salary_config
+    employers = list(salary_config)
+    years = sorted(years)
+    schedule = {}
+    for position, year in enumerate(years):
+        employer = employers[position * len(employers) // len(years)]
+        schedule[year] = (employer, salary_config[employer]["payrolls"])
+    return schedule
+
+
+def generate_transactions(spec: SyntheticSpec) -> pd.DataFrame:
+    """A deterministic transaction history: payrolls, card spending, transfers and security purchases."""
+    rng = np.random.default_rng(spec.seed)
+    accounts = [f"Checking {i + 1}" for i in range(spec.accounts)]
+    securities = security_names(spec.securities)
+    prices = _price_walks(spec, securities)
+    last_year = max(spec.years)
+
+    sub_types = [(master, full_type, sub) for master, types in SPEND_TYPES.items() for full_type, subs in types.items() for sub in subs]
+    merchants = {sub: [f"{sub.upper()} MERCHANT {i}" for i in range(spec.memos_per_sub_type)] for _, _, sub in sub_types}
+
+    rows = []
+    for year, (employer, payrolls) in payroll_schedule(spec.years).items():
+        monthly = defaults.SALARY_CONFIG.get(employer, {}).get("base_salary") or DEFAULT_MONTHLY_SALARY
+        salaries = [payroll for payroll in payrolls if "BONUS" not in payroll] or payrolls
+        salary_memo = salaries[year % len(salaries)]
+        for month in range(1, 13):
+            # December pay lands in January, which is what the salary classes' from-previous-year
+            # figures account for.
+            pay_date = datetime(year + 1, 1, 2) if month == 12 and year < last_year else datetime(year, month, 25)
+            rows.append(_row(pay_date, accounts[0], monthly, salary_memo, "Salary", "Salary", "Income"))
+            if month == 3:
+                for bonus in (payroll for payroll in payrolls if "BONUS" in payroll):
+                    rows.append(_row(datetime(year, 3, 15), accounts[0], round(monthly * rng.uniform(1, 3), 2), bonus, "Salary", "Bonus", "Income"))
+
+            for account in accounts:
+                for _ in range(spec.transactions_per_month):
+                    master, full_type, sub = sub_types[int(rng.integers(len(sub_types)))]
+                    merchant = merchants[sub][int(rng.integers(len(merchants[sub])))]
+                    amount = -round(float(rng.lognormal(3.5, 1.0)), 2)
+                    date = datetime(year, month, int(rng.integers(1, 29)))
+                    # raw memos carry a terminal/reference suffix, as bank exports do
+                    rows.append(_row(date, account, amount, merchant, full_type, sub, master, memo=f"{merchant} #{int(rng.integers(10000)):04d}"))
+
+            for _ in range(spec.iat_per_month if len(accounts) > 1 else 0):
+                source, target = rng.choice(len(accounts), 2, replace=False)
+                amount = round(float(rng.uniform(100, 2000)), 2)
+                date = datetime(year, month, int(rng.integers(1, 29)))
+                rows.append(_row(date, accounts[source], -amount, "TRANSFER", IAT_FULL_TYPE, IAT_FULL_TYPE, "Transfer", facing_account=accounts[target]))
+                rows.append(_row(date, accounts[target], amount, "TRANSFER", IAT_FULL_TYPE, IAT_FULL_TYPE, "Transfer", facing_account=accounts[source]))
+
+            if securities:
+                security = securities[(year * 12 + month) % len(securities)]
+                date = datetime(year, month, 5)
+                cash = 1000.0
+                rows.append(_row(date, "Brokerage", -cash, f"BUY {security}", "Investment", "Investment", "Investment", account_type="Investment"))
+                rows.append(
+                    _row(
+                        date,
+                        "Brokerage",
+                        round(cash / prices[security].asof(pd.Timestamp(date)), 6),
+                        f"BUY {security}",
+                        "Investment",
+                        "Investment",
+                        "Investment",
+                        currency=security,
+                        account_type="Investment",
+                    )
+                )
+            if securities and month == 1:
+                # funds the purchases of the year
+                date = datetime(year, 1, 2)
+                rows.append(_row(date, accounts[0], -12000.0, "TRANSFER", IAT_FULL_TYPE, IAT_FULL_TYPE, "Transfer", facing_account="Brokerage"))
+                rows.append(
+                    _row(date, "Brokerage", 12000.0, "TRANSFER", IAT_FULL_TYPE, IAT_FULL_TYPE, "Transfer", facing_account=accounts[0], account_type="Investment")
+                )
+
+    return pd.DataFrame(rows, columns=TRANSACTION_COLUMNS).sort_values("Date", kind="stable").reset_index(drop=True)
+
+
+def generate_prices(spec: SyntheticSpec) -> pd.DataFrame:
+    """Daily closes in the reference currency: 1 for cash, a geometric random walk per security."""
+    securities = security_names(spec.securities)
+    walks = _price_walks(spec, securities)
+    frames = [pd.DataFrame({"AssetMapped": defaults.REF_CURRENCY, "Date": _price_dates(spec), "Close": 1.0, "Currency": defaults.REF_CURRENCY})]
+    for security in securities:
+        walk = walks[security]
+        frames.append(pd.DataFrame({"AssetMapped": security, "Date": walk.index, "Close": walk.to_numpy().round(4), "Currency": defaults.REF_CURRENCY}))
+    return pd.concat(frames, ignore_index=True)[MARKET_COLUMNS]
+
+
+def write_dataset(out_dir, spec: SyntheticSpec):
+    """Write data_manager.csv and data_market.csv into `out_dir`; returns `out_dir`."""
+    os.makedirs(out_dir, exist_ok=True)
+    generate_transactions(spec).to_csv(os.path.join(out_dir, "data_manager.csv"), index=False, date_format="%Y-%m-%d")
+    generate_prices(spec).to_csv(os.path.join(out_dir, "data_market.csv"), index=False, date_format="%Y-%m-%d")
+    return out_dir
+
+
+def _price_dates(spec):
+    # from the opening snapshot (31-Dec of the year before the first) to the last December pay date
+    return pd.date_range(datetime(min(spec.years) - 1, 12, 1), datetime(max(spec.years) + 1, 1, 31), freq="D")
+
+
+def _price_walks(spec, securities):
+    # seeded apart from the transactions, so that the prices do not change with the spending volume
+    rng = np.random.default_rng([spec.seed, 1])
+    dates = _price_dates(spec)
+    return {security: pd.Series(100.0 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, len(dates)))), index=dates) for security in securities}
+
+
+def _row(date, account, amount, memo_mapped, full_type, full_sub_type, full_master_type, memo=None, currency=None, facing_account=None, account_type="Current"):
+    currency = currency or defaults.REF_CURRENCY
+    return [
+        date,
+        account,
+        amount,
+        "",
+        memo or memo_mapped,
+        currency,
+        memo_mapped,
+        memo_mapped,
+        "IAT" if facing_account else ("C" if amount > 0 else "D"),
+        full_type,
+        full_sub_type,
+        full_sub_type,
+        full_master_type,
+        full_master_type,
+        account_type,
+        facing_account or "",
+        "synthetic",
+        currency,
+    ]
+
+
+def main():
+    """Write a synthetic data_manager.csv/data_market.csv pair, for load tests and benchmarks."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--out", required=True, help="folder to write the CSVs to (use it as DATA_PATH)")
+    parser.add_argument("--years", type=int, nargs=2, metavar=("FIRST", "LAST"), default=(defaults.YEARS.start, defaults.YEARS.stop - 1))
+    parser.add_argument("--scale", type=int, default=1, help="multiplies accounts, spending, merchants, securities and transfers")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    spec = SyntheticSpec(years=tuple(range(args.years[0], args.years[1] + 1)), seed=args.seed).scaled(args.scale)
+    write_dataset(args.out, spec)
+    print(f"Wrote a synthetic dataset ({spec}) to {os.path.abspath(args.out)}.")
+
+
+if __name__ == "__main__":
+    main()
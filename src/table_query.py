@@ -0,0 +1,91 @@
+import math
+import re
+
+import pandas as pd
+
+# Rows of a DataTable sent to the browser at a time.
+TABLE_PAGE_SIZE = 20
+
+# One clause of a DataTable filter_query, e.g. `{Capital Gain} > 100` or `{AssetMapped} contains "VW"`.
+# DataTable writes operators either as symbols or as words depending on the version and column type,
+# prefixed with `s` (case-sensitive) or `i` (case-insensitive) when the filter_options case or the user
+# asks, e.g. `{MemoMapped} icontains "shop"` or `{AssetMapped} s= VW`.
+_CLAUSE = re.compile(r"^\{(?P<column>[^}]+)\}\s*(?P<case>[si]?)(?P<operator>>=|<=|!=|>|<|=|ge|le|lt|gt|ne|eq|contains|datestartswith)\s*(?P<value>.*)$")
+_OPERATORS = {"ge": ">=", "le": "<=", "lt": "<", "gt": ">", "ne": "!=", "eq": "="}
+
+
+def parse_filter_query(filter_query):
+    """The (column, operator, value) clauses of a DataTable filter_query.
+
+    Only the `&&`-joined clauses the column filters produce are understood; anything else is
+    ignored rather than failing the callback. Operators are normalised to their symbol, keeping their
+    case prefix (`ieq` is `i=`), quoted values unquoted and numeric ones converted to float."""
+    clauses = []
+    for part in (filter_query or "").split(" && "):
+        match = _CLAUSE.match(part.strip())
+        if match is None:
+            continue
+        value = match["value"].strip()
+        if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'`":
+            value = value[1:-1]
+        else:
+            try:
+                value = float(value)
+            except ValueError:
+                pass
+        clauses.append((match["column"], match["case"] + _OPERATORS.get(match["operator"], match["operator"]), value))
+    return clauses
+
+
+def filter_frame(df: pd.DataFrame, filter_query) -> pd.DataFrame:
+    """The rows of `df` matching `filter_query`; clauses on unknown columns are ignored.
+
+    Text is matched case-insensitively by `contains` and exactly by `=`, unless the operator has a
+    case prefix: `s` makes it case-sensitive, `i` case-insensitive. Numbers have no case."""
+    mask = pd.Series(True, index=df.index)
+    for column, operator, value in parse_filter_query(filter_query):
+        if column not in df.columns:
+            continue
+        series = df[column]
+        case, operator = (operator[0], operator[1:]) if operator[0] in "si" else ("", operator)
+        if operator == "contains":
+            mask &= series.astype(str).str.contains(str(value), case=case == "s", regex=False)
+        elif operator == "datestartswith":
+            mask &= series.astype(str).str.startswith(str(value))
+        elif isinstance(value, float) and pd.api.types.is_numeric_dtype(series):
+            mask &= {"=": series == value, "!=": series != value, ">": series > value, ">=": series >= value, "<": series < value, "<=": series <= value}[operator]
+        elif operator in ("=", "!="):
+            # typed into a text column, a number still matches as text
+            text = series.astype(str)
+            value = f"{value:g}" if isinstance(value, float) else value
+            if case == "i":
+                text, value = text.str.lower(), value.lower()
+            mask &= (text == value) if operator == "=" else (text != value)
+    return df[mask]
+
+
+def query_table(df: pd.DataFrame, filter_query=None, sort_by=None, page_current=0, page_size=TABLE_PAGE_SIZE):
+    """One page of `df`, filtered and sorted as a DataTable with custom actions asks, the page count and its page.
+
+    The page is `page_current` clamped to the pages there are: a filter may leave fewer than the
+    table was on, and the callback sends it back so that the table shows the page it is given.
+
+    Rows get an `id` column holding their position in `df` (unless they have one already): DataTable
+    reports it as active_cell["row_id"], which identifies the clicked row however the table is
+    paged, sorted or filtered (see callbacks.resolve_row_index)."""
+    if "id" not in df.columns:
+        df = df.assign(id=range(len(df)))
+
+    df = filter_frame(df, filter_query)
+    sort_by = [sort for sort in (sort_by or []) if sort.get("column_id") in df.columns]
+    if sort_by:
+        df = df.sort_values(
+            [sort["column_id"] for sort in sort_by],
+            ascending=[sort.get("direction") != "desc" for sort in sort_by],
+            kind="stable",
+        )
+
+    page_size = page_size or TABLE_PAGE_SIZE
+    page_count = max(1, math.ceil(len(df) / page_size))
+    page_current = min(max(page_current or 0, 0), page_count - 1)
+    return df.iloc[page_current * page_size : (page_current + 1) * page_size], page_count, page_current
@@ -0,0 +1,97 @@
+import os
+import queue
+import threading
+import time
+import traceback
+
+# Opt-in: warming every year roughly multiplies the startup CPU work by the number of years, which
+# is only worth it on a long-running deployment.
+WARMUP_ENABLED = os.getenv("WARMUP_YEARS", "").strip().lower() in ("1", "true", "yes", "on")
+WARMUP_WORKERS = int(os.getenv("WARMUP_WORKERS", "2"))
+
+
+class YearWarmer:
+    """Computes every year in the background so that the first click on it is a cache hit.
+
+    Years are warmed most recent first, as those are the ones people open. The work runs on daemon
+    threads, so it never delays the server from listening nor the process from exiting, and the
+    callbacks stay correct while it runs: a year the user opens mid-warm-up simply joins the build
+    in flight through the single-flight caches."""
+
+    def __init__(self, warm_year, years, workers: int = WARMUP_WORKERS):
+        self._warm_year = warm_year
+        self._years = sorted(years, reverse=True)
+        self._workers = max(1, workers)
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._finished_at = None
+        self._done = {}  # year -> seconds taken
+        self._failed = {}  # year -> error message
+        self._in_progress = set()
+        self._finished = threading.Event()
+
+    def start(self):
+        """Start warming in the background; returns immediately."""
+        pending = queue.SimpleQueue()
+        for year in self._years:
+            pending.put(year)
+
+        with self._lock:
+            self._started_at = time.time()
+
+        for i in range(min(self._workers, len(self._years))):
+            threading.Thread(target=self._work, args=(pending,), name=f"warmup-{i}", daemon=True).start()
+        return self
+
+    def _work(self, pending):
+        while True:
+            try:
+                year = pending.get_nowait()
+            except queue.Empty:
+                return
+
+            with self._lock:
+                self._in_progress.add(year)
+            start = time.perf_counter()
+            try:
+                self._warm_year(year)
+            except Exception as exc:  # one bad year must not stop the others from warming
+                traceback.print_exc()
+                with self._lock:
+                    self._failed[year] = f"{type(exc).__name__}: {exc}"
+            else:
+                with self._lock:
+                    self._done[year] = round(time.perf_counter() - start, 3)
+            finally:
+                with self._lock:
+                    self._in_progress.discard(year)
+                    if len(self._done) + len(self._failed) == len(self._years):
+                        self._finished_at = time.time()
+                        self._finished.set()
+                        print(f"Warm-up finished: {len(self._done)} years warmed, {len(self._failed)} failed.")
+
+    def wait(self, timeout=None) -> bool:
+        """Wait for every year to be warmed (or to fail), if warming was started; whether it is over."""
+        with self._lock:
+            started = self._started_at is not None and bool(self._years)
+        return self._finished.wait(timeout) if started else True
+
+    def status(self) -> dict:
+        """Progress, in a JSON-serialisable form for the status endpoint."""
+        with self._lock:
+            if self._started_at is None:
+                state = "idle"
+            elif self._finished_at is None:
+                state = "running"
+            else:
+                state = "done"
+            settled = set(self._done) | set(self._failed) | self._in_progress
+            return {
+                "state": state,
+                "total": len(self._years),
+                "warmed": dict(self._done),
+                "failed": dict(self._failed),
+                "in_progress": sorted(self._in_progress, reverse=True),
+                "pending": [year for year in self._years if year not in settled],
+                "elapsed_seconds": round((self._finished_at or time.time()) - self._started_at, 3) if self._started_at else None,
+            }
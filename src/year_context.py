@@ -0,0 +1,95 @@
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from src.fork_safety import reset_after_fork
+from src.metrics import note_cache_lookup
+
+
+@dataclass(frozen=True)
+class YearContext:
+    """The per-year inputs every tab callback reads from.
+
+    Selecting a year fires all the tab callbacks at once, and each of them used to call
+    get_flow_values/get_values_by_asset on the same range, re-merging the full history every time.
+    Built once per year instead, so the callbacks only slice and plot."""
+
+    year: int
+    flow_range: list
+    value_dates: list
+    df_total_flow: object
+    df_total_spend: object
+    total_spend: float
+    df_values_by_asset: object
+    iat_imbalance: float
+    salary: object
+
+    @property
+    def capital_pnl(self) -> float:
+        """Market capital gain over the year, across every asset."""
+        return self.df_values_by_asset.CapitalGain.sum()
+
+
+class YearContextStore:
+    """Builds each YearContext at most once, however many callbacks ask for it concurrently.
+
+    Flask serves callbacks on threads, and a year change fires them together: a plain
+    "if year not in cache" check would let every one of them miss and build the same context in
+    parallel. The first caller for a year builds it; the others wait on its Future. A failed build is
+    not cached, so the next request retries rather than replaying the error forever."""
+
+    def __init__(self, build):
+        self._build = build
+        self._lock = threading.Lock()
+        self._futures = {}
+        self.hits = 0
+        self.misses = 0
+        reset_after_fork(self)
+
+    def _after_fork(self):
+        # in a forked child: keep the built contexts, drop those a thread of the parent was building
+        self._lock = threading.Lock()
+        self._futures = {year: future for year, future in self._futures.items() if future.done() and future.exception() is None}
+
+    def get(self, year) -> YearContext:
+        """The context for `year`, building it on first use."""
+        with self._lock:
+            future = self._futures.get(year)
+            is_builder = future is None
+            if is_builder:
+                future = self._futures[year] = Future()
+                self.misses += 1
+            else:
+                self.hits += 1
+        note_cache_lookup("year_context", not is_builder)
+
+        if is_builder:
+            try:
+                future.set_result(self._build(year))
+            except BaseException as exc:
+                with self._lock:
+                    del self._futures[year]
+                future.set_exception(exc)
+                raise
+
+        return future.result()
+
+    def adopt(self, other: "YearContextStore", years):
+        """Take over the contexts `other` has built for `years`, e.g. those a reload leaves unchanged."""
+        with other._lock:
+            futures = {year: other._futures[year] for year in years if year in other._futures}
+        with self._lock:
+            for year, future in futures.items():
+                if future.done() and future.exception() is None:
+                    self._futures.setdefault(year, future)
+
+    def clear(self):
+        """Drop every built context: the next get of each year builds it again."""
+        with self._lock:
+            self._futures = {year: future for year, future in self._futures.items() if not future.done()}
+
+    def years(self):
+        """Years whose context is built or being built."""
+        with self._lock:
+            return sorted(self._futures)
+
@@ -1,11 +1,31 @@
+from typing import TYPE_CHECKING
+
 from dash import dcc, html, dash_table
 from dash.dash_table.Format import Format, Scheme
 import dash_bootstrap_components as dbc
-from bkanalysis.salary import Salary
+import plotly.graph_objects as go
+
+from src.payload import slim_figure, table_records
+from src.table_query import TABLE_PAGE_SIZE, query_table
+
+if TYPE_CHECKING:  # only for the annotation: layouts should not pull in bkanalysis
+    from bkanalysis.salary import Salary
 
 ACCOUNT_TYPE = "AccountType"
 ASSET_MAPPED = "AssetMapped"
 PANEL_CLASS = "border p-3"  # bordered wrapper around a figure
+# Paging, sorting and filtering done on the server (callbacks.update_*_page): the table starts on
+# its first page, unsorted and unfiltered, and the browser only ever holds the page shown.
+SERVER_SIDE_TABLE = {
+    "page_action": "custom",
+    "page_current": 0,
+    "page_size": TABLE_PAGE_SIZE,
+    "sort_action": "custom",
+    "sort_mode": "single",
+    "sort_by": [],
+    "filter_action": "custom",
+    "filter_query": "",
+}
 
 
 def section_separator():
@@ -43,151 +63,23 @@ def get_iat_warning(iat_imbalance, threshold=500):
     )
 
 
-def get_tab_1(
-    df_cash_account_type,
-    total_value_end,
-    total_value_start,
-    salary: Salary,
-    total_spend,
-    capital_gain,
-    fig_spend_waterfall,
-    fig_wealth,
-    iat_imbalance=None,
-    other_income=0.0,
-):
-    """Returns the layout of the first tab.
-
-    other_income sums the FullTypes excluded from both total_spend and the Received Salary card
-    (Capital Earnings, realized Capital Gain, Exceptional Income, Tax — see defaults.INCOME_TYPES)
-    plus salary.outstanding_salary, so that no flow is invisible across the tab's cards: YoY Wealth
-    Change reconciles to Received Salary + Capital Gain (Market) + Total Spending + Other Income,
-    up to the IAT imbalance."""
-    assert df_cash_account_type.columns[0] == ACCOUNT_TYPE, f"Incorrect Columns, expected {ACCOUNT_TYPE} but got {df_cash_account_type.columns[0]}."
-    assert len(df_cash_account_type.columns) == 3, f"Incorrect Columns count, expected 3 but got {len(df_cash_account_type.columns)}."
-
-    first_month = df_cash_account_type.columns[1]
-    last_month = df_cash_account_type.columns[2]
-
-    capital_gain_color = get_color(capital_gain, threshold=500)
-    yoy_wealth_change_color = get_color(total_value_end - total_value_start, threshold=500)
-    other_income_color = get_color(other_income, threshold=500)
-    iat_warning = get_iat_warning(iat_imbalance)
+def get_tab_1():
+    """Returns the layout of the first tab, without its content.
 
+    Each part is filled by its own callback, with only the inputs it depends on: the IAT banner
+    (tab1-iat-banner), the cards (tab1-cards, see get_tab_1_cards), the wealth chart (tab1-wealth),
+    the account type table (tab1-accounts, see get_account_type_table) and the waterfall
+    (tab1-waterfall), which alone depends on the capital gain checkbox."""
     return dbc.Container(
         [
             dbc.Row(
                 [
                     # Separator
                     section_separator(),
-                    *([iat_warning] if iat_warning is not None else []),
+                    html.Div(id="tab1-iat-banner"),
                     # Main content section — six cards at width=2 each so they all fit on one line
-                    # (2 * 6 = 12 grid columns). The last card sums the FullTypes excluded from
-                    # both Total Spending and Received Salary (Capital Earnings, realized Capital
-                    # Gain, Exceptional Income, Tax — see defaults.INCOME_TYPES) plus the
-                    # Outstanding Salary, so no flow is hidden.
-                    dbc.Row(
-                        [
-                            # Card displaying total value
-                            dbc.Col(
-                                dbc.Card(
-                                    dbc.CardBody(
-                                        [
-                                            html.H4("Total Wealth", className="card-title"),
-                                            html.H2(
-                                                f"${total_value_end:,.0f}",
-                                                className="card-text text-success fw-bold",
-                                            ),
-                                        ]
-                                    ),
-                                    className="mb-3",
-                                ),
-                                width=2,
-                            ),
-                            # Card displaying Year-on-Year change
-                            dbc.Col(
-                                dbc.Card(
-                                    dbc.CardBody(
-                                        [
-                                            html.H4("YoY Wealth Change", className="card-title"),
-                                            html.H2(
-                                                f"${total_value_end - total_value_start:,.0f}",
-                                                className=f"card-text {yoy_wealth_change_color} fw-bold",
-                                            ),
-                                        ]
-                                    ),
-                                    className="mb-3",
-                                ),
-                                width=2,
-                            ),
-                            # Card displaying Salary Perceived during that year value
-                            dbc.Col(
-                                dbc.Card(
-                                    dbc.CardBody(
-                                        [
-                                            html.H4(
-                                                "Received Salary",
-                                                className="card-title",
-                                            ),
-                                            html.H2(
-                                                f"${salary.actual_salary:,.0f}",
-                                                className="card-text text-success fw-bold",
-                                            ),
-                                        ]
-                                    ),
-                                    className="mb-3",
-                                ),
-                                width=2,
-                            ),
-                            # Card displaying Capital Gain/Loss during that year value
-                            dbc.Col(
-                                dbc.Card(
-                                    dbc.CardBody(
-                                        [
-                                            html.H4("Capital Gain (Market)", className="card-title"),
-                                            html.H2(
-                                                f"${capital_gain:,.0f}",
-                                                className=f"card-text {capital_gain_color} fw-bold",
-                                            ),
-                                        ]
-                                    ),
-                                    className="mb-3",
-                                ),
-                                width=2,
-                            ),
-                            # Card displaying Total Spending during that year value
-                            dbc.Col(
-                                dbc.Card(
-                                    dbc.CardBody(
-                                        [
-                                            html.H4("Total Spending", className="card-title"),
-                                            html.H2(
-                                                f"${total_spend:,.0f}",
-                                                className="card-text text-danger fw-bold",
-                                            ),
-                                        ]
-                                    ),
-                                    className="mb-3",
-                                ),
-                                width=2,
-                            ),
-                            # Card displaying the Other Income total (see note above)
-                            dbc.Col(
-                                dbc.Card(
-                                    dbc.CardBody(
-                                        [
-                                            html.H4("Other Income", className="card-title"),
-                                            html.H2(
-                                                f"${other_income:,.0f}",
-                                                className=f"card-text {other_income_color} fw-bold",
-                                            ),
-                                        ]
-                                    ),
-                                    className="mb-3",
-                                ),
-                                width=2,
-                            ),
-                        ]
-                    ),
+                    # (2 * 6 = 12 grid columns).
+                    dbc.Row(id="tab1-cards"),
                     # Main content section
                     dbc.Row(
                         [
@@ -195,83 +87,9 @@ def get_tab_1(
                             dbc.Col(
                                 html.Div(
                                     [
-                                        dcc.Graph(figure=fig_wealth),
+                                        dcc.Graph(id="tab1-wealth"),
                                         html.Div("Breakdown by Account Type"),
-                                        dash_table.DataTable(
-                                            columns=[
-                                                {
-                                                    "name": "Account Type",
-                                                    "id": ACCOUNT_TYPE,
-                                                    "type": "text",
-                                                },
-                                                {
-                                                    "name": first_month,
-                                                    "id": first_month,
-                                                    "type": "numeric",
-                                                    "format": Format(
-                                                        precision=0,
-                                                        scheme=Scheme.fixed,
-                                                        group=True,
-                                                    ),
-                                                },
-                                                {
-                                                    "name": last_month,
-                                                    "id": last_month,
-                                                    "type": "numeric",
-                                                    "format": Format(
-                                                        precision=0,
-                                                        scheme=Scheme.fixed,
-                                                        group=True,
-                                                    ),
-                                                },
-                                            ],
-                                            data=df_cash_account_type.to_dict("records"),
-                                            style_table={"overflowX": "auto"},  # Handle table overflow
-                                            style_cell={
-                                                "textAlign": "left",
-                                                "padding": "5px",  # Reduced padding for smaller row height
-                                                "lineHeight": "15px",  # Adjust line height for compactness
-                                            },
-                                            style_header={
-                                                "backgroundColor": "lightgrey",
-                                                "fontWeight": "bold",
-                                            },
-                                            style_data_conditional=[
-                                                {
-                                                    "if": {
-                                                        "filter_query": f"{{{first_month}}} > 0",
-                                                        "column_id": first_month,
-                                                    },
-                                                    "color": "green",
-                                                    "fontWeight": "bold",
-                                                },
-                                                {
-                                                    "if": {
-                                                        "filter_query": f"{{{first_month}}} < 0",
-                                                        "column_id": first_month,
-                                                    },
-                                                    "color": "red",
-                                                    "fontWeight": "bold",
-                                                },
-                                                {
-                                                    "if": {
-                                                        "filter_query": f"{{{last_month}}} > 0",
-                                                        "column_id": last_month,
-                                                    },
-                                                    "color": "green",
-                                                    "fontWeight": "bold",
-                                                },
-                                                {
-                                                    "if": {
-                                                        "filter_query": f"{{{last_month}}} < 0",
-                                                        "column_id": last_month,
-                                                    },
-                                                    "color": "red",
-                                                    "fontWeight": "bold",
-                                                },
-                                            ],
-                                            style_as_list_view=True,  # Render rows more compactly
-                                        ),
+                                        html.Div(id="tab1-accounts"),
                                     ],
                                     className=PANEL_CLASS,
                                 ),
@@ -281,7 +99,7 @@ def get_tab_1(
                             dbc.Col(
                                 html.Div(
                                     [
-                                        dcc.Graph(figure=fig_spend_waterfall),
+                                        dcc.Graph(id="tab1-waterfall"),
                                     ],
                                     className=PANEL_CLASS,
                                 ),
@@ -290,6 +108,8 @@ def get_tab_1(
                         ],
                         className="mb-4",
                     ),
+                    # inputs the waterfall was last computed for, see callbacks.should_render
+                    dcc.Store(id="tab1-waterfall-rendered"),
                 ]
             )
         ],
@@ -297,6 +117,206 @@ def get_tab_1(
     )
 
 
+def get_tab_1_cards(total_value_end, total_value_start, salary: "Salary", total_spend, capital_gain, other_income=0.0):
+    """Returns the cards of the first tab.
+
+    other_income sums the FullTypes excluded from both total_spend and the Received Salary card
+    (Capital Earnings, realized Capital Gain, Exceptional Income, Tax — see defaults.INCOME_TYPES)
+    plus salary.outstanding_salary, so that no flow is invisible across the tab's cards: YoY Wealth
+    Change reconciles to Received Salary + Capital Gain (Market) + Total Spending + Other Income,
+    up to the IAT imbalance."""
+    capital_gain_color = get_color(capital_gain, threshold=500)
+    yoy_wealth_change_color = get_color(total_value_end - total_value_start, threshold=500)
+    other_income_color = get_color(other_income, threshold=500)
+
+    return [
+        # Card displaying total value
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody(
+                    [
+                        html.H4("Total Wealth", className="card-title"),
+                        html.H2(
+                            f"${total_value_end:,.0f}",
+                            className="card-text text-success fw-bold",
+                        ),
+                    ]
+                ),
+                className="mb-3",
+            ),
+            width=2,
+        ),
+        # Card displaying Year-on-Year change
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody(
+                    [
+                        html.H4("YoY Wealth Change", className="card-title"),
+                        html.H2(
+                            f"${total_value_end - total_value_start:,.0f}",
+                            className=f"card-text {yoy_wealth_change_color} fw-bold",
+                        ),
+                    ]
+                ),
+                className="mb-3",
+            ),
+            width=2,
+        ),
+        # Card displaying Salary Perceived during that year value
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody(
+                    [
+                        html.H4(
+                            "Received Salary",
+                            className="card-title",
+                        ),
+                        html.H2(
+                            f"${salary.actual_salary:,.0f}",
+                            className="card-text text-success fw-bold",
+                        ),
+                    ]
+                ),
+                className="mb-3",
+            ),
+            width=2,
+        ),
+        # Card displaying Capital Gain/Loss during that year value
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody(
+                    [
+                        html.H4("Capital Gain (Market)", className="card-title"),
+                        html.H2(
+                            f"${capital_gain:,.0f}",
+                            className=f"card-text {capital_gain_color} fw-bold",
+                        ),
+                    ]
+                ),
+                className="mb-3",
+            ),
+            width=2,
+        ),
+        # Card displaying Total Spending during that year value
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody(
+                    [
+                        html.H4("Total Spending", className="card-title"),
+                        html.H2(
+                            f"${total_spend:,.0f}",
+                            className="card-text text-danger fw-bold",
+                        ),
+                    ]
+                ),
+                className="mb-3",
+            ),
+            width=2,
+        ),
+        # Card displaying the Other Income total (see note above)
+        dbc.Col(
+            dbc.Card(
+                dbc.CardBody(
+                    [
+                        html.H4("Other Income", className="card-title"),
+                        html.H2(
+                            f"${other_income:,.0f}",
+                            className=f"card-text {other_income_color} fw-bold",
+                        ),
+                    ]
+                ),
+                className="mb-3",
+            ),
+            width=2,
+        ),
+    ]
+
+
+def get_account_type_table(df_cash_account_type):
+    """Returns the table of the wealth by account type, at the start and end of the year."""
+    assert df_cash_account_type.columns[0] == ACCOUNT_TYPE, f"Incorrect Columns, expected {ACCOUNT_TYPE} but got {df_cash_account_type.columns[0]}."
+    assert len(df_cash_account_type.columns) == 3, f"Incorrect Columns count, expected 3 but got {len(df_cash_account_type.columns)}."
+
+    first_month = df_cash_account_type.columns[1]
+    last_month = df_cash_account_type.columns[2]
+
+    return dash_table.DataTable(
+        columns=[
+            {
+                "name": "Account Type",
+                "id": ACCOUNT_TYPE,
+                "type": "text",
+            },
+            {
+                "name": first_month,
+                "id": first_month,
+                "type": "numeric",
+                "format": Format(
+                    precision=0,
+                    scheme=Scheme.fixed,
+                    group=True,
+                ),
+            },
+            {
+                "name": last_month,
+                "id": last_month,
+                "type": "numeric",
+                "format": Format(
+                    precision=0,
+                    scheme=Scheme.fixed,
+                    group=True,
+                ),
+            },
+        ],
+        data=table_records(df_cash_account_type),
+        style_table={"overflowX": "auto"},  # Handle table overflow
+        style_cell={
+            "textAlign": "left",
+            "padding": "5px",  # Reduced padding for smaller row height
+            "lineHeight": "15px",  # Adjust line height for compactness
+        },
+        style_header={
+            "backgroundColor": "lightgrey",
+            "fontWeight": "bold",
+        },
+        style_data_conditional=[
+            {
+                "if": {
+                    "filter_query": f"{{{first_month}}} > 0",
+                    "column_id": first_month,
+                },
+                "color": "green",
+                "fontWeight": "bold",
+            },
+            {
+                "if": {
+                    "filter_query": f"{{{first_month}}} < 0",
+                    "column_id": first_month,
+                },
+                "color": "red",
+                "fontWeight": "bold",
+            },
+            {
+                "if": {
+                    "filter_query": f"{{{last_month}}} > 0",
+                    "column_id": last_month,
+                },
+                "color": "green",
+                "fontWeight": "bold",
+            },
+            {
+                "if": {
+                    "filter_query": f"{{{last_month}}} < 0",
+                    "column_id": last_month,
+                },
+                "color": "red",
+                "fontWeight": "bold",
+            },
+        ],
+        style_as_list_view=True,  # Render rows more compactly
+    )
+
+
 def get_tab_2(total_spend, category, fig_category_brkdn, fig_spend_brkdn, df_category_brkdn):
     """Returns the layout of the second tab"""
 
@@ -307,6 +327,7 @@ def get_tab_2(total_spend, category, fig_category_brkdn, fig_spend_brkdn, df_cat
     # Spending arrives as a negative flow, so get_color already renders a large spend red. Its
     # threshold is the band around zero that counts as neutral, not a sign convention.
     category_spend_color = get_color(category_spend, threshold=50)
+    first_page, page_count, _ = query_table(df_category_brkdn)
 
     return dbc.Row(
         [
@@ -349,15 +370,24 @@ def get_tab_2(total_spend, category, fig_category_brkdn, fig_spend_brkdn, df_cat
                             ),
                         ]
                     ),
-                    dcc.Graph(id="fig_spend_brkdn", figure=fig_spend_brkdn, style={"height": "600px"}),
+                    # Depth of the sunburst, applied in the browser (see set_sunburst_depth in assets/clientside.js)
+                    dcc.RadioItems(
+                        id="sunburst-depth",
+                        options=[{"label": " 2 levels", "value": 2}, {"label": " 3 levels", "value": 3}, {"label": " All", "value": -1}],
+                        value=-1,
+                        inline=True,
+                        inputStyle={"marginLeft": "10px"},
+                    ),
+                    dcc.Graph(id="fig_spend_brkdn", figure=slim_figure(fig_spend_brkdn), style={"height": "600px"}),
                 ],  # Top-right
                 width=6,
                 style={"display": "flex", "flexDirection": "column", "height": "100%"},
             ),
             dbc.Col(
                 [
-                    dcc.Graph(id="fig_category_brkdn", figure=fig_category_brkdn),  # Bottom-left
+                    dcc.Graph(id="fig_category_brkdn", figure=slim_figure(fig_category_brkdn)),  # Bottom-left
                     dash_table.DataTable(
+                        id="category_tbl",
                         columns=[
                             {
                                 "name": df_category_brkdn.columns[0],
@@ -371,7 +401,9 @@ def get_tab_2(total_spend, category, fig_category_brkdn, fig_spend_brkdn, df_cat
                                 "format": Format(precision=0, scheme=Scheme.fixed, group=True),
                             },
                         ],
-                        data=df_category_brkdn.to_dict("records"),
+                        data=table_records(first_page),
+                        page_count=page_count,
+                        **SERVER_SIDE_TABLE,
                         style_table={"overflowX": "auto"},  # Handle table overflow
                         style_cell={
                             "textAlign": "left",
@@ -392,12 +424,18 @@ def get_tab_2(total_spend, category, fig_category_brkdn, fig_spend_brkdn, df_cat
     )
 
 
+def capital_table_decimals(capital_df):
+    """Display precision of the capital table columns that are not whole dollars: the return is a ratio shown as 0.0%."""
+    return {capital_df.columns[3]: 3}
+
+
 def get_tab_3(capital_df, capital_fig):
     """Returns the layout of the 'Capital Breakdown' tab"""
     assert capital_df.columns[0] == ASSET_MAPPED, f"Incorrect Columns, expected {ASSET_MAPPED} but got {capital_df.columns[0]}."
     start_value = capital_df.columns[1]
     capital_gain = capital_df.columns[2]
     yoy_return = capital_df.columns[3]
+    first_page, page_count, _ = query_table(capital_df)
 
     dash_tbl_capital = dash_table.DataTable(
         id="capital_tbl",
@@ -438,7 +476,8 @@ def get_tab_3(capital_df, capital_fig):
                 ),
             },
         ],
-        data=capital_df.to_dict("records"),
+        data=table_records(first_page, columns_decimals=capital_table_decimals(capital_df)),
+        page_count=page_count,
         style_table={"overflowX": "auto"},  # Handle table overflow
         style_cell={
             "textAlign": "left",
@@ -484,8 +523,9 @@ def get_tab_3(capital_df, capital_fig):
             },
         ],
         style_as_list_view=True,  # Render rows more compactly
-        # row_selectable="single",  # enable click-to-select
-        # selected_rows=[],  # start with none selected
+        # Paged, sorted and filtered on the server; update_capital maps the clicked row back through
+        # its id, and the clicked row is highlighted client-side.
+        **SERVER_SIDE_TABLE,
     )
 
     return dbc.Row(
@@ -494,7 +534,7 @@ def get_tab_3(capital_df, capital_fig):
             dbc.Col(
                 dbc.Row(
                     [
-                        dbc.Col(dcc.Graph(id="capital_fig", figure=capital_fig), width=6),
+                        dbc.Col(dcc.Graph(id="capital_fig", figure=slim_figure(capital_fig)), width=6),
                         dbc.Col(dash_tbl_capital, width=6),
                     ],
                     className=PANEL_CLASS,
@@ -505,29 +545,51 @@ def get_tab_3(capital_df, capital_fig):
     )
 
 
-def get_tab_4(income_vs_expenses, saving_ratio_annual, saving_ratio_monthly):
-    """Returns the layout of the 'Saving Rate' tab"""
+def get_income_vs_expenses_figure(monthly, title):
+    """The income and expenses of each month (a SavingTable slice) as bars, with the savings as a line."""
+    months = [month.strftime("%b") for month in monthly.index]
+    fig = go.Figure(
+        [
+            go.Bar(x=months, y=monthly["Income"], name="Income", marker_color="seagreen"),
+            go.Bar(x=months, y=-monthly["Expenses"], name="Expenses", marker_color="indianred"),
+            go.Scatter(x=months, y=monthly["Savings"], name="Savings", mode="lines+markers"),
+        ]
+    )
+    fig.update_layout(title=title, barmode="group", yaxis_tickprefix="$")
+    return fig
+
+
+def get_rolling_saving_rate_figure(rolling, title):
+    """The saving rate over the trailing months, for each month (SavingTable.rolling)."""
+    fig = go.Figure(go.Scatter(x=rolling.index.to_timestamp(), y=rolling * 100, name="Saving Rate", mode="lines"))
+    fig.update_layout(title=title, yaxis_ticksuffix="%")
+    return fig
+
+
+def get_tab_4(income_vs_expenses, saving_ratio_annual, saving_ratio_monthly, rolling_saving_rate=None):
+    """Returns the layout of the 'Saving Rate' tab, with the rolling saving rate below when there is one"""
+
+    rows = [
+        dbc.Row(
+            [
+                dbc.Col(dcc.Graph(id="saving_ratio_annual_fig", figure=slim_figure(saving_ratio_annual)), width=6),
+                dbc.Col(dcc.Graph(id="saving_ratio_monthly_fig", figure=slim_figure(saving_ratio_monthly)), width=6),
+            ],
+            className=PANEL_CLASS,
+        ),
+        dbc.Row(
+            [
+                dbc.Col(dcc.Graph(id="income_vs_expenses_fig", figure=slim_figure(income_vs_expenses)), width=12),
+            ],
+            className=PANEL_CLASS,
+        ),
+    ]
+    if rolling_saving_rate is not None:
+        rows.append(dbc.Row([dbc.Col(dcc.Graph(id="rolling_saving_rate_fig", figure=slim_figure(rolling_saving_rate)), width=12)], className=PANEL_CLASS))
 
     return dbc.Row(
         [
             section_separator(),
-            dbc.Col(
-                children=[
-                    dbc.Row(
-                        [
-                            dbc.Col(dcc.Graph(id="saving_ratio_annual_fig", figure=saving_ratio_annual), width=6),
-                            dbc.Col(dcc.Graph(id="saving_ratio_monthly_fig", figure=saving_ratio_monthly), width=6),
-                        ],
-                        className=PANEL_CLASS,
-                    ),
-                    dbc.Row(
-                        [
-                            dbc.Col(dcc.Graph(id="income_vs_expenses_fig", figure=income_vs_expenses), width=12),
-                        ],
-                        className=PANEL_CLASS,
-                    ),
-                ],
-                width=12,
-            ),
+            dbc.Col(children=rows, width=12),
         ]
     )
@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime
+
+import pandas as pd
+
+from src.balance_index import BalanceIndex
+from src.synthetic_data import SyntheticSpec, generate_prices, generate_transactions
+
+
+def brute_force(transactions, prices, date):
+    """The balances by AccountType on `date`, merging the full history as get_price_comparison_on_dates does."""
+    held = transactions[transactions.Date <= date].groupby(["AccountType", "AssetMapped"]).Amount.sum().reset_index()
+    closes = prices[prices.Date <= date].sort_values("Date").groupby("AssetMapped").Close.last()
+    return (held.Amount * held.AssetMapped.map(closes).fillna(0.0)).groupby(held.AccountType).sum()
+
+
+class TestBalanceIndex(unittest.TestCase):
+    def setUp(self):
+        self.transactions = pd.DataFrame(
+            {
+                "Date": pd.to_datetime(["2024-01-02", "2024-01-05", "2024-01-05", "2024-02-01", "2024-01-03"]),
+                "Account": ["Current", "Brokerage", "Brokerage", "Current", "Savings"],
+                "AccountType": ["Current", "Investment", "Investment", "Current", "Current"],
+                "AssetMapped": ["USD", "USD", "VWRL", "USD", "USD"],
+                "Amount": [100.0, -50.0, 2.0, -30.0, 10.0],
+            }
+        )
+        self.prices = pd.DataFrame(
+            {
+                "AssetMapped": ["VWRL", "VWRL"],
+                "Date": pd.to_datetime(["2024-01-04", "2024-01-10"]),
+                "Close": [25.0, 30.0],
+                "Currency": ["USD", "USD"],
+            }
+        )
+        self.index = BalanceIndex.from_frames(self.transactions, self.prices, "USD")
+
+    def test_values_carry_forward_between_transactions_and_closes(self):
+        before = self.index.price_comparison(datetime(2024, 1, 1), datetime(2024, 1, 5)).set_index("AccountType")
+        after = self.index.price_comparison(datetime(2024, 1, 12), datetime(2024, 3, 1)).set_index("AccountType")
+        self.assertEqual(before.loc["Current"].tolist() + after.loc["Current"].tolist(), [0.0, 110.0, 110.0, 80.0])
+        self.assertEqual(before.loc["Investment"].tolist() + after.loc["Investment"].tolist(), [0.0, 0.0, 10.0, 10.0])  # -50 cash + 2 x the last close
+
+    def test_price_comparison_has_the_frame_of_the_transformation_manager(self):
+        df = self.index.price_comparison(datetime(2023, 12, 31), datetime(2024, 12, 31))
+        self.assertEqual(list(df.columns), ["AccountType", "Dec-23", "Dec-24"])
+        self.assertEqual(df.set_index("AccountType")["Dec-24"].to_dict(), {"Current": 80.0, "Investment": 10.0})
+
+    def test_matches_a_full_merge_on_synthetic_data(self):
+        spec = SyntheticSpec(years=(2022, 2023, 2024))
+        transactions, prices = generate_transactions(spec), generate_prices(spec)
+        index = BalanceIndex.from_frames(transactions, prices, "USD")
+        for date in (datetime(2022, 6, 30), datetime(2023, 12, 31), datetime(2024, 12, 31)):
+            expected = brute_force(transactions, prices, date)
+            actual = index.price_comparison(date, date).set_index("AccountType").iloc[:, 0]
+            pd.testing.assert_series_equal(actual.reindex(expected.index), expected, check_names=False, rtol=1e-9)
+
+    def test_frames_it_cannot_value_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, "EUR"):
+            BalanceIndex.from_frames(self.transactions, self.prices.assign(Currency="EUR"), "USD")
+        with self.assertRaisesRegex(ValueError, "no close"):
+            BalanceIndex.from_frames(self.transactions.assign(AssetMapped="GBP"), self.prices, "USD")
+        with self.assertRaisesRegex(ValueError, "missing columns"):
+            BalanceIndex.from_frames(self.transactions.drop(columns="AccountType"), self.prices, "USD")
+
+
+if __name__ == "__main__":
+    unittest.main()
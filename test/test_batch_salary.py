@@ -0,0 +1,68 @@
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+import pandas as pd
+
+from src.batch_salary import SALARY_TOTALS, BatchSalary, salary_differences
+
+SALARY_CONFIG = {
+    "ACME": {"base_salary": None, "payrolls": ["ACME PAYROLL", "ACME BONUS"]},
+    "INITECH": {"base_salary": None, "payrolls": ["INITECH PAYROLL"]},
+}
+
+
+class TestBatchSalary(unittest.TestCase):
+    def setUp(self):
+        self.flows = pd.DataFrame(
+            {
+                "Date": pd.to_datetime(["2023-11-25", "2024-01-02", "2024-01-25", "2024-03-15", "2024-12-24", "2025-01-03", "2024-02-01"]),
+                "MemoMapped": ["ACME PAYROLL", "ACME PAYROLL", "ACME PAYROLL", "ACME BONUS", "INITECH PAYROLL", "INITECH PAYROLL", "GROCERY"],
+                "Value": [100.0, 100.0, 110.0, 500.0, 200.0, 200.0, -50.0],
+            }
+        )
+        self.batch = BatchSalary.from_flows(self.flows, SALARY_CONFIG, carry_over_days=15)
+
+    def test_pay_received_early_january_counts_for_the_previous_year(self):
+        salary = self.batch.year(2024)
+        self.assertEqual(salary.total_received_salaries, {"ACME": 710.0, "INITECH": 200.0})
+        self.assertEqual(salary.total_received_salary_from_previous_year, 100.0)
+        self.assertEqual(salary.actual_salaries, {"ACME": 610.0, "INITECH": 200.0})
+        self.assertEqual(salary.outstanding_salaries, {"ACME": 0.0, "INITECH": 200.0})
+        self.assertEqual(salary.actual_salary, salary.total_received_salary - salary.total_received_salary_from_previous_year)
+        self.assertEqual(salary.anchor_date, datetime(2023, 1, 1))
+        self.assertEqual(salary.monthly_salaries["ACME"].loc[3], 500.0)
+
+        self.assertEqual(self.batch.year(2023).outstanding_salary, 100.0)
+        self.assertEqual(self.batch.year(2020).total_received_salary, 0.0)
+
+    def test_excluded_payrolls_are_not_salary(self):
+        batch = BatchSalary.from_flows(self.flows, SALARY_CONFIG, exclude=["ACME BONUS"], carry_over_days=15)
+        self.assertEqual(batch.year(2024).actual_salaries["ACME"], 110.0)
+        self.assertNotIn("ACME BONUS", batch.payrolls)
+
+    def test_totals_sum_the_employers(self):
+        salary = self.batch.year(2024)
+        for name in SALARY_TOTALS:
+            plural = name.replace("_salary", "_salaries", 1)
+            self.assertEqual(getattr(salary, name), sum(getattr(salary, plural).values()))
+
+    def test_carry_over_days_are_read_off_the_salaries(self):
+        salaries = {2024: SimpleNamespace(total_received_salary_from_previous_year=100.0), 2025: SimpleNamespace(total_received_salary_from_previous_year=200.0)}
+        self.assertEqual(BatchSalary.carry_over_days_of(self.flows, salaries, SALARY_CONFIG), 3)
+        with self.assertRaises(ValueError):
+            BatchSalary.carry_over_days_of(self.flows, {2024: SimpleNamespace(total_received_salary_from_previous_year=50.0)}, SALARY_CONFIG)
+
+    def test_differences_cover_every_attribute(self):
+        actual = self.batch.year(2024)
+        expected = SimpleNamespace(**{name: value for name, value in vars(actual).items()})
+        self.assertEqual(salary_differences(expected, actual), [])
+
+        expected.monthly_salaries = {**actual.monthly_salaries, "ACME": actual.monthly_salaries["ACME"].shift(-1, fill_value=0.0)}
+        expected.payrolls = ["ACME PAYROLL"]
+        expected.base_salary = 1000.0
+        self.assertEqual(salary_differences(expected, actual), ["base_salary", "monthly_salaries", "payrolls"])
+
+
+if __name__ == "__main__":
+    unittest.main()
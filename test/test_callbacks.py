@@ -1,8 +1,27 @@
 import unittest
 from datetime import datetime
 
-from callbacks import get_flow_range, get_value_dates, previous_month, reconcile_category, resolve_row_index
+import tempfile
+from types import SimpleNamespace
+
+import diskcache
+import plotly.graph_objects as go
+from dash import Dash, DiskcacheManager
+
+from callbacks import (
+    capital_figure_patch,
+    get_flow_range,
+    get_value_dates,
+    previous_month,
+    reconcile_category,
+    register_callbacks,
+    resolve_row_index,
+    should_render,
+    warm_year,
+)
 from src import defaults
+from src.manager_loader import LoadedManagers, ManagerLoader
+from src.year_context import YearContext, YearContextStore
 
 
 class TestCallbacks(unittest.TestCase):
@@ -51,8 +70,115 @@ class TestResolveRowIndex(unittest.TestCase):
     def test_falls_back_when_view_row_is_out_of_range(self):
         self.assertEqual(resolve_row_index(5, [3, 1, 2, 0]), 5)
 
+    def test_row_id_wins_on_a_server_side_paged_table(self):
+        """The browser only holds the page shown, so view positions and their indices are page-relative."""
+        self.assertEqual(resolve_row_index(1, [0, 1, 2], row_id=41), 41)
+        self.assertEqual(resolve_row_index(1, None, row_id=0), 0)
+
 
 class TestDefaults(unittest.TestCase):
     def test_year_dropdown_always_offers_the_current_year(self):
         """DEFAULT_YEAR is datetime.today().year, and the year dropdown is clearable=False."""
         self.assertIn(datetime.today().year, defaults.YEARS)
+
+
+class TestShouldRender(unittest.TestCase):
+    """Only the open tab is computed, and only when its content is out of date."""
+
+    def test_hidden_tab_is_not_computed(self):
+        self.assertFalse(should_render("tab3", "tab1", [2024], None))
+
+    def test_open_tab_is_computed_on_first_opening(self):
+        self.assertTrue(should_render("tab3", "tab3", [2024], None))
+
+    def test_returning_to_an_up_to_date_tab_keeps_its_content(self):
+        self.assertFalse(should_render("tab2", "tab2", [2024, "SubType: Grocery"], [2024, "SubType: Grocery"]))
+
+    def test_open_tab_is_recomputed_when_its_inputs_changed(self):
+        self.assertTrue(should_render("tab2", "tab2", [2025, "SubType: Grocery"], [2024, "SubType: Grocery"]))
+
+
+class TestCapitalFigurePatch(unittest.TestCase):
+    """A row click sends the new traces and title only, not the template-laden layout."""
+
+    def test_patch_replaces_only_the_traces_and_the_title(self):
+        figure = go.Figure(go.Scatter(x=[1, 2], y=[3, 4], name="VWRL"), layout={"title": "VWRL"})
+
+        operations = capital_figure_patch(figure).to_plotly_json()["operations"]
+
+        self.assertEqual([operation["location"] for operation in operations], [["data"], ["layout", "title"]])
+        self.assertEqual(operations[0]["params"]["value"][0]["name"], "VWRL")
+        self.assertNotIn("template", str(operations))
+
+
+class TestBackgroundCallbacks(unittest.TestCase):
+    """Dash keys a background job by the source of its function and its arguments."""
+
+    def test_tabs_with_the_same_inputs_get_distinct_job_keys(self):
+        manager = DiskcacheManager(diskcache.Cache(tempfile.mkdtemp()))
+        app = Dash(__name__, background_callback_manager=manager)
+        register_callbacks(app, ManagerLoader(lambda: None), background=True)
+
+        keys = set()
+        for callback in app.callback_map.values():
+            if callback.get("long"):
+                # the same year, tab and (empty) stores for every job, as when a tab is first opened
+                args = [[2024, "tab3", None, None], callback["state"][-1]["id"]]
+                keys.add(manager.build_cache_key(callback["callback"].__wrapped__, args, []))
+        self.assertEqual(len(keys), 4)
+
+    def test_the_year_context_is_built_before_the_job(self):
+        """The server builds the context, which the job forked from it and every other callback read."""
+        figure_manager = RecordingManager()
+        year_contexts = YearContextStore(
+            lambda year: YearContext(year, get_flow_range(year), get_value_dates(year), None, None, 0.0, None, 0.0, SimpleNamespace())
+        )
+        loaded = LoadedManagers(None, None, RecordingManager(), figure_manager, year_contexts)
+        callbacks = register_callbacks(Dash(__name__), ManagerLoader(lambda: loaded), background=False)
+
+        self.assertIsNone(callbacks["update_tab_1"](2023, "tab1", None, prepare_only=True))
+        self.assertEqual(year_contexts.years(), [2023])
+        self.assertEqual(figure_manager.calls, [])  # the figures are left to the job
+
+
+class RecordingManager:
+    """Records the name of every method called on it, and returns `results[name]` (or None)."""
+
+    def __init__(self, **results):
+        self.calls = []
+        self._results = results
+
+    def __getattr__(self, name):
+        def method(*args, **kwargs):
+            self.calls.append(name)
+            return self._results.get(name)
+
+        return method
+
+
+class TestWarmYear(unittest.TestCase):
+    def test_every_tab_call_is_made(self):
+        figure_manager = RecordingManager(get_saving_ratio=0.5)
+        transformation_manager = RecordingManager(get_all_categories=[defaults.DEFAULT_CATEGORY])
+        year_contexts = YearContextStore(
+            lambda year: YearContext(year, get_flow_range(year), get_value_dates(year), None, None, 0.0, None, 0.0, SimpleNamespace())
+        )
+        loaded = LoadedManagers(None, None, transformation_manager, figure_manager, year_contexts)
+
+        warm_year(loaded, 2023)
+
+        self.assertEqual(transformation_manager.calls, ["get_all_categories", "get_price_comparison_on_dates"])
+        self.assertEqual(
+            set(figure_manager.calls),
+            {
+                "get_figure_timeseries",
+                "get_figure_waterfall",
+                "get_figure_sunburst",
+                "get_category_breakdown",
+                "get_figure_bar",
+                "get_capital_gain_brkdn",
+                "get_saving_ratio",
+                "get_saving_rate_gauge",
+                "get_income_vs_expenses",
+            },
+        )
@@ -0,0 +1,39 @@
+import unittest
+
+import pandas as pd
+
+from src.category_table import CategoryTable
+from src.flow_cube import FlowCube
+
+
+class TestCategoryTable(unittest.TestCase):
+    def setUp(self):
+        flows = pd.DataFrame(
+            {
+                "Date": pd.to_datetime(["2023-06-01", "2024-01-05", "2024-02-05", "2024-03-01", "2024-03-02"]),
+                "FullMasterType": ["Essentials", "Essentials", "Essentials", "Essentials", "Discretionary"],
+                "FullType": ["Food", "Food", "Food", "Housing", "Travel"],
+                "FullSubType": ["Grocery", "Grocery", "Restaurant", "Rent", None],
+                "MemoMapped": ["Shop", "Shop", "Bistro", "Landlord", "Airline"],
+                "Value": [-5000.0, -600.0, -500.0, -2000.0, -300.0],
+            }
+        )
+        self.table = CategoryTable.from_cube(FlowCube.from_flows(flows), levels=["MasterType", "Type", "SubType"])
+
+    def test_categories_of_a_year_at_any_threshold(self):
+        self.assertEqual(self.table.categories(2024, 1000), ["MasterType: Essentials", "Type: Food", "Type: Housing", "SubType: Rent"])
+        self.assertEqual(
+            self.table.categories(2024, 300),
+            ["MasterType: Discretionary", "MasterType: Essentials", "Type: Food", "Type: Housing", "Type: Travel", "SubType: Grocery", "SubType: Rent", "SubType: Restaurant"],
+        )
+        self.assertEqual(self.table.categories(2023, 1000), ["MasterType: Essentials", "Type: Food", "SubType: Grocery"])
+        self.assertEqual(self.table.categories(2020, 0), [])
+
+    def test_levels_missing_from_the_cube_are_rejected(self):
+        cube = FlowCube.from_flows(pd.DataFrame({"Date": pd.to_datetime(["2024-01-01"]), "FullType": ["Food"], "Value": [-1.0]}))
+        with self.assertRaisesRegex(ValueError, "FullSubType"):
+            CategoryTable.from_cube(cube, levels=["Type", "SubType"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from src import columnar
+from src.columnar import convert_manager, find_input, load_manager
+
+
+class FakeMarketManager:
+    """Sets a main frame, a secondary frame and plain values (one changed in place), like MarketManager does."""
+
+    def __init__(self, ref_currency):
+        self.ref_currency = ref_currency
+        self.prices = None
+        self.options = {"loaded": False}
+
+    def load_pregenerated_data(self, path):
+        self.prices = pd.read_csv(path)
+        self.asset_map = pd.DataFrame({"AssetMapped": ["VUKE"], "Currency": ["GBP"]})
+        self.loaded_from = path
+        self.options["loaded"] = True  # changed in place
+
+
+@unittest.skipIf(columnar.pa is None, "pyarrow is not installed")
+class TestColumnar(unittest.TestCase):
+    def test_converted_state_loads_back_onto_a_fresh_manager(self):
+        with tempfile.TemporaryDirectory() as data_path:
+            csv_path = os.path.join(data_path, "data_market.csv")
+            pd.DataFrame({"AssetMapped": ["VUKE", "VUKE"], "Currency": ["GBP", "GBP"], "Close": [1.5, 1.6]}).to_csv(csv_path, index=False)
+            converted, *extra_paths = convert_manager(FakeMarketManager("USD"), csv_path)
+            self.assertEqual(extra_paths, [os.path.join(data_path, "data_market.asset_map.parquet")])
+            self.assertTrue(all(os.path.exists(path) for path in (converted, *extra_paths)))
+
+            self.assertEqual(find_input(data_path, "data_market"), converted)
+            manager = FakeMarketManager("USD")
+            load_manager(manager, converted)
+
+            self.assertEqual(list(manager.prices.Close), [1.5, 1.6])
+            self.assertEqual(manager.prices.AssetMapped.dtype, object)  # as a CSV load gives it
+            self.assertEqual(list(manager.asset_map.AssetMapped), ["VUKE"])
+            self.assertEqual(manager.loaded_from, csv_path)
+            self.assertEqual(manager.options, {"loaded": True})
+            self.assertEqual(manager.ref_currency, "USD")
+
+            with mock.patch.object(columnar, "COLUMNAR_CATEGORICALS", True):
+                load_manager(manager, converted)
+            self.assertIsInstance(manager.prices.AssetMapped.dtype, pd.CategoricalDtype)
+
+    def test_a_columnar_file_older_than_its_csv_is_ignored(self):
+        with tempfile.TemporaryDirectory() as data_path:
+            csv_path = os.path.join(data_path, "data_manager.csv")
+            parquet_path = os.path.join(data_path, "data_manager.parquet")
+            for path in (parquet_path, csv_path):
+                open(path, "w", encoding="utf-8").close()
+            os.utime(parquet_path, (0, 0))
+
+            self.assertEqual(find_input(data_path, "data_manager"), csv_path)
+
+    def test_falls_back_to_the_csv_path(self):
+        with tempfile.TemporaryDirectory() as data_path:
+            self.assertEqual(find_input(data_path, "data_manager"), os.path.join(data_path, "data_manager.csv"))
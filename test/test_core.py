@@ -34,6 +34,65 @@ class TestCore(unittest.TestCase):
         assert total_value_end_1 != total_value_end_2, "total_value_end should be different in 2024 and 2025."
         assert total_value_end_1 == total_value_start_2, "total_value_start_2 and total_value_end_1 should be the same."
 
+    def test_flow_cube_matches_the_flows_of_each_year(self):
+        """The year contexts slice the cube instead of calling get_flow_values per year: same totals."""
+        _, _, transformation_manager, _ = app_initialisation.initialize_managers("USD")
+        flow_cube = callbacks.build_flow_cube(transformation_manager)
+
+        for selected_year in (2023, 2024):
+            flow_range = callbacks.get_flow_range(selected_year)
+            df_flow = transformation_manager.get_flow_values(flow_range[0], flow_range[1], None, how=callbacks.HOW, include_iat=False)
+            assert abs(flow_cube.year(selected_year).Value.sum() - df_flow.Value.sum()) < 1e-6, f"cube total differs in {selected_year}."
+
+    def test_balance_index_matches_the_price_comparison(self):
+        """Tab 1 reads the balances from the index instead of get_price_comparison_on_dates: same values."""
+        data_manager, market_manager, transformation_manager, _ = app_initialisation.initialize_managers("USD")
+        balance_index = callbacks.build_balance_index(transformation_manager, data_manager, market_manager, "USD")
+        assert balance_index is not None, "the balance index should agree with the transformation manager."
+
+        for selected_year in (2023, 2024):
+            value_dates = callbacks.get_value_dates(selected_year)
+            expected = transformation_manager.get_price_comparison_on_dates(value_dates[0], value_dates[1], True).set_index("AccountType")
+            actual = balance_index.price_comparison(value_dates[0], value_dates[1]).set_index("AccountType")
+            assert (expected.sub(actual, fill_value=0.0).abs() < 0.01).all().all(), f"balances differ in {selected_year}."
+
+    def test_category_table_matches_get_all_categories(self):
+        """The dropdown options are read from the category table instead of get_all_categories: same categories."""
+        _, _, transformation_manager, _ = app_initialisation.initialize_managers("USD")
+        category_table = callbacks.build_category_table(transformation_manager, callbacks.build_flow_cube(transformation_manager))
+        assert category_table is not None, "the category table should agree with get_all_categories."
+
+        for selected_year in (2023, 2024):
+            for threshold in (500, 1000, 5000):
+                expected = set(transformation_manager.get_all_categories(callbacks.get_flow_range(selected_year), threshold))
+                assert set(category_table.categories(selected_year, threshold)) == expected, f"categories differ in {selected_year} at {threshold}."
+
+    def test_breakdown_cube_matches_get_category_breakdown(self):
+        """The 'Spending Detail' table is sliced out of the cube instead of get_category_breakdown: same rows."""
+        _, _, transformation_manager, figure_manager = app_initialisation.initialize_managers("USD")
+        breakdown_cube = callbacks.build_breakdown_cube(figure_manager, callbacks.build_flow_cube(transformation_manager))
+        assert breakdown_cube is not None, "the cube's breakdowns should agree with get_category_breakdown."
+
+        for selected_year in (2023, 2024):
+            flow_range = callbacks.get_flow_range(selected_year)
+            for category in transformation_manager.get_all_categories(flow_range, 1000):
+                category_dict, _ = callbacks.get_category_filter(category)
+                expected = figure_manager.get_category_breakdown(category_dict, callbacks.CATEGORY_LABEL, callbacks.CATEGORY_TOP, flow_range, None, how=callbacks.HOW)
+                actual = breakdown_cube.breakdown(selected_year, category_dict, callbacks.CATEGORY_LABEL, callbacks.CATEGORY_TOP)
+                assert expected.iloc[:, 0].astype(str).tolist() == actual.iloc[:, 0].astype(str).tolist(), f"merchants of {category} differ in {selected_year}."
+                assert (abs(expected.iloc[:, 1].to_numpy(dtype=float) - actual.iloc[:, 1].to_numpy(dtype=float)) < 0.01).all(), f"values of {category} differ in {selected_year}."
+
+    def test_saving_table_matches_get_saving_ratio(self):
+        """Tab 4 reads its saving ratios from the saving table instead of get_saving_ratio: same ratios."""
+        _, _, transformation_manager, figure_manager = app_initialisation.initialize_managers("USD")
+        saving_table = callbacks.build_saving_table(figure_manager, callbacks.build_flow_cube(transformation_manager))
+        assert saving_table is not None, "the saving table should agree with get_saving_ratio."
+
+        for selected_year in (2023, 2024):
+            assert abs(saving_table.ratio(selected_year) - figure_manager.get_saving_ratio(selected_year)) < 1e-4, f"ratio differs in {selected_year}."
+            for month in (1, 7, 12):
+                assert abs(saving_table.ratio(selected_year, month) - figure_manager.get_saving_ratio(selected_year, month)) < 1e-4, f"ratio differs in {selected_year}-{month}."
+
     def _get_total_values(self, selected_year, transformation_manager):
         start_date = datetime(selected_year - 1, 12, 31)
         end_date = datetime(selected_year, 12, 31)
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+import pandas as pd
+
+from src.data_reload import ReloadLeader, ReloadWatcher, carry_over, first_changed_year, key_years, year_hashes
+from src.manager_loader import LoadedManagers
+from src.result_cache import TRANSFORMATION_MANAGER_METHODS, ResultCache, install_result_cache
+from src.year_context import YearContextStore
+
+
+def transactions(*rows):
+    return pd.DataFrame(rows, columns=["Date", "Account", "Value"])
+
+
+def loaded_from(df):
+    """LoadedManagers over `df`, with a result cache and a year context store like load_managers builds."""
+    transformation_manager = SimpleNamespace(get_flow_values=lambda start, end: df)
+    install_result_cache(transformation_manager, TRANSFORMATION_MANAGER_METHODS, ResultCache())
+    return LoadedManagers(
+        data_manager=SimpleNamespace(transactions=df),
+        market_manager=SimpleNamespace(prices=pd.DataFrame({"Date": ["2023-01-02"], "Close": [1.0]})),
+        transformation_manager=transformation_manager,
+        figure_manager=None,
+        year_contexts=YearContextStore(lambda year: f"context {year} of {len(df)} rows"),
+    )
+
+
+class TestYearHashes(unittest.TestCase):
+    def test_only_the_years_with_different_rows_change(self):
+        old = transactions(("2023-03-01", "A", 1.0), ("2024-03-01", "A", 2.0))
+        new = transactions(("2024-03-01", "A", 2.0), ("2023-03-01", "A", 1.0), ("2024-04-01", "B", 3.0))  # reordered, one row added
+
+        self.assertEqual(year_hashes(old)[2023], year_hashes(new)[2023])
+        self.assertNotEqual(year_hashes(old)[2024], year_hashes(new)[2024])
+        self.assertEqual(first_changed_year({"data_manager": year_hashes(old)}, {"data_manager": year_hashes(new)}), 2024)
+        self.assertIsNone(first_changed_year({"data_manager": year_hashes(old)}, {"data_manager": year_hashes(old)}))
+
+    def test_frames_without_dates_count_as_entirely_changed(self):
+        self.assertIsNone(year_hashes(pd.DataFrame({"Value": [1.0]})))
+        self.assertEqual(first_changed_year({"data_manager": None}, {"data_manager": None}), 0)
+
+    def test_key_years_are_read_from_the_normalised_dates(self):
+        key = ("get_flow_values", (("start", "2023-01-01T00:00:00"), ("end", "2024-12-31T00:00:00"), ("how", "both")))
+        self.assertEqual(key_years(key), {2023, 2024})
+
+
+class TestCarryOver(unittest.TestCase):
+    def test_only_the_years_before_the_first_changed_one_are_kept(self):
+        rows = [("2022-03-01", "A", 1.0), ("2023-03-01", "A", 1.0), ("2024-03-01", "A", 2.0)]
+        old = loaded_from(transactions(*rows))
+        for year in (2022, 2023, 2024):
+            old.year_contexts.get(year)
+            old.transformation_manager.get_flow_values(pd.Timestamp(year, 1, 1), pd.Timestamp(year, 12, 31))
+        new = loaded_from(transactions(*rows, ("2024-01-05", "A", 5.0)))
+
+        # 2023's context is rebuilt too: its outstanding salary is paid in January 2024
+        self.assertEqual(carry_over(old, new), [2022])
+        self.assertEqual(new.year_contexts.get(2022), "context 2022 of 3 rows")  # kept from the old load
+        self.assertEqual(new.year_contexts.get(2023), "context 2023 of 4 rows")  # rebuilt on the new data
+        # the flows of 2022 and 2023 only depend on their own and earlier years
+        self.assertEqual(new.transformation_manager.get_flow_values.cache.stats()["entries"], 2)
+
+
+class TestReloadWatcher(unittest.TestCase):
+    def test_a_replaced_input_triggers_one_reload(self):
+        with tempfile.TemporaryDirectory() as data_path:
+            path = os.path.join(data_path, "data_manager.csv")
+            with open(path, "w", encoding="utf-8") as csv:
+                csv.write("Date,Value\n")
+            reloads = []
+            watcher = ReloadWatcher(lambda: [path], lambda: reloads.append(1), interval=0.01)
+
+            time.sleep(0.02)
+            watcher.check()
+            self.assertEqual(reloads, [])
+
+            with open(path, "a", encoding="utf-8") as csv:
+                csv.write("2024-01-01,1.0\n")
+            time.sleep(0.02)
+            watcher.check()
+            watcher.check()  # not due yet
+            self.assertEqual(reloads, [1])
+
+
+class TestReloadLeader(unittest.TestCase):
+    def test_one_process_at_a_time_watches(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "reload.lock")
+            leader, follower = ReloadLeader(path), ReloadLeader(path)
+            self.assertTrue(leader.held())
+            self.assertFalse(follower.held())
+
+            reloads = []
+            watcher = ReloadWatcher(lambda: [path], lambda: reloads.append(1), interval=0.01, leader=follower)
+            with open(path, "a", encoding="utf-8") as lock:
+                lock.write("changed")
+            time.sleep(0.02)
+            watcher.check()
+            self.assertEqual(reloads, [])  # not the leader: not even a stat
+
+            leader._file.close()  # the leader exits
+            time.sleep(0.02)
+            watcher.check()
+            self.assertTrue(follower.held())
+            self.assertEqual(reloads, [1])
+
+
+if __name__ == "__main__":
+    unittest.main()
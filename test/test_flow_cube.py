@@ -0,0 +1,51 @@
+import unittest
+
+import pandas as pd
+
+from src.flow_cube import FlowCube
+
+
+class TestFlowCube(unittest.TestCase):
+    def setUp(self):
+        self.flows = pd.DataFrame(
+            {
+                "Date": pd.to_datetime(["2023-12-31", "2024-01-05", "2024-01-20", "2024-03-01", "2024-03-02"]),
+                "FullType": ["Food", "Food", "Salary", "Food", "Travel"],
+                "FullSubType": ["Grocery", "Grocery", "Salary", "Restaurant", None],
+                "MemoMapped": ["Shop", "Shop", "Employer", "Bistro", "Airline"],
+                "Account": ["Current", "Current", "Current", "Card", "Card"],
+                "Value": [-10.0, -20.0, 1000.0, -30.0, -200.0],
+            }
+        )
+        self.cube = FlowCube.from_flows(self.flows)
+
+    def test_years_are_sliced_with_their_totals_intact(self):
+        self.assertEqual(self.cube.years(), [2023, 2024])
+        rows = self.cube.year(2024)
+        self.assertEqual(rows.Value.sum(), self.flows[self.flows.Date.dt.year == 2024].Value.sum())
+        self.assertEqual(rows[rows.FullType != "Salary"].Value.sum(), -250.0)  # the flow without a sub-type included
+        self.assertEqual(list(self.cube.year(2024).columns), ["Month", "FullType", "FullSubType", "MemoMapped", "Account", "Value"])
+
+    def test_monthly_series(self):
+        monthly = self.cube.monthly(2024, ["Salary"])
+        self.assertEqual(len(monthly), 12)
+        self.assertEqual((monthly.loc[1, "Income"], monthly.loc[1, "Expenses"], monthly.loc[3, "Expenses"], monthly.loc[2, "Expenses"]), (1000.0, -20.0, -230.0, 0.0))
+
+    def test_totals_of_every_year(self):
+        totals = self.cube.totals("FullType").set_index(["Year", "FullType"])["Value"]
+        self.assertEqual(totals.to_dict(), {(2023, "Food"): -10.0, (2024, "Food"): -50.0, (2024, "Salary"): 1000.0, (2024, "Travel"): -200.0})
+
+    def test_breakdown_of_a_category(self):
+        breakdown = self.cube.breakdown(2024, {"FullType": "Food"}, "MemoMapped", 10)
+        self.assertEqual(list(breakdown.columns), ["MemoMapped", "Value"])
+        self.assertEqual(breakdown.values.tolist(), [["Bistro", -30.0], ["Shop", -20.0]])
+        self.assertEqual(self.cube.breakdown(2024, {}, "MemoMapped", 2).MemoMapped.tolist(), ["Employer", "Airline"])
+        self.assertTrue(self.cube.breakdown(2020, {"FullType": "Food"}, "MemoMapped", 10).empty)
+
+    def test_a_year_without_flows_is_empty(self):
+        self.assertTrue(self.cube.year(2020).empty)
+        self.assertEqual(self.cube.monthly(2020, ["Salary"]).to_numpy().sum(), 0.0)
+
+    def test_flows_without_dates_are_rejected(self):
+        with self.assertRaises(ValueError):
+            FlowCube.from_flows(self.flows.drop(columns="Date"))
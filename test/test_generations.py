@@ -0,0 +1,42 @@
+import unittest
+
+from src.generations import GenerationTracker, Superseded
+
+
+class TestGenerationTracker(unittest.TestCase):
+    """Scrolling through the years must not leave every intermediate year computing to the end."""
+
+    def test_a_year_change_supersedes_the_calls_for_the_previous_year(self):
+        tracker = GenerationTracker()
+        stale = tracker.begin("session", 2023)
+        same_year = tracker.begin("session", 2023)
+        same_year.check()  # the other tab callbacks of the same year change do not interfere
+
+        current = tracker.begin("session", 2024)
+
+        with self.assertRaises(Superseded):
+            stale.check()
+        with self.assertRaises(Superseded):
+            same_year.check()
+        current.check()
+
+    def test_sessions_are_independent(self):
+        tracker = GenerationTracker()
+        mine = tracker.begin("mine", 2023)
+        tracker.begin("theirs", 2024)
+
+        mine.check()
+
+    def test_calls_without_a_session_are_never_superseded(self):
+        tracker = GenerationTracker()
+        call = tracker.begin(None, 2023)
+        tracker.begin(None, 2024)
+
+        call.check()
+
+    def test_forgotten_sessions_count_as_current(self):
+        tracker = GenerationTracker(max_sessions=1)
+        call = tracker.begin("first", 2023)
+        tracker.begin("second", 2024)  # evicts "first"
+
+        call.check()
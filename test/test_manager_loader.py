@@ -0,0 +1,81 @@
+import threading
+import unittest
+
+from src.manager_loader import ManagerLoader
+
+
+class TestManagerLoader(unittest.TestCase):
+    """The server listens while the managers load; callbacks must wait for them, not see None."""
+
+    def test_readers_wait_for_the_background_load(self):
+        release = threading.Event()
+
+        def load():
+            release.wait()
+            return "managers"
+
+        loader = ManagerLoader(load).start()
+        self.assertFalse(loader.ready())
+        with self.assertRaises(TimeoutError):
+            loader.get(timeout=0.01)
+
+        release.set()
+        self.assertEqual(loader.get(timeout=1), "managers")
+        self.assertTrue(loader.ready())
+
+    def test_load_failure_reaches_every_reader(self):
+        def load():
+            raise OSError("no config found")
+
+        loader = ManagerLoader(load)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError) as raised:
+                loader.get(timeout=1)
+            self.assertIsInstance(raised.exception.__cause__, OSError)
+
+    def test_on_loaded_runs_once_with_the_managers(self):
+        loaded = []
+        loader = ManagerLoader(lambda: "managers", on_loaded=loaded.append)
+        loader.get(timeout=1)
+        loader.start()
+        loader._thread.join(timeout=1)
+        self.assertEqual(loaded, ["managers"])
+
+    def test_join_waits_for_on_loaded_before_a_fork(self):
+        """get() returns as soon as the managers are set, before on_loaded (which starts the warm-up) has run."""
+        release = threading.Event()
+        loader = ManagerLoader(lambda: "managers", on_loaded=lambda _: release.wait())
+        loader.get(timeout=1)
+        self.assertTrue(loader._thread.is_alive())
+
+        release.set()
+        loader.join(timeout=1)
+        self.assertFalse(loader._thread.is_alive())
+
+    def test_reload_swaps_the_managers_once_ready(self):
+        loads = iter(["first", "second"])
+        release = threading.Event()
+
+        def load():
+            managers = next(loads)
+            if managers == "second":
+                release.wait()
+            return managers
+
+        kept = []
+        loader = ManagerLoader(load)
+        self.assertEqual(loader.get(timeout=1), "first")
+
+        self.assertTrue(loader.reload(lambda current, fresh: kept.append((current, fresh)) or [2023]))
+        self.assertFalse(loader.reload())  # already reloading
+        self.assertEqual(loader.get(timeout=1), "first")  # readers are served meanwhile
+
+        release.set()
+        for _ in range(100):
+            if not loader.reload_status()["reloading"]:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(loader.get(timeout=1), "second")
+        self.assertEqual(kept, [("first", "second")])
+        self.assertEqual(loader.version, 1)
+        self.assertEqual(loader.reload_status()["last_reload"]["years_kept"], [2023])
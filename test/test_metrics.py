@@ -0,0 +1,89 @@
+import unittest
+
+import flask
+from dash import exceptions
+
+from src.generations import GenerationTracker
+from src.metrics import CallbackMetrics, note_cache_lookup
+
+
+class TestCallbackMetrics(unittest.TestCase):
+    def test_calls_layout_time_and_cache_lookups_are_attributed_to_the_callback(self):
+        metrics = CallbackMetrics()
+
+        @metrics.instrument
+        def update_tab_1(year):
+            note_cache_lookup("year_context", hit=False)
+            note_cache_lookup("result", hit=True)
+            with metrics.layout():
+                return year
+
+        self.assertEqual(update_tab_1(2024), 2024)
+        text = metrics.render()
+
+        self.assertIn('webapp_callback_duration_seconds_count{callback="update_tab_1"} 1', text)
+        self.assertIn('webapp_callback_cache_lookups_total{callback="update_tab_1",cache="year_context",result="miss"} 1', text)
+        self.assertIn('webapp_callback_cache_lookups_total{callback="update_tab_1",cache="result",result="hit"} 1', text)
+        self.assertIn('webapp_callback_layout_seconds_total{callback="update_tab_1"}', text)
+
+    def test_prevented_and_failed_calls_are_counted_and_re_raised(self):
+        metrics = CallbackMetrics()
+
+        @metrics.instrument
+        def update_capital(active_cell):
+            if active_cell is None:
+                raise exceptions.PreventUpdate
+            raise ValueError(active_cell)
+
+        with self.assertRaises(exceptions.PreventUpdate):
+            update_capital(None)
+        with self.assertRaises(ValueError):
+            update_capital({"row": 0})
+        text = metrics.render()
+
+        self.assertIn('webapp_callback_prevented_total{callback="update_capital"} 1', text)
+        self.assertIn('webapp_callback_errors_total{callback="update_capital"} 1', text)
+
+    def test_superseded_calls_are_counted_apart_from_prevented_ones(self):
+        metrics = CallbackMetrics()
+        tracker = GenerationTracker()
+
+        @metrics.instrument
+        def update_tab_3(year):
+            generation = tracker.begin("session", year)
+            tracker.begin("session", year + 1)  # the user moved on while this one computed
+            generation.check()
+
+        with self.assertRaises(exceptions.PreventUpdate):
+            update_tab_3(2023)
+        text = metrics.render()
+
+        self.assertIn('webapp_callback_superseded_total{callback="update_tab_3"} 1', text)
+        self.assertIn('webapp_callback_prevented_total{callback="update_tab_3"} 0', text)
+        self.assertIn('webapp_callback_superseded_seconds_total{callback="update_tab_3"}', text)
+
+    def test_lookups_outside_a_callback_are_ignored(self):
+        metrics = CallbackMetrics()
+        note_cache_lookup("result", hit=True)  # e.g. from a warm-up thread
+
+        self.assertNotIn("cache_lookups_total{", metrics.render())
+
+    def test_response_size_is_recorded_by_the_flask_hook(self):
+        metrics = CallbackMetrics()
+        server = flask.Flask(__name__)
+        metrics.install(server)
+
+        @metrics.instrument
+        def update_tab_4():
+            return "x" * 100
+
+        server.add_url_rule("/callback", "callback", lambda: update_tab_4())
+        server.test_client().get("/callback")
+
+        self.assertIn('webapp_callback_response_bytes_total{callback="update_tab_4"} 100', metrics.render())
+
+    def test_gauges_are_rendered_with_their_labels(self):
+        text = CallbackMetrics().render({"webapp_managers_loaded": True, "webapp_cache": {(("tier", "disk"),): 3}})
+
+        self.assertIn("webapp_managers_loaded 1", text)
+        self.assertIn('webapp_cache{tier="disk"} 3', text)
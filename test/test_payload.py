@@ -0,0 +1,52 @@
+import base64
+import unittest
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+from src.payload import TYPED_ARRAY_MIN_LENGTH, round_for_display, slim_figure, table_records
+
+
+class TestTables(unittest.TestCase):
+    def test_numeric_columns_are_rounded_to_display_precision(self):
+        df = pd.DataFrame({"AssetMapped": ["VWRL"], "Capital Gain": [1234.5678], "YoY": [0.123456]})
+
+        rounded = round_for_display(df, 0, {"YoY": 3})
+
+        self.assertEqual(table_records(df, 0, {"YoY": 3}), [{"AssetMapped": "VWRL", "Capital Gain": 1235.0, "YoY": 0.123}])
+        self.assertEqual(df["Capital Gain"].iloc[0], 1234.5678)  # the caller's frame is left alone
+        self.assertEqual(list(rounded.columns), list(df.columns))
+
+
+class TestSlimFigure(unittest.TestCase):
+    def test_template_keeps_only_the_trace_types_used(self):
+        figure = go.Figure(go.Bar(x=["a", "b"], y=[1, 2]))
+
+        template = slim_figure(figure)["layout"]["template"]
+
+        self.assertEqual(set(template["data"]), {"bar"})
+        self.assertEqual(template["layout"], figure.layout.template.layout.to_plotly_json())
+
+    def test_long_numeric_arrays_are_sent_as_typed_arrays(self):
+        length = TYPED_ARRAY_MIN_LENGTH * 4
+        figure = go.Figure(go.Scatter(x=[f"2024-01-{i % 28 + 1:02d}" for i in range(length)], y=list(np.linspace(0, 1, length))))
+
+        slim = slim_figure(figure)
+
+        self.assertEqual(slim["data"][0]["y"]["dtype"], "f8")
+        self.assertIsInstance(slim["data"][0]["x"], list)  # dates stay as they are
+        self.assertEqual(list(np.frombuffer(base64.b64decode(slim["data"][0]["y"]["bdata"]), "<f8")), list(np.linspace(0, 1, length)))
+        self.assertLess(len(to_json_plotly(slim)), len(to_json_plotly(figure)))
+
+    def test_the_original_figure_is_untouched(self):
+        figure = go.Figure(go.Scatter(y=list(range(TYPED_ARRAY_MIN_LENGTH))))
+
+        slim_figure(figure)
+
+        self.assertIn("histogram", figure.layout.template.data.to_plotly_json())
+        self.assertIsInstance(figure.data[0].y, tuple)
+
+    def test_none_passes_through(self):
+        self.assertIsNone(slim_figure(None))
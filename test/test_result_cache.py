@@ -0,0 +1,113 @@
+import os
+import threading
+import unittest
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.result_cache import ResultCache, install_result_cache
+
+
+class FakeTransformationManager:
+    """Counts the calls that actually reach the manager."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_flow_values(self, date_start=None, date_end=None, account=None, how="both", include_iat=False):
+        self.calls += 1
+        return pd.DataFrame({"Value": [1.0, 2.0, 3.0]})
+
+
+class TestResultCache(unittest.TestCase):
+    def test_positional_and_keyword_calls_share_an_entry(self):
+        manager = FakeTransformationManager()
+        cache = install_result_cache(manager, ["get_flow_values"])
+
+        manager.get_flow_values(datetime(2024, 1, 1), datetime(2024, 12, 31), None, how="both")
+        manager.get_flow_values(pd.Timestamp(2024, 1, 1), date_end=datetime(2024, 12, 31))
+
+        self.assertEqual(manager.calls, 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_caller_mutation_does_not_leak_into_the_cache(self):
+        """get_figure_bar negates the Value column of the frame it is handed."""
+        manager = FakeTransformationManager()
+        install_result_cache(manager, ["get_flow_values"])
+
+        df = manager.get_flow_values()
+        df["Value"] = -df["Value"]
+
+        self.assertEqual(manager.get_flow_values().Value.sum(), 6.0)
+
+    def test_hits_are_views_that_cannot_be_written_into(self):
+        """A hit costs no copy of the frame, and an in-place write fails instead of leaking."""
+        manager = FakeTransformationManager()
+        install_result_cache(manager, ["get_flow_values"])
+
+        first, second = manager.get_flow_values(), manager.get_flow_values()
+        self.assertTrue(np.shares_memory(first["Value"].to_numpy(), second["Value"].to_numpy()))
+        with self.assertRaises(ValueError):
+            second.loc[0, "Value"] = 10.0
+        self.assertEqual(manager.get_flow_values().Value.sum(), 6.0)
+
+    def test_sizing_happens_outside_the_lock(self):
+        """Serialising a big figure to size it must not hold up the lookups of other keys."""
+        cache = ResultCache()
+        sizing, release = threading.Event(), threading.Event()
+
+        class Figure:
+            def to_plotly_json(self):
+                return {}
+
+            def to_json(self):
+                sizing.set()
+                release.wait(5)
+                return "{}"
+
+        thread = threading.Thread(target=cache.get_or_compute, args=("figure", Figure))
+        thread.start()
+        self.assertTrue(sizing.wait(5))
+        self.assertEqual(cache.get_or_compute("other", lambda: 1), 1)  # not blocked by the sizing
+        release.set()
+        thread.join(5)
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_evicts_least_recently_used_when_over_budget(self):
+        cache = ResultCache(max_bytes=250)
+        frame = pd.DataFrame({"Value": [0.0] * 10})  # ~200 bytes with its index: room for one only
+        cache.get_or_compute("a", lambda: frame)
+        cache.get_or_compute("b", lambda: frame)
+
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.stats()["bytes"], 250)
+
+    def test_failures_are_not_cached(self):
+        cache = ResultCache()
+        with self.assertRaises(KeyError):
+            cache.get_or_compute("a", lambda: {}["missing"])
+        self.assertEqual(cache.get_or_compute("a", lambda: 1), 1)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "POSIX only")
+    def test_a_forked_child_does_not_wait_on_the_parents_computations(self):
+        """A background callback job forks the server while request threads may be computing."""
+        cache = ResultCache()
+        cache.get_or_compute("done", lambda: 1)
+        started, release = threading.Event(), threading.Event()
+        thread = threading.Thread(target=cache.get_or_compute, args=("pending", lambda: started.set() or release.wait()))
+        thread.start()
+        started.wait(1)
+
+        read, write = os.pipe()
+        pid = os.fork()
+        if pid == 0:  # the child: the thread computing "pending" does not exist here
+            os.write(write, repr((cache.get_or_compute("done", lambda: 0), cache.get_or_compute("pending", lambda: 2))).encode())
+            os._exit(0)
+        os.close(write)
+        release.set()
+        thread.join()
+        os.waitpid(pid, 0)
+
+        self.assertEqual(os.read(read, 100), b"(1, 2)")
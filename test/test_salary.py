@@ -2,6 +2,7 @@ import unittest
 from datetime import datetime
 from bkanalysis.salary import Salary, SalaryLegacy
 import app_initialisation
+import callbacks
 from src import defaults
 
 BASE_SALARY = {**{y: None for y in defaults.YEARS}, **{2024: defaults.BASE_SALARY_1}}
@@ -231,3 +232,16 @@ class TestSalary(unittest.TestCase):
             delta=0.01,
             msg="total_received_salary_from_previous_year should be equal to the expected value.",
         )
+
+    def test_batch_salary_comparison(self):
+        """Compare the salary of the batch to the Salary class, year by year."""
+        _, _, transformation_manager, _ = app_initialisation.initialize_managers("USD")
+        batch_salary = callbacks.build_batch_salary(transformation_manager, BASE_SALARY)
+        assert batch_salary is not None, "the batch salary should agree with the Salary class."
+
+        for selected_year in (2023, 2024):
+            salary = callbacks.build_salary(transformation_manager, BASE_SALARY, selected_year)
+            batch = batch_salary.year(selected_year)
+            self.assert_salary(selected_year, batch)
+            for name in ("actual_salary", "outstanding_salary", "total_received_salary", "total_received_salary_from_previous_year"):
+                self.assertAlmostEqual(getattr(batch, name), getattr(salary, name), delta=0.01, msg=f"{name} of {selected_year} should be equal to the Salary's.")
@@ -0,0 +1,49 @@
+import math
+import unittest
+
+import pandas as pd
+
+import tabs
+from src.flow_cube import FlowCube
+from src.saving_table import SavingTable
+
+
+class TestSavingTable(unittest.TestCase):
+    def setUp(self):
+        dates = pd.date_range("2023-01-15", "2024-12-15", freq="MS") + pd.Timedelta(days=14)
+        flows = pd.DataFrame(
+            {
+                "Date": list(dates) * 2,
+                "FullType": ["Salary"] * len(dates) + ["Food"] * len(dates),
+                "Value": [1000.0] * len(dates) + [-600.0] * (len(dates) - 1) + [-1200.0],
+            }
+        )
+        self.table = SavingTable.from_cube(FlowCube.from_flows(flows), income_types=["Salary"])
+
+    def test_annual_and_monthly_ratios(self):
+        self.assertAlmostEqual(self.table.ratio(2023), 0.4)
+        self.assertAlmostEqual(self.table.ratio(2024), (12000 - 600 * 11 - 1200) / 12000)
+        self.assertAlmostEqual(self.table.ratio(2024, 12), -0.2)
+        self.assertTrue(math.isnan(self.table.ratio(2020)))  # no income: blank, as get_saving_ratio
+        self.assertEqual(self.table.month_without_income(), (2023, 1))  # the flows start in February
+
+    def test_every_month_is_in_the_table(self):
+        self.assertEqual(len(self.table.monthly), 24)
+        self.assertEqual(list(self.table.year(2024)["Savings"])[-2:], [400.0, -200.0])
+
+    def test_rolling_ratio_starts_once_the_window_is_full(self):
+        rolling = self.table.rolling(12)
+        self.assertEqual(str(rolling.index[0]), "2023-12")
+        self.assertAlmostEqual(rolling.iloc[0], 0.4)
+        self.assertAlmostEqual(rolling.iloc[-1], self.table.ratio(2024))
+
+    def test_figures(self):
+        income_vs_expenses = tabs.get_income_vs_expenses_figure(self.table.year(2024), "2024")
+        self.assertEqual([trace.name for trace in income_vs_expenses.data], ["Income", "Expenses", "Savings"])
+        self.assertEqual(list(income_vs_expenses.data[1].y)[-1], 1200.0)
+        rolling = tabs.get_rolling_saving_rate_figure(self.table.rolling(), "rolling")
+        self.assertAlmostEqual(rolling.data[0].y[0], 40.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
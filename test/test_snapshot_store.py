@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from src import snapshot_store
+from src.result_cache import ResultCache
+from src.snapshot_store import SnapshotStore
+
+
+@unittest.skipIf(snapshot_store.pa is None, "pyarrow is not installed")
+class TestSnapshotStore(unittest.TestCase):
+    def test_frames_and_series_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SnapshotStore(directory)
+            frame = pd.DataFrame({"FullType": ["Food", "Travel"], "Value": [-10.0, -20.5]}, index=pd.Index([3, 7], name="row"))
+            categories = pd.Series(["SubType: Grocery", "Type: Travel"], name=None)
+
+            store.save(("get_flow_values", ()), frame)
+            store.save(("get_all_categories", ()), categories)
+
+            pd.testing.assert_frame_equal(store.load(("get_flow_values", ())), frame)
+            pd.testing.assert_series_equal(store.load(("get_all_categories", ())), categories)
+
+    def test_results_survive_a_new_cache(self):
+        """A restart builds a fresh ResultCache over the same store: it must not recompute."""
+        with tempfile.TemporaryDirectory() as directory:
+            key = ("get_values_by_asset", (("date_range", None),))
+            frame = pd.DataFrame({"CapitalGain": [1.0, 2.0]})
+            ResultCache(store=SnapshotStore(directory)).get_or_compute(key, lambda: frame)
+
+            restarted = ResultCache(store=SnapshotStore(directory))
+            result = restarted.get_or_compute(key, lambda: self.fail("recomputed despite the snapshot"))
+
+            pd.testing.assert_frame_equal(result, frame)
+            self.assertEqual(restarted.disk_hits, 1)
+
+    def test_a_cleared_store_misses(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SnapshotStore(directory)
+            store.save(("get_flow_values", ()), pd.DataFrame({"Value": [1.0]}))
+            store.clear()
+            self.assertIsNone(store.load(("get_flow_values", ())))
+
+    def test_only_stale_stores_of_the_same_data_are_deleted(self):
+        with tempfile.TemporaryDirectory() as data, tempfile.TemporaryDirectory() as shared:
+            inputs = os.path.join(data, "data_manager.csv")
+            with open(inputs, "w") as f:
+                f.write("Date\n")
+            unrelated = os.path.join(shared, "webapp-background")
+            os.makedirs(unrelated)
+
+            with mock.patch.object(snapshot_store, "DERIVED_DATA_PATH", shared):
+                stale = SnapshotStore.for_inputs(data, [inputs]).directory
+                other_data = SnapshotStore.for_inputs(os.path.join(data, "other"), [inputs]).directory
+                kept = os.path.join(os.path.dirname(stale), "notes")
+                os.makedirs(kept)
+                os.utime(inputs, (0, 0))  # a new version of the inputs
+                current = SnapshotStore.for_inputs(data, [inputs]).directory
+
+            self.assertNotEqual(current, stale)
+            self.assertFalse(os.path.exists(stale))
+            self.assertTrue(all(os.path.isdir(path) for path in (current, other_data, kept, unrelated)))
+
+    def test_only_listed_methods_are_persisted(self):
+        with tempfile.TemporaryDirectory() as directory:
+            store = SnapshotStore(directory)
+            store.save(("get_iat_imbalance", ()), pd.DataFrame({"Value": [1.0]}))
+            self.assertIsNone(store.load(("get_iat_imbalance", ())))
@@ -0,0 +1,39 @@
+import unittest
+
+from src import defaults
+from src.synthetic_data import IAT_FULL_TYPE, SyntheticSpec, generate_prices, generate_transactions, payroll_schedule
+
+SPEC = SyntheticSpec(years=(2022, 2023, 2024), accounts=3, transactions_per_month=5, securities=2, iat_per_month=2, seed=7)
+
+
+class TestSyntheticData(unittest.TestCase):
+    def test_same_seed_same_dataset(self):
+        self.assertTrue(generate_transactions(SPEC).equals(generate_transactions(SPEC)))
+        self.assertTrue(generate_prices(SPEC).equals(generate_prices(SPEC)))
+
+    def test_iat_legs_pair_up_and_net_to_zero(self):
+        df = generate_transactions(SPEC)
+        iat = df[df.FullType == IAT_FULL_TYPE]
+
+        self.assertTrue((iat.Type == "IAT").all())
+        self.assertTrue((iat.FacingAccount != "").all())
+        self.assertAlmostEqual(iat.Amount.sum(), 0.0, places=6)
+
+    def test_payroll_memos_come_from_the_salary_config(self):
+        df = generate_transactions(SPEC)
+        configured = {payroll for employer in defaults.SALARY_CONFIG.values() for payroll in employer["payrolls"]}
+
+        self.assertTrue(set(df[df.FullType == "Salary"].MemoMapped) <= configured)
+        self.assertEqual(len(payroll_schedule(range(2016, 2025))), 9)
+
+    def test_every_traded_security_has_prices(self):
+        df = generate_transactions(SPEC)
+        traded = set(df.AssetMapped) - {defaults.REF_CURRENCY}
+
+        self.assertTrue(traded)
+        self.assertTrue(traded <= set(generate_prices(SPEC).AssetMapped))
+
+    def test_scaling_multiplies_the_volume(self):
+        base = SyntheticSpec(years=(2024,), seed=1)
+
+        self.assertGreater(len(generate_transactions(base.scaled(10))), 9 * len(generate_transactions(base)))
@@ -0,0 +1,62 @@
+import unittest
+
+import pandas as pd
+
+from src.table_query import parse_filter_query, query_table
+
+
+class TestParseFilterQuery(unittest.TestCase):
+    def test_clauses_are_normalised(self):
+        clauses = parse_filter_query('{AssetMapped} contains "VW" && {Capital Gain} ge 100 && {YoY} < -0.5')
+
+        self.assertEqual(clauses, [("AssetMapped", "contains", "VW"), ("Capital Gain", ">=", 100.0), ("YoY", "<", -0.5)])
+
+    def test_case_prefixes_are_kept(self):
+        clauses = parse_filter_query('{AssetMapped} icontains "vw" && {AssetMapped} s= VW && {Capital Gain} ige 1')
+
+        self.assertEqual(clauses, [("AssetMapped", "icontains", "vw"), ("AssetMapped", "s=", "VW"), ("Capital Gain", "i>=", 1.0)])
+
+    def test_unknown_syntax_is_ignored(self):
+        self.assertEqual(parse_filter_query("not a clause"), [])
+        self.assertEqual(parse_filter_query(None), [])
+
+
+class TestQueryTable(unittest.TestCase):
+    def setUp(self):
+        self.df = pd.DataFrame({"AssetMapped": [f"A{i:02d}" for i in range(45)], "Capital Gain": [float(i % 7 - 3) for i in range(45)]})
+
+    def test_pages_carry_their_source_position_as_id(self):
+        page, page_count, _ = query_table(self.df, page_current=2, page_size=20)
+
+        self.assertEqual(page_count, 3)
+        self.assertEqual(list(page["id"]), list(range(40, 45)))
+        self.assertNotIn("id", self.df.columns)
+
+    def test_ids_survive_sorting_and_filtering(self):
+        page, page_count, _ = query_table(
+            self.df, "{Capital Gain} > 2 && {AssetMapped} contains a", [{"column_id": "AssetMapped", "direction": "desc"}], 0, 3
+        )
+
+        self.assertEqual(page_count, 2)  # the 6 rows with a gain of 3
+        self.assertEqual(list(page["AssetMapped"]), ["A41", "A34", "A27"])
+        self.assertEqual(list(page["id"]), [41, 34, 27])
+
+    def test_page_beyond_the_filtered_rows_is_clamped(self):
+        page, page_count, page_current = query_table(self.df, "{Capital Gain} = 3", None, 5, 20)
+
+        self.assertEqual((page_count, page_current), (1, 0))
+        self.assertEqual(len(page), 6)
+
+    def test_case_prefixes_set_the_case_of_text_matches(self):
+        df = pd.DataFrame({"MemoMapped": ["Shop", "shop", "SHOPPING", "Bistro"]})
+
+        self.assertEqual(len(query_table(df, "{MemoMapped} contains shop")[0]), 3)
+        self.assertEqual(len(query_table(df, "{MemoMapped} scontains shop")[0]), 1)
+        self.assertEqual(len(query_table(df, "{MemoMapped} = shop")[0]), 1)
+        self.assertEqual(len(query_table(df, "{MemoMapped} i= shop")[0]), 2)
+        self.assertEqual(len(query_table(df, "{MemoMapped} ine shop")[0]), 2)
+
+    def test_empty_frame_has_one_empty_page(self):
+        page, page_count, _ = query_table(self.df.iloc[:0])
+
+        self.assertEqual((len(page), page_count), (0, 1))
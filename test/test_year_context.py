@@ -0,0 +1,58 @@
+import threading
+import time
+import unittest
+
+from src.year_context import YearContextStore
+
+
+class TestYearContextStore(unittest.TestCase):
+    """A year change fires every tab callback at once; they must share one build, not race."""
+
+    def test_concurrent_callers_share_a_single_build(self):
+        calls = []
+
+        def build(year):
+            calls.append(year)
+            time.sleep(0.05)  # long enough for every thread to arrive while the build is in flight
+            return object()
+
+        store = YearContextStore(build)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(store.get(2024))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(calls, [2024])
+        self.assertEqual(len({id(result) for result in results}), 1)
+
+    def test_years_are_built_independently(self):
+        store = YearContextStore(lambda year: year * 10)
+        self.assertEqual(store.get(2024), 20240)
+        self.assertEqual(store.get(2025), 20250)
+        self.assertEqual(store.years(), [2024, 2025])
+
+    def test_cleared_years_are_built_again(self):
+        calls = []
+        store = YearContextStore(lambda year: calls.append(year) or year)
+        store.get(2024)
+        store.clear()
+        self.assertEqual(store.years(), [])
+        store.get(2024)
+        self.assertEqual(calls, [2024, 2024])
+
+    def test_failed_build_is_retried_rather_than_cached(self):
+        attempts = []
+
+        def build(year):
+            attempts.append(year)
+            if len(attempts) == 1:
+                raise ValueError("half-updated CSV")
+            return year
+
+        store = YearContextStore(build)
+        with self.assertRaises(ValueError):
+            store.get(2024)
+        self.assertEqual(store.get(2024), 2024)
+        self.assertEqual(len(attempts), 2)